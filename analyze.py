@@ -17,11 +17,20 @@ from rich.panel import Panel
 from rich.table import Table
 
 from config_loader import load_config
-from main import crawl_site_async
+from main import crawler_from_config, crawler_options_from_config
 from browser_crawler import crawl_with_browser
 from visualizer import create_visualizations
 from report_generator import generate_all_reports
 from csv_report import write_csv_report
+from parsers import PARSER_BACKENDS
+from replay import replay_archive, infer_base_url
+from url_policy import URLPolicy
+from page_store import PageStore
+from checkpoint import checkpoint_path, read_base_url
+from incremental import write_diff_report
+from multisite import DEFAULT_MULTISITE_CONFIG, MultiSiteCrawl, load_jobs, site_config
+from sharding import DEFAULT_SHARDING_CONFIG, crawl_sharded
+from distributed import DEFAULT_DISTRIBUTED_CONFIG, FRONTIER_FILENAME, RemoteFrontier, is_loopback, parse_address, run_coordinator, run_worker
 
 
 console = Console()
@@ -69,10 +78,32 @@ Examples:
   
   # Use custom config file
   %(prog)s https://example.com --config my_config.yaml
+  
+  # Re-run analysis offline from a response cache
+  %(prog)s --replay .cache/responses
+  
+  # Continue an interrupted crawl in its output directory
+  %(prog)s --resume output/example_com_20250101_120000
+  
+  # Crawl several sites at once (shared connection pool, fair scheduling)
+  %(prog)s https://example.com https://example.org --total-concurrency 8
+  %(prog)s --jobs sites.yaml
+  
+  # Spread one large crawl over every core
+  %(prog)s https://example.com --max-pages 50000 --shards auto
+  
+  # Coordinate a crawl over several machines (run the worker command on each)
+  %(prog)s https://example.com --coordinator 0.0.0.0:8700 --local-workers 2 --token s3cret
+  %(prog)s --worker coordinator-host:8700 --token s3cret
+  
+  # Re-crawl only what changed since an earlier run and write diff.json
+  %(prog)s --incremental output/example_com_20250101_120000
         """
     )
     
-    parser.add_argument('url', help='URL of the website to analyze')
+    parser.add_argument('url', nargs='*',
+                       help='URL of the website to analyze; several URLs are crawled concurrently '
+                            '(optional with --replay, --resume, --incremental or --jobs)')
     
     # Configuration
     parser.add_argument('--config', type=str, help='Path to configuration file')
@@ -86,6 +117,39 @@ Examples:
     parser.add_argument('--timeout', type=int, help='Request timeout in seconds')
     parser.add_argument('--max-retries', type=int, help='Maximum retry attempts')
     parser.add_argument('--rate-limit', type=float, help='Requests per second (0 for unlimited)')
+    parser.add_argument('--ignore-robots', action='store_true',
+                       help='Do not fetch or obey robots.txt')
+    parser.add_argument('--head-probe', action='store_true',
+                       help='Send a HEAD request first and skip non-HTML or oversized pages')
+    parser.add_argument('--max-body-mb', type=float,
+                       help='Abort downloads larger than this many megabytes (0 for no limit)')
+    parser.add_argument('--cache-dir', type=str,
+                       help='Enable the on-disk response cache in this directory')
+    parser.add_argument('--parser', type=str, choices=list(PARSER_BACKENDS),
+                       help='HTML parser backend (default: html.parser)')
+    parser.add_argument('--parse-workers', type=str,
+                       help='Parser processes (0 to parse on the event loop, "auto" for one per core)')
+    parser.add_argument('--replay', type=str, metavar='ARCHIVE',
+                       help='Analyze responses stored in a cache directory instead of crawling')
+    parser.add_argument('--resume', type=str, metavar='RUN_DIR',
+                       help='Continue an interrupted crawl from its output directory')
+    parser.add_argument('--incremental', type=str, metavar='PREV_RUN_DIR',
+                       help='Only fetch pages that changed since the run in PREV_RUN_DIR, and report the differences')
+    parser.add_argument('--jobs', type=str, metavar='FILE',
+                       help='YAML file listing sites (with optional per-site budgets) to crawl concurrently')
+    parser.add_argument('--total-concurrency', type=int,
+                       help='Fetches in flight across all sites of a multi-site run (0 for no shared cap)')
+    parser.add_argument('--shards', type=str,
+                       help='Crawler processes to split the URL space over ("auto" for one per core)')
+    parser.add_argument('--coordinator', type=str, metavar='HOST:PORT',
+                       help='Coordinate a distributed crawl, serving the shared frontier on HOST:PORT')
+    parser.add_argument('--local-workers', type=int,
+                       help='Worker processes the coordinator starts on this machine')
+    parser.add_argument('--worker', type=str, metavar='HOST:PORT',
+                       help='Crawl URLs leased from the coordinator at HOST:PORT until its crawl is done')
+    parser.add_argument('--token', type=str,
+                       help='Shared secret between the coordinator and its workers '
+                            '(required to coordinate on a non-loopback address)')
     
     # Output options
     parser.add_argument('--output', '-o', type=str, default='output',
@@ -110,12 +174,26 @@ Examples:
     return parser
 
 
-async def run_analysis(args):
-    """Run the site analysis."""
-    # Load configuration
-    config = load_config(args.config, args.preset)
+def write_reports(page_data: dict, base_url: str, output_dir: Path, crawl_stats: dict, formats: list,
+                  no_visualization: bool = False, url_policy: URLPolicy = None):
+    """Generate the requested report formats in output_dir."""
+    console.print("\n[bold]Generating reports...[/bold]")
     
-    # Apply CLI overrides
+    if 'json' in formats or 'html' in formats or 'stats' in formats:
+        console.print("  Generating analysis reports...")
+        generate_all_reports(page_data, base_url, str(output_dir), crawl_stats)
+    
+    if 'csv' in formats:
+        console.print("  Generating CSV report...")
+        write_csv_report(page_data, str(output_dir / "report.csv"))
+    
+    if 'graph' in formats and not no_visualization:
+        console.print("  Generating graph visualizations...")
+        create_visualizations(page_data, base_url, str(output_dir), url_policy)
+
+
+def apply_cli_overrides(config, args):
+    """Apply command-line options on top of the loaded configuration."""
     if args.max_pages:
         config.set('crawling', 'max_pages', args.max_pages)
     if args.max_concurrency:
@@ -128,16 +206,76 @@ async def run_analysis(args):
         config.set('crawling', 'max_retries', args.max_retries)
     if args.rate_limit is not None:
         config.set('crawling', 'rate_limit', args.rate_limit)
+    if args.parser:
+        config.set('analysis', 'parser', args.parser)
+    if args.ignore_robots:
+        config.set('crawling', 'respect_robots_txt', False)
+    if args.head_probe:
+        config.set('fetch', 'head_probe', True)
+    if args.max_body_mb is not None:
+        config.set('fetch', 'max_body_bytes', int(args.max_body_mb * 1024 * 1024))
+    if args.cache_dir:
+        config.set('cache', 'enabled', True)
+        config.set('cache', 'directory', args.cache_dir)
+    if args.incremental:
+        config.set('incremental', 'previous_run', args.incremental)
+    if args.shards is not None:
+        config.set('sharding', 'shards', args.shards if args.shards == 'auto' else int(args.shards))
+    if args.coordinator:
+        config.set('distributed', 'listen', args.coordinator)
+    if args.token:
+        config.set('distributed', 'token', args.token)
+    if args.parse_workers is not None:
+        config.set('extraction', 'workers', args.parse_workers if args.parse_workers == 'auto' else int(args.parse_workers))
+
+
+async def run_analysis(args):
+    """Run the site analysis."""
+    # Load configuration
+    config = load_config(args.config, args.preset)
+    
+    # Apply CLI overrides
+    apply_cli_overrides(config, args)
+    
+    sharding = {**DEFAULT_SHARDING_CONFIG, **config.get_sharding_config()}
+    sharded = sharding['shards'] > 1 and not (args.replay or args.browser)
+    distributed = {**DEFAULT_DISTRIBUTED_CONFIG, **config.get_distributed_config()}
+    coordinating = bool(args.coordinator)
     
     # Validate URL
     try:
-        base_url = validate_url(args.url)
+        if sharded and (args.resume or args.incremental):
+            raise ValueError("--resume and --incremental can't be combined with sharding")
+        if coordinating and (args.resume or args.incremental or args.replay or args.browser or sharded):
+            raise ValueError("--coordinator can't be combined with --resume, --incremental, --replay, --browser or sharding")
+        if coordinating and distributed['token'] is None and not is_loopback(parse_address(distributed['listen'])[0]):
+            raise ValueError(f"--coordinator {distributed['listen']} is reachable from other machines; "
+                             "give workers a shared secret with --token or distributed.token")
+        if args.resume:
+            if not checkpoint_path(args.resume).exists():
+                raise ValueError(f"No crawl checkpoint found in {args.resume}")
+            base_url = read_base_url(args.resume)
+            if base_url is None:
+                raise ValueError(f"Checkpoint in {args.resume} has no base URL")
+        elif args.incremental and not args.url:
+            base_url = read_base_url(args.incremental)
+            if base_url is None:
+                raise ValueError(f"No crawl checkpoint found in {args.incremental}")
+        elif args.replay and not args.url:
+            base_url = infer_base_url(args.replay)
+            if base_url is None:
+                raise ValueError(f"No archived responses found in {args.replay}")
+        elif not args.url:
+            raise ValueError("A URL is required unless --replay, --resume or --incremental is given")
+        else:
+            base_url = validate_url(args.url)
     except ValueError as e:
         console.print(f"[red]Error: {e}[/red]")
         sys.exit(1)
     
-    # Create output directory
-    output_dir = create_output_directory(base_url, args.output)
+    # Create output directory (a resumed crawl keeps writing to its own)
+    output_dir = Path(args.resume) if args.resume else create_output_directory(base_url, args.output)
+    config.set('checkpoint', 'path', str(checkpoint_path(output_dir)))
     
     # Display configuration
     if not args.quiet:
@@ -146,31 +284,99 @@ async def run_analysis(args):
         config_table.add_column("Value", style="green")
         
         config_table.add_row("Target URL", base_url)
+        if args.replay:
+            config_table.add_row("Replay Archive", args.replay)
+        if args.resume:
+            config_table.add_row("Resuming", args.resume)
+        if args.incremental:
+            config_table.add_row("Previous Run", args.incremental)
         config_table.add_row("Max Pages", str(config.max_pages))
         config_table.add_row("Max Concurrency", str(config.max_concurrency))
         config_table.add_row("Max Depth", str(config.max_depth) if config.max_depth > 0 else "Unlimited")
         config_table.add_row("Rate Limit", f"{config.rate_limit} req/s" if config.rate_limit > 0 else "Unlimited")
         config_table.add_row("Max Retries", str(config.max_retries))
+        config_table.add_row("Parser", config.parser)
+        config_table.add_row("Parse Workers", str(config.get_extraction_config().get("workers", 0)))
+        if sharded:
+            config_table.add_row("Shards", str(sharding['shards']))
+        if coordinating:
+            config_table.add_row("Coordinator", distributed['listen'])
+            config_table.add_row("Local Workers", str(args.local_workers or 0))
         config_table.add_row("Output Directory", str(output_dir))
         
         console.print(config_table)
         console.print()
     
     # Run the crawl
-    if args.browser:
+    if args.replay:
+        console.print(Panel.fit("Replaying Archived Responses", style="bold blue"))
+    elif args.browser:
         console.print(Panel.fit("Starting Site Analysis (Browser Mode)", style="bold blue"))
         console.print("[yellow]Using browser automation - this will be slower but can bypass bot detection[/yellow]\n")
     else:
         console.print(Panel.fit("Starting Site Analysis", style="bold blue"))
     
+    crawl_stats = None
+    diff = None
+    url_policy = URLPolicy(config.get_url_policy_config())
     try:
-        if args.browser:
+        if args.replay:
+            # Extract archived pages in parallel; no network access
+            extraction = config.get_extraction_config()
+            workers = extraction.get('workers') if args.parse_workers is not None else None
+            page_data, replay_stats = replay_archive(
+                args.replay,
+                base_url,
+                parser=config.parser,
+                workers=workers,
+                max_pages=args.max_pages or 0,
+                max_depth=config.max_depth,
+                url_policy=url_policy
+            )
+            crawl_stats = {"replay": replay_stats}
+        elif sharded:
+            # One crawler process per shard; runs in a thread so the event loop stays free
+            options = crawler_options_from_config(config)
+            options.pop('score')
+            with console.status(f"[cyan]Crawling site with {sharding['shards']} shards..."):
+                page_data, crawl_stats = await asyncio.to_thread(
+                    crawl_sharded,
+                    base_url,
+                    options,
+                    sharding['shards'],
+                    page_type_priority=config.page_type_priority,
+                    replicas=sharding['replicas'],
+                    batch_size=sharding['batch_size'],
+                    flush_interval=sharding['flush_interval'],
+                    quiet_period=sharding['quiet_period'],
+                    verbose=not args.quiet
+                )
+        elif coordinating:
+            # Workers lease URLs from the frontier database in the output directory
+            with console.status(f"[cyan]Coordinating crawl on {distributed['listen']}..."):
+                page_data, crawl_stats = await run_coordinator(
+                    base_url,
+                    str(output_dir / FRONTIER_FILENAME),
+                    crawler_options_from_config(config),
+                    listen=distributed['listen'],
+                    token=distributed['token'],
+                    workers=distributed['workers'],
+                    local_workers=args.local_workers or 0,
+                    batch_size=distributed['batch_size'],
+                    lease_seconds=distributed['lease_seconds'],
+                    max_attempts=distributed['max_attempts'],
+                    poll_interval=distributed['poll_interval'],
+                    verbose=not args.quiet
+                )
+        elif args.browser:
             # Use browser mode
             page_data = await crawl_with_browser(
                 base_url,
                 max_pages=config.max_pages,
                 max_depth=config.max_depth
             )
+            # The browser crawler keys pages on host and path
+            url_policy = None
         else:
             # Use regular async crawling
             with Progress(
@@ -183,35 +389,31 @@ async def run_analysis(args):
             ) as progress:
                 task = progress.add_task("[cyan]Crawling site...", total=config.max_pages)
                 
-                page_data = await crawl_site_async(
-                    base_url,
-                    max_concurrency=config.max_concurrency,
-                    max_pages=config.max_pages,
-                    max_retries=config.max_retries,
-                    retry_delay=config.retry_delay,
-                    rate_limit=config.rate_limit
-                )
+                async with crawler_from_config(base_url, config) as crawler:
+                    page_data = await crawler.crawl()
+                crawl_stats = crawler.get_crawl_stats()
+                # Includes the canonical URLs learned during the crawl
+                url_policy = crawler.url_policy
+                if crawler.incremental is not None:
+                    diff = crawler.incremental.diff(page_data)
                 
                 progress.update(task, completed=len(page_data))
         
-        console.print(f"[green]Successfully crawled {len(page_data)} pages[/green]")
+        if args.replay:
+            console.print(f"[green]Replayed {len(page_data)} pages "
+                          f"({crawl_stats['replay']['pages_per_second']:.0f} pages/s)[/green]")
+        else:
+            console.print(f"[green]Successfully crawled {len(page_data)} pages[/green]")
+        if diff is not None:
+            console.print(f"[green]Since the previous run: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+                          f"{len(diff['changed'])} changed, {len(diff['unchanged'])} unchanged[/green]")
+            write_diff_report(diff, str(output_dir / "diff.json"))
         
         # Generate reports
         formats = args.formats if 'all' not in args.formats else ['json', 'html', 'csv', 'graph', 'stats']
-        
-        console.print("\n[bold]Generating reports...[/bold]")
-        
-        if 'json' in formats or 'html' in formats or 'stats' in formats:
-            console.print("  Generating analysis reports...")
-            generate_all_reports(page_data, base_url, str(output_dir))
-        
-        if 'csv' in formats:
-            console.print("  Generating CSV report...")
-            write_csv_report(page_data, str(output_dir / "report.csv"))
-        
-        if 'graph' in formats and not args.no_visualization:
-            console.print("  Generating graph visualizations...")
-            create_visualizations(page_data, base_url, str(output_dir))
+        write_reports(page_data, base_url, output_dir, crawl_stats, formats, args.no_visualization, url_policy)
+        if isinstance(page_data, PageStore):
+            page_data.close()
         
         # Display summary
         console.print()
@@ -235,13 +437,156 @@ async def run_analysis(args):
         return 1
 
 
+async def run_multi_site(args, jobs: list = None):
+    """
+    Crawl several sites concurrently; each gets its own budgets and output directory.
+    
+    Sites come from jobs (dicts as in a jobs file), the --jobs file and the URL arguments.
+    """
+    config = load_config(args.config, args.preset)
+    apply_cli_overrides(config, args)
+    
+    try:
+        if args.replay or args.resume or args.incremental or args.browser:
+            raise ValueError("--replay, --resume, --incremental and --browser take a single site "
+                             "(use a per-site 'incremental' entry in the jobs file instead)")
+        file_jobs, settings = load_jobs(args.jobs) if args.jobs else ([], {})
+        jobs = list(jobs or []) + file_jobs + [{"url": url} for url in args.url]
+        if not jobs:
+            raise ValueError("No sites to crawl")
+        for job in jobs:
+            job["url"] = validate_url(job["url"])
+    except (ValueError, OSError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return 1
+    
+    multisite = {**DEFAULT_MULTISITE_CONFIG, **config.get_multisite_config(), **settings}
+    if args.total_concurrency is not None:
+        multisite['total_concurrency'] = args.total_concurrency
+    
+    # Same output layout as single-site runs; a suffix only if two sites would share a directory
+    sites = []
+    for job in jobs:
+        output_dir = base_dir = create_output_directory(job["url"], args.output)
+        suffix = 2
+        while any(output_dir == site[2] for site in sites):
+            output_dir = base_dir.with_name(f"{base_dir.name}_{suffix}")
+            suffix += 1
+        output_dir.mkdir(parents=True, exist_ok=True)
+        job_config = site_config(config, job)
+        job_config.set('checkpoint', 'path', str(checkpoint_path(output_dir)))
+        sites.append((job["url"], job_config, output_dir))
+    
+    if not args.quiet:
+        sites_table = Table(title=f"Sites ({multisite['total_concurrency'] or 'unlimited'} fetches in flight in total)",
+                            show_header=True)
+        sites_table.add_column("Target URL", style="cyan")
+        sites_table.add_column("Max Pages", style="green")
+        sites_table.add_column("Max Concurrency", style="green")
+        sites_table.add_column("Rate Limit", style="green")
+        sites_table.add_column("Output Directory", style="green")
+        for base_url, job_config, output_dir in sites:
+            sites_table.add_row(base_url, str(job_config.max_pages), str(job_config.max_concurrency),
+                                f"{job_config.rate_limit} req/s" if job_config.rate_limit > 0 else "Unlimited",
+                                str(output_dir))
+        console.print(sites_table)
+        console.print()
+    
+    console.print(Panel.fit(f"Starting Site Analysis ({len(sites)} sites)", style="bold blue"))
+    
+    try:
+        async with MultiSiteCrawl(
+            multisite['total_concurrency'],
+            network=config.get_network_config(),
+            timeout=config.timeout,
+            parser=config.parser,
+            extraction=config.get_extraction_config()
+        ) as run:
+            crawlers = [crawler_from_config(base_url, job_config, **run.crawler_options())
+                        for base_url, job_config, _ in sites]
+            with console.status(f"[cyan]Crawling {len(sites)} sites..."):
+                errors = await run.crawl(crawlers)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Analysis interrupted by user[/yellow]")
+        return 130
+    
+    formats = args.formats if 'all' not in args.formats else ['json', 'html', 'csv', 'graph', 'stats']
+    failed = 0
+    for (base_url, _, output_dir), crawler, error in zip(sites, crawlers, errors):
+        if error is not None:
+            failed += 1
+            console.print(f"\n[red]Error crawling {base_url}: {error}[/red]")
+            crawler.page_data.close()
+            continue
+        console.print(f"\n[green]{base_url}: crawled {len(crawler.page_data)} pages[/green]")
+        try:
+            if crawler.incremental is not None:
+                write_diff_report(crawler.incremental.diff(crawler.page_data), str(output_dir / "diff.json"))
+            write_reports(crawler.page_data, base_url, output_dir, crawler.get_crawl_stats(), formats,
+                          args.no_visualization, crawler.url_policy)
+        except Exception as e:
+            failed += 1
+            console.print(f"[red]Error writing reports for {base_url}: {e}[/red]")
+            if args.verbose:
+                console.print_exception()
+        finally:
+            crawler.page_data.close()
+    
+    console.print()
+    console.print(Panel.fit(
+        f"[green]Analysis complete![/green] {len(sites) - failed} of {len(sites)} sites succeeded\n\n" +
+        "\n".join(f"{base_url}: [cyan]{output_dir}[/cyan]" for base_url, _, output_dir in sites),
+        title="Success" if not failed else "Finished with errors",
+        border_style="green" if not failed else "yellow"
+    ))
+    return 0 if not failed else 1
+
+
+async def run_distributed_worker(args):
+    """Crawl for a coordinator; the coordinator writes the reports."""
+    config = load_config(args.config, args.preset)
+    apply_cli_overrides(config, args)
+    distributed = {**DEFAULT_DISTRIBUTED_CONFIG, **config.get_distributed_config()}
+    try:
+        host, port = parse_address(args.worker)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        return 1
+    
+    options = crawler_options_from_config(config)
+    options.pop('score')
+    frontier = RemoteFrontier(host, port, token=distributed['token'])
+    console.print(Panel.fit(f"Crawling for the coordinator at {host}:{port}", style="bold blue"))
+    try:
+        stats = await run_worker(
+            frontier,
+            options,
+            batch_size=distributed['batch_size'],
+            lease_seconds=distributed['lease_seconds'],
+            poll_interval=distributed['poll_interval']
+        )
+    except (ConnectionError, OSError, RuntimeError) as e:
+        console.print(f"[red]Error talking to the coordinator: {e}[/red]")
+        return 1
+    finally:
+        await frontier.close()
+    console.print(f"[green]Crawl finished: {stats['pages']} pages in {stats['batches']} batches[/green]")
+    return 0
+
+
 def main():
     """Main entry point."""
     parser = setup_argparse()
     args = parser.parse_args()
     
     # Run the analysis
-    exit_code = asyncio.run(run_analysis(args))
+    if args.worker:
+        exit_code = asyncio.run(run_distributed_worker(args))
+    elif args.jobs or len(args.url) > 1:
+        exit_code = asyncio.run(run_multi_site(args))
+    else:
+        args.url = args.url[0] if args.url else None
+        exit_code = asyncio.run(run_analysis(args))
     sys.exit(exit_code)
 
 
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-pass extract_page_data against the old multi-parse version.
+
+Usage:
+  # Save a few real pages into a corpus directory, then benchmark it
+  python benchmarks/bench_extract.py corpus/ --download https://example.com https://example.org
+
+  # Benchmark an existing corpus of saved .html files
+  python benchmarks/bench_extract.py corpus/ --repeat 5
+"""
+
+import sys
+import time
+import argparse
+import hashlib
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from crawl import (
+    extract_page_data,
+    get_h1_from_html,
+    get_first_paragraph_from_html,
+    get_urls_from_html,
+    get_classified_links,
+    get_images_from_html,
+    categorize_page_type
+)
+
+
+def legacy_extract_page_data(html, page_url):
+    """The previous extract_page_data, which parsed the document six times."""
+    classified_links = get_classified_links(html, page_url)
+
+    return {
+        "url": page_url,
+        "h1": get_h1_from_html(html),
+        "first_paragraph": get_first_paragraph_from_html(html),
+        "outgoing_links": get_urls_from_html(html, page_url),
+        "internal_links": classified_links["internal"],
+        "external_links": classified_links["external"],
+        "internal_link_count": len(classified_links["internal"]),
+        "external_link_count": len(classified_links["external"]),
+        "total_link_count": len(classified_links["all"]),
+        "image_urls": get_images_from_html(html, page_url),
+        "image_count": len(get_images_from_html(html, page_url)),
+        "page_type": categorize_page_type(page_url, html)
+    }
+
+
+def download_pages(urls, corpus_dir: Path):
+    """Fetch pages and store them in the corpus directory."""
+    import requests
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        resp = requests.get(url, timeout=15, headers={"User-Agent": "SiteAnalyzer-bench/1.0"})
+        resp.raise_for_status()
+        name = hashlib.sha1(url.encode()).hexdigest()[:12]
+        (corpus_dir / f"{name}.html").write_text(resp.text, encoding="utf-8")
+        (corpus_dir / f"{name}.url").write_text(url, encoding="utf-8")
+        print(f"Saved {url} ({len(resp.text)} chars)")
+
+
+def load_corpus(corpus_dir: Path):
+    """Load (html, url) pairs; pages without a .url sidecar get a placeholder URL."""
+    pages = []
+    for html_path in sorted(corpus_dir.glob("*.html")):
+        url_path = html_path.with_suffix(".url")
+        url = url_path.read_text(encoding="utf-8").strip() if url_path.exists() else f"https://example.com/{html_path.stem}"
+        pages.append((html_path.read_text(encoding="utf-8", errors="replace"), url))
+    return pages
+
+
+def time_extractor(func, pages, repeat: int) -> float:
+    """Return the best wall-clock time over `repeat` passes of the corpus."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html, url in pages:
+            func(html, url)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page extraction")
+    parser.add_argument("corpus", help="Directory of saved .html pages (with optional .url sidecars)")
+    parser.add_argument("--download", nargs="+", metavar="URL", help="Fetch these pages into the corpus first")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per extractor (best is reported)")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus)
+    if args.download:
+        download_pages(args.download, corpus_dir)
+
+    pages = load_corpus(corpus_dir)
+    if not pages:
+        print(f"No .html files found in {corpus_dir}")
+        return 1
+
+    # Both versions must agree before the timings mean anything
+    for html, url in pages:
+        if extract_page_data(html, url) != legacy_extract_page_data(html, url):
+            print(f"Output mismatch for {url}")
+            return 1
+
+    total_bytes = sum(len(html.encode("utf-8")) for html, _ in pages)
+    legacy = time_extractor(legacy_extract_page_data, pages, args.repeat)
+    single = time_extractor(extract_page_data, pages, args.repeat)
+
+    print(f"Pages: {len(pages)} ({total_bytes / 1024 / 1024:.1f} MiB)")
+    print(f"Multi-parse:  {legacy:.3f}s ({len(pages) / legacy:.1f} pages/s)")
+    print(f"Single-pass:  {single:.3f}s ({len(pages) / single:.1f} pages/s)")
+    print(f"Speedup:      {legacy / single:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Compare the aiohttp (HTTP/1.1) and httpx (HTTP/2) fetch backends.
+
+Starts a local TLS server that negotiates h2 or http/1.1 through ALPN and
+serves the same pages either way, optionally after a delay that stands in
+for server think time. Loopback handshakes are nearly free, so each new
+connection's first response is also held back by --handshake-delay, the
+TCP + TLS round trips a remote site would cost. Each backend then crawls
+the site. The numbers to watch are pages/s and how many connections were
+opened.
+
+Needs httpx[http2] (pip install -e ".[http2]") and the openssl command
+for the self-signed certificate.
+
+Usage:
+  python benchmarks/bench_http2.py --pages 500 --concurrency 32 --delay 0.02 --handshake-delay 0.1
+"""
+
+import sys
+import ssl
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+
+from main import AsyncCrawler
+
+# Server tasks, kept referenced until they finish
+_tasks = set()
+
+
+def spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def page_html(i: int, pages: int, links: int) -> bytes:
+    targets = [(i * links + n) % pages for n in range(1, links + 1)]
+    anchors = "".join(f'<a href="/page/{t}">page {t}</a>' for t in targets)
+    return (f"<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1>"
+            f"<p>Benchmark page {i}.</p>{anchors}</body></html>").encode()
+
+
+def page_for(path: str, pages: int, links: int) -> bytes:
+    i = int(path.rsplit("/", 1)[-1]) if path.startswith("/page/") else 0
+    return page_html(i, pages, links)
+
+
+class H2Protocol(asyncio.Protocol):
+    """One HTTP/2 connection; each stream is answered after the configured delay."""
+
+    def __init__(self, pages: int, links: int, delay: float, handshake_delay: float):
+        self.pages, self.links, self.delay = pages, links, delay
+        self.handshake_delay = handshake_delay
+        self.conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        self.transport = None
+        self.ready_at = 0.0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.ready_at = asyncio.get_running_loop().time() + self.handshake_delay
+        self.conn.initiate_connection()
+        self.conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000})
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                path = dict(event.headers).get(b":path", b"/").decode()
+                spawn(self.respond(event.stream_id, path))
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id: int, path: str):
+        await asyncio.sleep(max(0.0, self.ready_at - asyncio.get_running_loop().time()) + self.delay)
+        body = page_for(path, self.pages, self.links)
+        self.conn.send_headers(stream_id, [(":status", "200"), ("content-type", "text/html; charset=utf-8"),
+                                           ("content-length", str(len(body)))])
+        # Pages are far smaller than the default flow-control window
+        self.conn.send_data(stream_id, body, end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+
+async def handle_http1(reader, writer, pages: int, links: int, delay: float, handshake_delay: float):
+    """HTTP/1.1 keep-alive: one request at a time per connection."""
+    try:
+        await asyncio.sleep(handshake_delay)
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            path = head.split(b" ", 2)[1].decode()
+            if delay:
+                await asyncio.sleep(delay)
+            body = page_for(path, pages, links)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                         b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class ALPNServerProtocol(asyncio.Protocol):
+    """Hands the TLS connection to the HTTP/2 or HTTP/1.1 handler, depending on ALPN."""
+
+    def __init__(self, pages: int, links: int, delay: float, handshake_delay: float):
+        self.args = (pages, links, delay, handshake_delay)
+        self.inner = None
+
+    def connection_made(self, transport):
+        if transport.get_extra_info("ssl_object").selected_alpn_protocol() == "h2":
+            self.inner = H2Protocol(*self.args)
+        else:
+            loop = asyncio.get_running_loop()
+            reader = asyncio.StreamReader(loop=loop)
+            self.inner = asyncio.StreamReaderProtocol(reader)
+            self.inner.connection_made(transport)
+            writer = asyncio.StreamWriter(transport, self.inner, reader, loop)
+            spawn(handle_http1(reader, writer, *self.args))
+            return
+        self.inner.connection_made(transport)
+
+    def data_received(self, data):
+        self.inner.data_received(data)
+
+    def eof_received(self):
+        return self.inner.eof_received() if hasattr(self.inner, "eof_received") else None
+
+    def connection_lost(self, exc):
+        if hasattr(self.inner, "connection_lost"):
+            self.inner.connection_lost(exc)
+
+
+def serve(port: int, certfile: str, keyfile: str, pages: int, links: int, delay: float, handshake_delay: float):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile, keyfile)
+    context.set_alpn_protocols(["h2", "http/1.1"])
+
+    async def main():
+        server = await asyncio.get_running_loop().create_server(
+            lambda: ALPNServerProtocol(pages, links, delay, handshake_delay), "127.0.0.1", port, ssl=context)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+def self_signed_cert(directory: str):
+    certfile, keyfile = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", keyfile, "-out", certfile], check=True, capture_output=True)
+    return certfile, keyfile
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def crawl(url: str, backend: str, pages: int, concurrency: int):
+    options = dict(max_pages=pages, max_concurrency=concurrency, max_depth=0, rate_limit=0,
+                   respect_robots_txt=False, concurrency={"adaptive": False},
+                   network={"backend": backend, "verify_ssl": False, "pool_size": 0})
+    started = time.perf_counter()
+    async with AsyncCrawler(url, **options) as crawler:
+        page_data = await crawler.crawl()
+    return page_data, time.perf_counter() - started, crawler.connection_stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP/1.1 (aiohttp) against HTTP/2 (httpx) fetching")
+    parser.add_argument("--pages", type=int, default=500, help="Pages on the benchmark site (and crawl budget)")
+    parser.add_argument("--concurrency", type=int, default=32, help="max_concurrency for the crawl")
+    parser.add_argument("--links", type=int, default=20, help="Links per page")
+    parser.add_argument("--delay", type=float, default=0.02, help="Server think time per response (seconds)")
+    parser.add_argument("--handshake-delay", type=float, default=0.1,
+                        help="Extra wait before a new connection's first response (seconds)")
+    parser.add_argument("--rounds", type=int, default=2, help="Crawls per backend (best one is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = self_signed_cert(tmp)
+        port = free_port()
+        server = multiprocessing.Process(target=serve, args=(port, certfile, keyfile, args.pages, args.links, args.delay,
+                                                                     args.handshake_delay),
+                                         daemon=True)
+        server.start()
+        time.sleep(1.0)
+        print(f"{args.pages} pages, concurrency {args.concurrency}, {args.delay * 1000:.0f}ms server delay, "
+              f"{args.handshake_delay * 1000:.0f}ms per new connection (TLS)")
+        try:
+            for backend, label in (("aiohttp", "HTTP/1.1 aiohttp"), ("httpx", "HTTP/2   httpx")):
+                runs = [asyncio.run(crawl(f"https://127.0.0.1:{port}/", backend, args.pages, args.concurrency))
+                        for _ in range(args.rounds)]
+                page_data, elapsed, network = min(runs, key=lambda run: run[1])
+                errors = sum(1 for page in page_data.values() if "error" in page)
+                print(f"{label}  {len(page_data):5d} pages  {errors:3d} errors  {elapsed:6.2f}s  "
+                      f"{len(page_data) / elapsed:7.1f} pages/s  {network['connections_created']:4d} connections opened")
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Measure peak memory of holding page records and writing the reports.
+
+Stores N synthetic page records (100 internal links and 20 images each)
+two ways and reports the peak memory (tracemalloc) of storing them and of
+writing the JSON, text, HTML and CSV reports from them:
+
+- dict: every record in memory, as AsyncCrawler.page_data used to be
+- PageStore: memory_pages records in memory, the rest spilled to SQLite
+
+Usage:
+  python benchmarks/bench_page_store.py --pages 20000 --memory-pages 1000
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from page_store import PageStore
+from report_generator import generate_all_reports
+from csv_report import write_csv_report
+
+
+def synthetic_page(i: int) -> dict:
+    links = [f"https://example.com/section/page-{i * 7 + k}" for k in range(100)]
+    return {
+        "url": f"https://example.com/section/page-{i}", "h1": f"Page {i}",
+        "first_paragraph": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+        "depth": i % 8, "page_type": "article", "incoming_link_count": i % 50,
+        "internal_links": links, "outgoing_links": links, "external_links": [],
+        "image_urls": [f"https://example.com/img/{i}-{k}.jpg" for k in range(20)],
+        "internal_link_count": 100, "external_link_count": 0, "image_count": 20,
+        "response_time": 0.1, "status_code": 200,
+    }
+
+
+def run(page_data, count: int, output_dir: Path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(count):
+        page_data[f"example.com/section/page-{i}"] = synthetic_page(i)
+    stored_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    generate_all_reports(page_data, "https://example.com", str(output_dir))
+    write_csv_report(page_data, str(output_dir / "report.csv"))
+    report_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return stored_peak, report_peak, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the disk-spilling page store")
+    parser.add_argument("--pages", type=int, default=20000, help="Page records to store")
+    parser.add_argument("--memory-pages", type=int, default=1000, help="PageStore memory tier size")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for label, page_data in (("dict", {}), ("PageStore", PageStore(args.memory_pages, directory))):
+        stored, reports, elapsed = run(page_data, args.pages, Path(tempfile.mkdtemp()))
+        print(f"{label:10s} peak storing {stored / 2 ** 20:7.1f} MiB  "
+              f"peak writing reports {reports / 2 ** 20:7.1f} MiB  total {elapsed:5.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Compare throughput of the HTML parser backends on a corpus of saved pages.
+
+Each backend is first checked against html.parser on every page; backends
+that disagree are reported, left out of the timings, and make the run exit
+with status 1. lxml and selectolax only agree on markup where the parsers
+build the same tree (see the parsers module docstring), so a corpus with
+malformed pages can fail for them.
+
+Usage:
+  python benchmarks/bench_parsers.py corpus/ --repeat 5
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from crawl import extract_page_data
+from parsers import DEFAULT_PARSER, PARSER_BACKENDS, available_parsers
+from bench_extract import load_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument("corpus", help="Directory of saved .html pages (with optional .url sidecars)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend (best is reported)")
+    args = parser.parse_args()
+
+    pages = load_corpus(Path(args.corpus))
+    if not pages:
+        print(f"No .html files found in {args.corpus}")
+        return 1
+
+    installed = available_parsers()
+    for name in PARSER_BACKENDS:
+        if name not in installed:
+            print(f"{name:12s}  not installed, skipped")
+
+    expected = [extract_page_data(html, url) for html, url in pages]
+    total_mib = sum(len(html.encode("utf-8")) for html, _ in pages) / 1024 / 1024
+
+    results = {}
+    mismatched = []
+    for name in installed:
+        mismatches = sum(
+            1 for (html, url), want in zip(pages, expected)
+            if extract_page_data(html, url, parser=name) != want
+        )
+        if mismatches:
+            print(f"{name:12s}  differs from {DEFAULT_PARSER} on {mismatches}/{len(pages)} pages, skipped")
+            mismatched.append(name)
+            continue
+
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for html, url in pages:
+                extract_page_data(html, url, parser=name)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+
+    print(f"\nPages: {len(pages)} ({total_mib:.1f} MiB)")
+    baseline = results.get(DEFAULT_PARSER)
+    for name, elapsed in sorted(results.items(), key=lambda x: x[1]):
+        speedup = f"{baseline / elapsed:5.2f}x" if baseline else "  n/a"
+        print(f"{name:12s}  {len(pages) / elapsed:8.1f} pages/s  {total_mib / elapsed:7.2f} MiB/s  {speedup}")
+    if mismatched:
+        print(f"\nFAILED: {', '.join(mismatched)} disagree with {DEFAULT_PARSER}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
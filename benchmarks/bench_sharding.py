@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure how sharded crawling scales with the number of crawler processes.
+
+Starts a local benchmark site (served by several processes sharing one
+port, so the server isn't the bottleneck) whose pages are large enough for
+parsing to dominate, then crawls it with each shard count.
+
+Usage:
+  python benchmarks/bench_sharding.py --pages 5000 --shards 1 2 4 8
+"""
+
+import sys
+import time
+import socket
+import argparse
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiohttp import web
+
+from sharding import crawl_sharded
+
+
+def page_html(i: int, pages: int, links: int, paragraphs: int) -> str:
+    targets = [(i * links + n) % pages for n in range(1, links + 1)]
+    body = "".join(f"<p>Paragraph {n} of page {i} with some filler text for the parser.</p>" for n in range(paragraphs))
+    anchors = "".join(f'<a href="/page/{t}">page {t}</a>' for t in targets)
+    return f"<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1>{body}{anchors}</body></html>"
+
+
+def serve(port: int, pages: int, links: int, paragraphs: int):
+    """One server process; all of them bind the same port with SO_REUSEPORT."""
+    async def handler(request):
+        i = int(request.match_info.get("i", 0))
+        return web.Response(text=page_html(i, pages, links, paragraphs), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    app.router.add_get("/page/{i}", handler)
+    web.run_app(app, host="127.0.0.1", port=port, reuse_port=True, print=None, access_log=None)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded crawling")
+    parser.add_argument("--pages", type=int, default=2000, help="Pages on the benchmark site (and crawl budget)")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Shard counts to compare")
+    parser.add_argument("--concurrency", type=int, default=16, help="max_concurrency for the whole crawl")
+    parser.add_argument("--links", type=int, default=20, help="Links per page")
+    parser.add_argument("--paragraphs", type=int, default=200, help="Paragraphs per page (parsing cost)")
+    parser.add_argument("--server-processes", type=int, default=multiprocessing.cpu_count(),
+                        help="Processes serving the benchmark site")
+    args = parser.parse_args()
+
+    port = free_port()
+    servers = [multiprocessing.Process(target=serve, args=(port, args.pages, args.links, args.paragraphs), daemon=True)
+               for _ in range(args.server_processes)]
+    for server in servers:
+        server.start()
+    time.sleep(1.0)
+
+    options = dict(max_pages=args.pages, max_concurrency=args.concurrency, max_depth=0,
+                   rate_limit=0, respect_robots_txt=False)
+    print(f"{args.pages} pages, {multiprocessing.cpu_count()} cores, {args.server_processes} server processes")
+    baseline = None
+    try:
+        for shards in args.shards:
+            started = time.perf_counter()
+            page_data, stats = crawl_sharded(f"http://127.0.0.1:{port}/", options, shards, verbose=False)
+            elapsed = time.perf_counter() - started
+            rate = len(page_data) / elapsed
+            baseline = baseline or rate
+            print(f"{shards:3d} shards  {len(page_data):6d} pages  {elapsed:7.2f}s  {rate:8.1f} pages/s  "
+                  f"x{rate / baseline:.2f}  ({stats['sharding']['links_forwarded']} links forwarded)")
+    finally:
+        for server in servers:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Measure the memory per URL of the crawler's visited-set bookkeeping.
+
+Builds the structures for N synthetic normalized URLs (one host, paths
+a few segments deep, some with query strings) two ways and reports the
+memory they retain (tracemalloc) divided by N:
+
+- dicts: what the crawler kept before, a set of normalized URL strings
+  plus a depth dict and an incoming-links list per URL
+- URLTable: ids, depths and parent ids in arrays (with and without the
+  Bloom filter front)
+
+It also fills a Frontier with the same URLs (as https:// links, every
+fifth one with www. and a trailing slash) and reports what it retains
+per queued URL: the URLTable with the URLs as found plus the queue
+entries. The frontier runs without a URL policy, whose key cache is
+bounded by url_policy.cache_size rather than growing with the crawl.
+
+Lookup speed is timed for URLs that are in the table and for new ones.
+
+Usage:
+  python benchmarks/bench_url_table.py --urls 1000000
+"""
+
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from frontier import Frontier
+from url_table import NO_PARENT, BloomFilter, URLTable
+
+SECTIONS = ["blog", "news", "products", "category", "docs", "support", "events", "people"]
+WORDS = ["annual", "report", "market", "update", "guide", "release", "notes", "summary", "review", "launch",
+         "pricing", "overview", "security", "install", "faq", "team"]
+
+
+def synthetic_urls(count: int, seed: int = 7):
+    """Normalized URLs shaped like a real site's: example.com/section/slug-words[/n][?page=n]."""
+    rng = random.Random(seed)
+    for i in range(count):
+        slug = "-".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        url = f"example.com/{rng.choice(SECTIONS)}/{slug}-{i}"
+        if rng.random() < 0.2:
+            url += f"?page={rng.randint(2, 40)}"
+        yield url
+
+
+def build_dicts(count: int):
+    seen = set()
+    depth = {}
+    incoming = defaultdict(list)
+    parent = None
+    for i, url in enumerate(synthetic_urls(count)):
+        seen.add(url)
+        depth[url] = i % 12
+        if parent is not None:
+            incoming[url].append(parent)
+        if i % 50 == 0:
+            parent = url
+    return seen, depth, incoming
+
+
+def build_table(count: int, bloom: bool):
+    table = URLTable(BloomFilter(count) if bloom else None)
+    parent = NO_PARENT
+    for i, url in enumerate(synthetic_urls(count)):
+        url_id = table.add(url, i % 12, parent)
+        if i % 50 == 0:
+            parent = url_id
+    return table
+
+
+def build_frontier(count: int):
+    frontier = Frontier()
+    parent = None
+    for i, key in enumerate(synthetic_urls(count)):
+        url = f"https://www.{key}/" if i % 5 == 0 and "?" not in key else f"https://{key}"
+        frontier.add(url, 1 + i % 12, parent)
+        if i % 50 == 0:
+            parent = url
+    return frontier
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def lookups_per_second(contains, urls) -> float:
+    started = time.perf_counter()
+    for url in urls:
+        contains(url)
+    return len(urls) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact visited set")
+    parser.add_argument("--urls", type=int, default=1000000, help="Distinct URLs to add")
+    parser.add_argument("--lookups", type=int, default=200000, help="Lookups to time (half hits, half misses)")
+    args = parser.parse_args()
+
+    sample = list(synthetic_urls(args.urls))
+    average = sum(map(len, sample)) / len(sample)
+    hits = random.Random(1).sample(sample, min(args.lookups // 2, len(sample)))
+    del sample
+    misses = [f"example.com/new/{i}" for i in range(args.lookups // 2)]
+    print(f"{args.urls} URLs, {average:.0f} characters on average")
+
+    (seen, _, _), retained, elapsed = measure(build_dicts, args.urls)
+    print(f"set + dicts          {retained / args.urls:6.1f} bytes/URL  build {elapsed:5.2f}s  "
+          f"hits {lookups_per_second(seen.__contains__, hits) / 1e6:4.2f}M/s  "
+          f"misses {lookups_per_second(seen.__contains__, misses) / 1e6:4.2f}M/s")
+    del seen
+
+    for bloom in (False, True):
+        table, retained, elapsed = measure(build_table, args.urls, bloom)
+        label = "URLTable + Bloom" if bloom else "URLTable"
+        print(f"{label:20s} {retained / args.urls:6.1f} bytes/URL  build {elapsed:5.2f}s  "
+              f"hits {lookups_per_second(table.__contains__, hits) / 1e6:4.2f}M/s  "
+              f"misses {lookups_per_second(table.__contains__, misses) / 1e6:4.2f}M/s  "
+              f"(arrays: {table.nbytes / args.urls:.1f} bytes/URL)")
+        del table
+
+    frontier, retained, elapsed = measure(build_frontier, args.urls)
+    print(f"{'Frontier (queued)':20s} {retained / args.urls:6.1f} bytes/URL  build {elapsed:5.2f}s  "
+          f"(table arrays: {frontier.urls.nbytes / args.urls:.1f} bytes/URL, {len(frontier)} queued)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
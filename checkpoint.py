@@ -0,0 +1,167 @@
+"""
+Durable crawl state so an interrupted crawl can be resumed.
+
+The frontier (every URL queued but not yet finished) and the finished page
+records are written to a SQLite database in WAL mode. Writes are buffered
+and committed in batches, so the crawl pays for a commit every batch_size
+changes or flush_interval seconds rather than per page. A crash loses at
+most the last unflushed batch; those pages are simply crawled again.
+
+On resume, finished pages are loaded back into page_data and the URLs that
+were still queued or in flight go back into the frontier.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+CHECKPOINT_FILENAME = "crawl_state.sqlite3"
+
+DEFAULT_CHECKPOINT_CONFIG = {
+    "enabled": True,
+    "batch_size": 200,
+    "flush_interval": 2.0,
+}
+
+
+def checkpoint_path(run_dir: str) -> Path:
+    return Path(run_dir) / CHECKPOINT_FILENAME
+
+
+class CrawlCheckpoint:
+    """SQLite-backed frontier and page store with batched commits."""
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 2.0):
+        """
+        Open (or create) a checkpoint database.
+
+        Args:
+            path: Database file
+            batch_size: Buffered changes that trigger a commit
+            flush_interval: Commit at least this often (seconds) while changes are buffered
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                normalized_url TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                parent_url TEXT
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                normalized_url TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+        """)
+        self.db.commit()
+
+        self._queued: Dict[str, Tuple[str, str, int, Optional[str]]] = {}
+        self._pages: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+        self.stats = {"commits": 0, "rows_written": 0, "commit_time": 0.0}
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self.db.commit()
+
+    def has_state(self) -> bool:
+        """True if a previous crawl left pages or queued URLs behind."""
+        return self.db.execute(
+            "SELECT EXISTS(SELECT 1 FROM pages) OR EXISTS(SELECT 1 FROM frontier)"
+        ).fetchone()[0] == 1
+
+    def record_queued(self, normalized_url: str, url: str, depth: int, parent_url: str = None):
+        """Remember a URL added to the frontier."""
+        self._queued[normalized_url] = (normalized_url, url, depth, parent_url)
+        self._maybe_flush()
+
+    def record_page(self, normalized_url: str, data: Dict[str, Any]):
+        """Store a finished page record; its URL leaves the frontier."""
+        self._queued.pop(normalized_url, None)
+        self._pages[normalized_url] = json.dumps(data)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self._queued) + len(self._pages) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Commit everything buffered in one transaction."""
+        self._last_flush = time.monotonic()
+        if not self._queued and not self._pages:
+            return
+        start = time.perf_counter()
+        with self.db:
+            if self._queued:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO frontier (normalized_url, url, depth, parent_url) VALUES (?, ?, ?, ?)",
+                    self._queued.values()
+                )
+            if self._pages:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO pages (normalized_url, data) VALUES (?, ?)",
+                    self._pages.items()
+                )
+                self.db.executemany(
+                    "DELETE FROM frontier WHERE normalized_url = ?",
+                    ((url,) for url in self._pages)
+                )
+        self.stats["commits"] += 1
+        self.stats["rows_written"] += len(self._queued) + len(self._pages)
+        self.stats["commit_time"] += time.perf_counter() - start
+        self._queued.clear()
+        self._pages.clear()
+
+    def load_pages(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (normalized_url, page record) for every finished page."""
+        for normalized_url, data in self.db.execute("SELECT normalized_url, data FROM pages"):
+            yield normalized_url, json.loads(data)
+
+    def load_frontier(self) -> List[Tuple[str, int, Optional[str]]]:
+        """URLs that were queued or in flight, shallowest first."""
+        return self.db.execute(
+            "SELECT url, depth, parent_url FROM frontier ORDER BY depth, rowid"
+        ).fetchall()
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        return {
+            **self.stats,
+            "pages_stored": self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+            "frontier_remaining": self.db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+        }
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def read_base_url(run_dir: str) -> Optional[str]:
+    """Base URL of the crawl checkpointed in run_dir, if there is one."""
+    path = checkpoint_path(run_dir)
+    if not path.exists():
+        return None
+    checkpoint = CrawlCheckpoint(path)
+    try:
+        return checkpoint.get_meta("base_url")
+    finally:
+        checkpoint.close()
@@ -0,0 +1,129 @@
+"""
+Per-host circuit breaker for the async crawler.
+
+After failure_threshold consecutive failures (timeouts, connection errors,
+5xx, 429) a host's circuit opens and no requests are scheduled to it for
+recovery_time seconds. Then a single probe request is let through: success
+closes the circuit, failure opens it again. After max_failed_probes failed
+probes in a row the host is given up on for the rest of the crawl.
+"""
+
+import math
+import time
+from typing import Any, Dict
+
+from crawl import get_domain_from_url
+
+
+DEFAULT_CIRCUIT_BREAKER_CONFIG = {
+    "enabled": True,
+    "failure_threshold": 5,
+    "recovery_time": 30,
+    "max_failed_probes": 3,
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class HostCircuit:
+    """Breaker state for one host."""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.failed_probes = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+
+class CircuitBreaker:
+    """Circuit breakers keyed by host."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Initialize the breaker.
+
+        Args:
+            config: The `circuit_breaker` config section (see DEFAULT_CIRCUIT_BREAKER_CONFIG)
+        """
+        config = {**DEFAULT_CIRCUIT_BREAKER_CONFIG, **(config or {})}
+        self.enabled = config["enabled"]
+        self.failure_threshold = config["failure_threshold"]
+        self.recovery_time = config["recovery_time"]
+        self.max_failed_probes = config["max_failed_probes"]
+        self.circuits: Dict[str, HostCircuit] = {}
+        self.stats = {"trips": 0, "probes": 0, "recoveries": 0, "deferred": 0}
+
+    def _circuit(self, url: str) -> HostCircuit:
+        host = get_domain_from_url(url)
+        circuit = self.circuits.get(host)
+        if circuit is None:
+            circuit = self.circuits[host] = HostCircuit()
+        return circuit
+
+    def check(self, url: str) -> float:
+        """
+        Ask whether a request to url's host may be sent now.
+
+        Returns:
+            0 to go ahead, seconds to wait before asking again, or math.inf if
+            the host has been given up on
+        """
+        if not self.enabled:
+            return 0
+        circuit = self._circuit(url)
+        if circuit.state == CLOSED:
+            return 0
+        if circuit.failed_probes >= self.max_failed_probes:
+            return math.inf
+        if circuit.state == OPEN:
+            remaining = circuit.opened_at + self.recovery_time - time.monotonic()
+            if remaining > 0:
+                self.stats["deferred"] += 1
+                return remaining
+            circuit.state = HALF_OPEN
+        if circuit.probe_in_flight:
+            # Wait for the probe's verdict
+            self.stats["deferred"] += 1
+            return min(1.0, self.recovery_time)
+        circuit.probe_in_flight = True
+        self.stats["probes"] += 1
+        return 0
+
+    def record_success(self, url: str):
+        if not self.enabled:
+            return
+        circuit = self._circuit(url)
+        if circuit.state != CLOSED:
+            self.stats["recoveries"] += 1
+        circuit.state = CLOSED
+        circuit.failures = 0
+        circuit.failed_probes = 0
+        circuit.probe_in_flight = False
+
+    def record_failure(self, url: str):
+        if not self.enabled:
+            return
+        circuit = self._circuit(url)
+        circuit.failures += 1
+        if circuit.state == HALF_OPEN:
+            circuit.failed_probes += 1
+            circuit.probe_in_flight = False
+            circuit.state = OPEN
+            circuit.opened_at = time.monotonic()
+        elif circuit.state == CLOSED and circuit.failures >= self.failure_threshold:
+            circuit.state = OPEN
+            circuit.opened_at = time.monotonic()
+            self.stats["trips"] += 1
+            print(f"Circuit opened for {get_domain_from_url(url)} after {circuit.failures} failures")
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters and non-closed hosts for the statistics report."""
+        return {
+            **self.stats,
+            "open_hosts": [host for host, c in self.circuits.items()
+                           if c.state != CLOSED and c.failed_probes < self.max_failed_probes],
+            "abandoned_hosts": [host for host, c in self.circuits.items() if c.failed_probes >= self.max_failed_probes]
+        }
@@ -0,0 +1,258 @@
+"""
+Adaptive per-host concurrency for the async crawler.
+
+Each host gets an AIMD (additive increase, multiplicative decrease) limit on
+requests in flight. After every window of successful responses the limit
+grows by one if the window's p95 latency is still within latency_tolerance
+of the best p95 seen so far, and shrinks if latency is rising. A 429 or 503
+response or a timeout cuts the limit by decrease_factor straight away; only
+requests started after the previous cut can cut it again, so one burst of
+failures counts once. Retry-After pauses the host entirely.
+
+max_concurrency remains the ceiling; the limit starts at `initial` and
+settles wherever the host stops keeping up. The latest trajectory_length
+limit changes are kept for the reports as (elapsed, host, limit, reason).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from crawl import get_domain_from_url
+
+
+DEFAULT_CONCURRENCY_CONFIG = {
+    "adaptive": True,
+    "initial": 2,
+    "min": 1,
+    "window": 10,
+    "latency_tolerance": 2.0,
+    "decrease_factor": 0.5,
+    "max_retry_after": 60,
+    "trajectory_length": 1000,
+}
+
+# Status codes a server uses to say it is overloaded
+OVERLOAD_STATUSES = (429, 503)
+
+
+class ServerError(RuntimeError):
+    """The server answered with a 5xx status; worth retrying later."""
+
+    def __init__(self, status: int):
+        super().__init__(f"received status code {status}")
+        self.status = status
+        self.retry_after = None
+
+
+class Throttled(RuntimeError):
+    """The server answered 429 or 503; retry after retry_after seconds if it said so."""
+
+    def __init__(self, status: int, retry_after: float = None):
+        super().__init__(f"received status code {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str], max_delay: float = 60) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), capped at max_delay."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), max_delay)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class AdaptiveLimit:
+    """An AIMD-controlled limit on requests in flight to one host."""
+
+    def __init__(self, initial: float, maximum: int, minimum: int = 1, window: int = 10,
+                 latency_tolerance: float = 2.0, decrease_factor: float = 0.5, adaptive: bool = True):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(min(max(initial, self.minimum), self.maximum)) if adaptive else float(self.maximum)
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.saturated = False
+        self.latencies: List[float] = []
+        self.baseline: Optional[float] = None
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self._waiters = deque()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass back to release()."""
+        while True:
+            delay = self.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self.in_flight < int(self.limit):
+                break
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+        if self.in_flight >= int(self.limit):
+            self.saturated = True
+        return time.monotonic()
+
+    def release(self, started: float, outcome: str, latency: float = None) -> Optional[str]:
+        """
+        Free a slot and adjust the limit.
+
+        Args:
+            started: Value returned by acquire()
+            outcome: "ok", "overload" (429/503), "timeout" or "error" (no adjustment)
+            latency: Response time for "ok" outcomes
+
+        Returns:
+            The reason for a limit change, or None if it didn't change
+        """
+        self.in_flight -= 1
+        reason = None
+        if self.adaptive:
+            if outcome == "ok" and latency is not None:
+                self.latencies.append(latency)
+                if len(self.latencies) >= max(self.window, int(self.limit)):
+                    reason = self._evaluate_window()
+            elif outcome in ("overload", "timeout") and started >= self.last_decrease:
+                reason = self._decrease(outcome)
+        self._wake()
+        return reason
+
+    def _evaluate_window(self) -> Optional[str]:
+        p95 = percentile(self.latencies, 95)
+        saturated = self.saturated
+        self.latencies = []
+        self.saturated = False
+        if self.baseline is None:
+            self.baseline = p95
+        if p95 > self.baseline * self.latency_tolerance:
+            return self._decrease("latency")
+        # Let the baseline drift up slowly so a site that is uniformly slower later isn't punished forever
+        self.baseline = min(self.baseline * 1.1, p95)
+        if saturated and self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + 1)
+            return "increase"
+        return None
+
+    def _decrease(self, reason: str) -> Optional[str]:
+        new_limit = max(self.minimum, self.limit * self.decrease_factor)
+        self.last_decrease = time.monotonic()
+        self.latencies = []
+        if new_limit == self.limit:
+            return None
+        self.limit = new_limit
+        return reason
+
+    def pause(self, seconds: float):
+        """Hold back every new request to this host for `seconds`."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class ConcurrencyController:
+    """Adaptive concurrency limits keyed by host."""
+
+    def __init__(self, max_concurrency: int, config: Dict[str, Any] = None):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Ceiling for any one host's limit
+            config: The `concurrency` config section (see DEFAULT_CONCURRENCY_CONFIG)
+        """
+        self.config = {**DEFAULT_CONCURRENCY_CONFIG, **(config or {})}
+        self.max_concurrency = max_concurrency
+        self.limits: Dict[str, AdaptiveLimit] = {}
+        self.started = time.monotonic()
+        # (seconds since start, host, new limit, reason), oldest dropped first
+        self.trajectory: Deque[Tuple[float, str, int, str]] = deque(maxlen=self.config["trajectory_length"])
+        self.stats = {"increases": 0, "decreases": 0, "throttled_responses": 0, "timeouts": 0, "retry_after_pauses": 0}
+        self.peak: Dict[str, float] = {}
+
+    def _limit(self, url: str) -> AdaptiveLimit:
+        host = get_domain_from_url(url)
+        limit = self.limits.get(host)
+        if limit is None:
+            limit = self.limits[host] = AdaptiveLimit(
+                self.config["initial"],
+                self.max_concurrency,
+                minimum=self.config["min"],
+                window=self.config["window"],
+                latency_tolerance=self.config["latency_tolerance"],
+                decrease_factor=self.config["decrease_factor"],
+                adaptive=self.config["adaptive"]
+            )
+            self.peak[host] = limit.limit
+            self._record(host, limit.limit, "start")
+        return limit
+
+    def _record(self, host: str, value: float, reason: str):
+        self.trajectory.append((round(time.monotonic() - self.started, 3), host, int(value), reason))
+
+    async def acquire(self, url: str) -> float:
+        return await self._limit(url).acquire()
+
+    def release(self, url: str, started: float, outcome: str, latency: float = None):
+        host = get_domain_from_url(url)
+        if outcome == "overload":
+            self.stats["throttled_responses"] += 1
+        elif outcome == "timeout":
+            self.stats["timeouts"] += 1
+        limit = self.limits[host]
+        before = int(limit.limit)
+        reason = limit.release(started, outcome, latency)
+        if reason and int(limit.limit) != before:
+            self.stats["increases" if reason == "increase" else "decreases"] += 1
+            self.peak[host] = max(self.peak[host], limit.limit)
+            self._record(host, limit.limit, reason)
+
+    def pause(self, url: str, seconds: float):
+        """Honor a Retry-After for url's host."""
+        self.stats["retry_after_pauses"] += 1
+        self._limit(url).pause(seconds)
+
+    def get_limit(self, url: str) -> int:
+        return int(self._limit(url).limit)
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters and the per-host limit trajectory for the reports."""
+        return {
+            "adaptive": self.config["adaptive"],
+            "ceiling": self.max_concurrency,
+            **self.stats,
+            "final_limits": {host: int(limit.limit) for host, limit in self.limits.items()},
+            "peak_limits": {host: int(peak) for host, peak in self.peak.items()},
+            "trajectory": list(self.trajectory)
+        }
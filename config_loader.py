@@ -1,3 +1,4 @@
+import copy
 import yaml
 import os
 from pathlib import Path
@@ -39,6 +40,12 @@ class Config:
         else:
             raise ValueError(f"Preset '{preset_name}' not found")
     
+    def copy(self) -> 'Config':
+        """An independent copy (e.g. for per-site overrides)."""
+        clone = Config.__new__(Config)
+        clone._config = copy.deepcopy(self._config)
+        return clone
+    
     def get(self, section: str, key: str, default: Any = None) -> Any:
         """Get a configuration value."""
         return self._config.get(section, {}).get(key, default)
@@ -65,6 +72,76 @@ class Config:
         """Get all analysis configuration."""
         return self._config.get('analysis', {})
     
+    def get_network_config(self) -> Dict[str, Any]:
+        """Get connection pool and timeout configuration."""
+        return self._config.get('network', {})
+    
+    def get_cache_config(self) -> Dict[str, Any]:
+        """Get response cache configuration."""
+        return self._config.get('cache', {})
+    
+    def get_fetch_config(self) -> Dict[str, Any]:
+        """Get URL filtering and download size configuration."""
+        return self._config.get('fetch', {})
+    
+    def get_robots_config(self) -> Dict[str, Any]:
+        """Get robots.txt user agent and cache configuration."""
+        return self._config.get('robots', {})
+    
+    def get_concurrency_config(self) -> Dict[str, Any]:
+        """Get adaptive per-host concurrency configuration."""
+        return self._config.get('concurrency', {})
+    
+    def get_circuit_breaker_config(self) -> Dict[str, Any]:
+        """Get per-host circuit breaker configuration."""
+        return self._config.get('circuit_breaker', {})
+    
+    def get_checkpoint_config(self) -> Dict[str, Any]:
+        """Get crawl checkpoint configuration."""
+        return self._config.get('checkpoint', {})
+    
+    def get_incremental_config(self) -> Dict[str, Any]:
+        """Get incremental re-crawl configuration."""
+        return self._config.get('incremental', {})
+    
+    def get_multisite_config(self) -> Dict[str, Any]:
+        """Get multi-site crawl configuration."""
+        return self._config.get('multisite', {})
+    
+    def get_sharding_config(self) -> Dict[str, Any]:
+        """Get multi-process sharding configuration with 'auto' shards resolved."""
+        sharding = dict(self._config.get('sharding', {}))
+        if sharding.get('shards') == 'auto':
+            sharding['shards'] = os.cpu_count() or 1
+        return sharding
+    
+    def get_url_policy_config(self) -> Dict[str, Any]:
+        """Get URL normalization (dedup key) configuration."""
+        return self._config.get('url_policy', {})
+    
+    def get_url_table_config(self) -> Dict[str, Any]:
+        """Get visited-set (URL table) configuration."""
+        return self._config.get('url_table', {})
+    
+    def get_page_store_config(self) -> Dict[str, Any]:
+        """Get page record store (memory/disk spill) configuration."""
+        return self._config.get('page_store', {})
+    
+    def get_traps_config(self) -> Dict[str, Any]:
+        """Get crawler-trap detection configuration."""
+        return self._config.get('traps', {})
+    
+    def get_distributed_config(self) -> Dict[str, Any]:
+        """Get distributed crawl (coordinator/worker) configuration."""
+        return self._config.get('distributed', {})
+    
+    def get_extraction_config(self) -> Dict[str, Any]:
+        """Get extraction stage configuration with 'auto' workers resolved."""
+        extraction = dict(self._config.get('extraction', {}))
+        if extraction.get('workers') == 'auto':
+            extraction['workers'] = os.cpu_count() or 1
+        return extraction
+    
     @property
     def max_concurrency(self) -> int:
         return self.get('crawling', 'max_concurrency', 5)
@@ -89,10 +166,22 @@ class Config:
     def rate_limit(self) -> float:
         return self.get('crawling', 'rate_limit', 2.0)
     
+    @property
+    def rate_burst(self) -> int:
+        return self.get('crawling', 'rate_burst', 1)
+    
+    @property
+    def host_rate_limits(self) -> Dict[str, Any]:
+        return self.get('crawling', 'host_rate_limits', {}) or {}
+    
     @property
     def respect_robots_txt(self) -> bool:
         return self.get('crawling', 'respect_robots_txt', True)
     
+    @property
+    def stream_links(self) -> bool:
+        return self.get('crawling', 'stream_links', True)
+    
     @property
     def user_agent(self) -> str:
         return self.get('crawling', 'user_agent', 'SiteAnalyzer/1.0')
@@ -108,6 +197,14 @@ class Config:
     @property
     def max_depth(self) -> int:
         return self.get('analysis', 'max_depth', 5)
+    
+    @property
+    def page_type_priority(self) -> Dict[str, float]:
+        return self.get('analysis', 'page_type_priority', {}) or {}
+    
+    @property
+    def parser(self) -> str:
+        return self.get('analysis', 'parser', 'html.parser')
 
 
 def load_config(config_path: Optional[str] = None, preset: Optional[str] = None) -> Config:
@@ -1,8 +1,22 @@
 from urllib.parse import urlparse, urljoin
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
-def normalize_url(url):
+from parsers import get_parser_backend
+
+# URL suffixes categorize_page_type reports as "document"
+DOCUMENT_EXTENSIONS = ('.pdf', '.doc', '.docx', '.zip', '.tar.gz')
+
+def normalize_url(url, policy=None):
+    """
+    Dedup key of a URL: host and path, without scheme, www, port or trailing slash.
+
+    With a url_policy.URLPolicy the key also keeps the query parameters the
+    policy allows; without one the query string is dropped.
+    """
+    if policy is not None:
+        return policy.normalize(url)
     parsed = urlparse(url)
     netloc = parsed.netloc.lower()
     if '@' in netloc:
@@ -48,7 +62,7 @@ def categorize_page_type(url: str, html: str = None) -> str:
         return "static"
     elif any(x in url_lower for x in ['/search', '/results']):
         return "search"
-    elif url_lower.endswith(('.pdf', '.doc', '.docx', '.zip', '.tar.gz')):
+    elif url_lower.endswith(DOCUMENT_EXTENSIONS):
         return "document"
     elif url_lower.count('/') <= 3 and not url_lower.split('/')[-1]:
         return "homepage"
@@ -114,20 +128,54 @@ def get_images_from_html(html, base_url):
             image_urls.append(absolute_url)
     return image_urls
 
-def extract_page_data(html, page_url):
-    classified_links = get_classified_links(html, page_url)
-    
+class StreamingLinkExtractor(HTMLParser):
+    """Incremental tokenizer that reports <a href> targets while the body is still arriving."""
+
+    def __init__(self, base_url: str, on_link: Callable[[str], None]):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.on_link = on_link
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = None
+        for name, value in attrs:
+            if name == 'href':
+                href = value  # last duplicate wins, as with BeautifulSoup
+        if href:
+            self.on_link(urljoin(self.base_url, href))
+
+def extract_page_data(html, page_url, parser=None):
+    """Extract every page field from a single parse with the chosen parser backend."""
+    h1, first_paragraph, hrefs, srcs, canonical_href = get_parser_backend(parser).extract(html)
+    base_domain = get_domain_from_url(page_url)
+
+    outgoing_links = []
+    internal_links = []
+    external_links = []
+    for href in hrefs:
+        absolute_url = urljoin(page_url, href)
+        outgoing_links.append(absolute_url)
+        if classify_link(absolute_url, base_domain) == "internal":
+            internal_links.append(absolute_url)
+        else:
+            external_links.append(absolute_url)
+
+    image_urls = [urljoin(page_url, src) for src in srcs]
+
     return {
         "url": page_url,
-        "h1": get_h1_from_html(html),
-        "first_paragraph": get_first_paragraph_from_html(html),
-        "outgoing_links": get_urls_from_html(html, page_url),
-        "internal_links": classified_links["internal"],
-        "external_links": classified_links["external"],
-        "internal_link_count": len(classified_links["internal"]),
-        "external_link_count": len(classified_links["external"]),
-        "total_link_count": len(classified_links["all"]),
-        "image_urls": get_images_from_html(html, page_url),
-        "image_count": len(get_images_from_html(html, page_url)),
-        "page_type": categorize_page_type(page_url, html)
-    }
\ No newline at end of file
+        "h1": h1,
+        "first_paragraph": first_paragraph,
+        "outgoing_links": outgoing_links,
+        "internal_links": internal_links,
+        "external_links": external_links,
+        "internal_link_count": len(internal_links),
+        "external_link_count": len(external_links),
+        "total_link_count": len(internal_links) + len(external_links),
+        "image_urls": image_urls,
+        "image_count": len(image_urls),
+        "page_type": categorize_page_type(page_url, html),
+        "canonical_url": urljoin(page_url, canonical_href.strip()) if canonical_href else None
+    }
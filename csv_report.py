@@ -4,7 +4,8 @@ def write_csv_report(page_data, filename="report.csv"):
     """Write page data to a CSV file.
     
     Args:
-        page_data: Dictionary of page data (keys are normalized URLs)
+        page_data: Page data keyed by normalized URL (a dict or page_store.PageStore;
+            rows are written as the records are read)
         filename: Output CSV filename (default: report.csv)
     """
     fieldnames = ["page_url", "h1", "first_paragraph", "outgoing_link_urls", "image_urls"]
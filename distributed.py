@@ -0,0 +1,699 @@
+"""
+Distributed crawling: one coordinator, any number of worker processes or nodes.
+
+The coordinator owns a SharedFrontier: the queue of URLs to crawl, the set
+of URLs already seen and the sink for finished page records. Workers lease
+batches of URLs from it, crawl them with an ordinary AsyncCrawler, send the
+links they discover back to the frontier and hand in the page records.
+
+A lease expires after lease_seconds unless the worker extends it (workers
+do so while a batch is still being crawled), so the URLs of a worker that
+died or hung are reclaimed and leased to another worker. A URL whose lease
+expires max_attempts times is recorded as an error.
+
+SQLiteFrontier is the built-in implementation. Local processes can share
+its database file directly; workers on other machines talk to it through
+FrontierServer / RemoteFrontier, a JSON-lines protocol over TCP. The server
+refuses to listen beyond the loopback interface without a token.
+
+As in sharded mode, each worker gets its share of max_concurrency and the
+rate limits (including robots.txt Crawl-delay); max_pages and max_depth are
+enforced by the frontier for the whole crawl.
+"""
+
+import asyncio
+import ipaddress
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from crawl import normalize_url
+from url_policy import URLPolicy
+from main import AsyncCrawler
+from page_store import build_page_store
+from sharding import shard_options
+
+
+DEFAULT_DISTRIBUTED_CONFIG = {
+    "listen": "127.0.0.1:8700",
+    "token": None,
+    "workers": 0,
+    "batch_size": 50,
+    "lease_seconds": 60,
+    "max_attempts": 3,
+    "poll_interval": 0.5,
+}
+
+FRONTIER_FILENAME = "frontier.sqlite3"
+
+# (url, depth, parent_url)
+Link = Tuple[str, int, Optional[str]]
+
+
+class SharedFrontier:
+    """
+    Frontier, visited set and result sink shared by the workers of a crawl.
+
+    Every method is a coroutine so implementations may live in another
+    process or on another machine.
+    """
+
+    async def info(self) -> Dict[str, Any]:
+        """Crawl settings for workers: base_url, workers, max_pages."""
+        raise NotImplementedError
+
+    async def add(self, links: List[Link]) -> int:
+        """Queue links not seen before (within max_pages and max_depth); returns how many were new."""
+        raise NotImplementedError
+
+    async def lease(self, worker_id: str, count: int, lease_seconds: float) -> List[Link]:
+        """Hand up to count queued URLs to worker_id until the lease expires."""
+        raise NotImplementedError
+
+    async def extend(self, worker_id: str, urls: List[str], lease_seconds: float) -> int:
+        """Push back the expiry of worker_id's leases on urls; returns how many it still held."""
+        raise NotImplementedError
+
+    async def complete(self, worker_id: str, urls: List[str], pages: Dict[str, Dict[str, Any]]) -> int:
+        """Finish leased urls, storing a page record for those in pages (the rest were skipped); returns how many were accepted."""
+        raise NotImplementedError
+
+    async def finished(self) -> bool:
+        """True once nothing is queued or leased."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SQLiteFrontier(SharedFrontier):
+    """
+    SharedFrontier in a SQLite database (WAL mode, safe to share between local processes).
+
+    The coroutines run their queries on a single database thread, so a
+    transaction waiting for another process's lock never blocks the event loop.
+    """
+
+    def __init__(self, path: str, base_url: str = None, max_pages: int = 0, max_depth: int = 0,
+                 workers: int = 1, max_attempts: int = 3, url_policy: Dict[str, Any] = None):
+        """
+        Open (or create) a frontier database.
+
+        Args:
+            path: Database file
+            base_url: Starting URL; set by the coordinator, read from the file by workers
+            max_pages: Accept at most this many distinct URLs (0 for no limit)
+            max_depth: Drop URLs deeper than this (0 for unlimited)
+            workers: Expected number of workers, used to split rate limits
+            max_attempts: Expired leases before a URL is given up on
+            url_policy: The url_policy config section; workers normalize URLs with the same one
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Only ever used by one thread at a time: this one until __init__ returns, then the database thread
+        self.db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frontier-db")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                normalized_url TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                parent_url TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS urls_by_state ON urls (state, depth);
+            CREATE TABLE IF NOT EXISTS pages (
+                normalized_url TEXT PRIMARY KEY,
+                worker TEXT,
+                data TEXT NOT NULL
+            );
+        """)
+        with self._transaction():
+            if base_url is not None:
+                settings = {"base_url": base_url, "max_pages": max_pages, "max_depth": max_depth,
+                            "workers": workers, "max_attempts": max_attempts, "url_policy": url_policy or {}}
+                self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                    [(key, json.dumps(value)) for key, value in settings.items()])
+            # Running count of the URLs that use up max_pages, so add() never has to count the table
+            self.db.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "SELECT 'accepted', COUNT(*) FROM urls WHERE state != 'skipped'"
+            )
+        self.settings = {key: json.loads(value) for key, value in
+                         self.db.execute("SELECT key, value FROM meta WHERE key != 'accepted'")}
+        self.url_policy = URLPolicy(self.settings.get("url_policy"))
+        self.stats = {"reclaimed": 0, "abandoned": 0, "lease_extensions": 0, "stale_completions": 0}
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+    async def _run(self, function, *args):
+        """Run function(*args) on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def info(self) -> Dict[str, Any]:
+        return dict(self.settings)
+
+    async def add(self, links: List[Link]) -> int:
+        return await self._run(self._add, links)
+
+    def _add(self, links: List[Link]) -> int:
+        max_pages = self.settings.get("max_pages", 0)
+        max_depth = self.settings.get("max_depth", 0)
+        added = 0
+        with self._transaction():
+            # URLs the workers skipped (robots.txt, off-site redirects) don't use up the budget
+            total = int(self.db.execute("SELECT value FROM meta WHERE key = 'accepted'").fetchone()[0])
+            for url, depth, parent_url in links:
+                if max_depth and depth > max_depth:
+                    continue
+                normalized_url = normalize_url(url, self.url_policy)
+                if not max_pages or total < max_pages:
+                    inserted = self.db.execute(
+                        "INSERT OR IGNORE INTO urls (normalized_url, url, depth, parent_url) VALUES (?, ?, ?, ?)",
+                        (normalized_url, url, depth, parent_url)
+                    ).rowcount
+                    total += inserted
+                    added += inserted
+                    if inserted:
+                        continue
+                # Seen before: move it up if it is still waiting at a greater depth
+                self.db.execute(
+                    "UPDATE urls SET depth = ?, parent_url = ? WHERE normalized_url = ? AND state = 'queued' AND depth > ?",
+                    (depth, parent_url, normalized_url, depth)
+                )
+            if added:
+                self.db.execute("UPDATE meta SET value = ? WHERE key = 'accepted'", (total,))
+        return added
+
+    def reclaim_expired(self) -> int:
+        """Put URLs whose lease ran out back in the queue (or give up on them)."""
+        now = time.time()
+        max_attempts = self.settings.get("max_attempts", 3)
+        with self._transaction():
+            expired = self.db.execute(
+                "SELECT normalized_url, url, depth, attempts FROM urls WHERE state = 'leased' AND lease_expires < ?",
+                (now,)
+            ).fetchall()
+            for normalized_url, url, depth, attempts in expired:
+                if attempts >= max_attempts:
+                    self.db.execute("UPDATE urls SET state = 'done', worker = NULL WHERE normalized_url = ?",
+                                    (normalized_url,))
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO pages (normalized_url, worker, data) VALUES (?, NULL, ?)",
+                        (normalized_url, json.dumps({
+                            "url": url,
+                            "error": f"lease expired {attempts} times without a result",
+                            "depth": depth,
+                            "incoming_link_count": 0
+                        }))
+                    )
+                    self.stats["abandoned"] += 1
+                else:
+                    self.db.execute("UPDATE urls SET state = 'queued', worker = NULL WHERE normalized_url = ?",
+                                    (normalized_url,))
+                    self.stats["reclaimed"] += 1
+        return len(expired)
+
+    async def lease(self, worker_id: str, count: int, lease_seconds: float) -> List[Link]:
+        return await self._run(self._lease, worker_id, count, lease_seconds)
+
+    def _lease(self, worker_id: str, count: int, lease_seconds: float) -> List[Link]:
+        self.reclaim_expired()
+        with self._transaction():
+            rows = self.db.execute(
+                "SELECT normalized_url, url, depth, parent_url FROM urls WHERE state = 'queued' "
+                "ORDER BY depth, rowid LIMIT ?",
+                (count,)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE urls SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE normalized_url = ?",
+                [(worker_id, time.time() + lease_seconds, row[0]) for row in rows]
+            )
+        return [(url, depth, parent_url) for _, url, depth, parent_url in rows]
+
+    async def extend(self, worker_id: str, urls: List[str], lease_seconds: float) -> int:
+        return await self._run(self._extend, worker_id, urls, lease_seconds)
+
+    def _extend(self, worker_id: str, urls: List[str], lease_seconds: float) -> int:
+        with self._transaction():
+            extended = self.db.executemany(
+                "UPDATE urls SET lease_expires = ? WHERE normalized_url = ? AND state = 'leased' AND worker = ?",
+                [(time.time() + lease_seconds, normalize_url(url, self.url_policy), worker_id) for url in urls]
+            ).rowcount
+        self.stats["lease_extensions"] += extended
+        return extended
+
+    async def complete(self, worker_id: str, urls: List[str], pages: Dict[str, Dict[str, Any]]) -> int:
+        return await self._run(self._complete, worker_id, urls, pages)
+
+    def _complete(self, worker_id: str, urls: List[str], pages: Dict[str, Dict[str, Any]]) -> int:
+        accepted = 0
+        skipped = 0
+        with self._transaction():
+            for url in urls:
+                normalized_url = normalize_url(url, self.url_policy)
+                # Only the current lease holder may finish a URL; a reclaimed lease's late result is dropped
+                if not self.db.execute(
+                    "UPDATE urls SET state = 'done', worker = NULL WHERE normalized_url = ? AND state = 'leased' AND worker = ?",
+                    (normalized_url, worker_id)
+                ).rowcount:
+                    self.stats["stale_completions"] += 1
+                    continue
+                accepted += 1
+                if normalized_url not in pages:
+                    self.db.execute("UPDATE urls SET state = 'skipped' WHERE normalized_url = ?", (normalized_url,))
+                    skipped += 1
+                else:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO pages (normalized_url, worker, data) VALUES (?, ?, ?)",
+                        (normalized_url, worker_id, json.dumps(pages[normalized_url]))
+                    )
+            if skipped:
+                # Skipped URLs give their place in the page budget back
+                self.db.execute("UPDATE meta SET value = CAST(value AS INTEGER) - ? WHERE key = 'accepted'",
+                                (skipped,))
+        return accepted
+
+    async def finished(self) -> bool:
+        return await self._run(self._finished)
+
+    def _finished(self) -> bool:
+        return self.db.execute(
+            "SELECT NOT EXISTS(SELECT 1 FROM urls WHERE state IN ('queued', 'leased'))"
+        ).fetchone()[0] == 1
+
+    async def reclaim(self) -> int:
+        """reclaim_expired() on the database thread."""
+        return await self._run(self.reclaim_expired)
+
+    async def lease_holders(self) -> List[str]:
+        """Workers holding a lease that hasn't expired yet."""
+        return await self._run(self._lease_holders)
+
+    def _lease_holders(self) -> List[str]:
+        return [worker for worker, in self.db.execute(
+            "SELECT DISTINCT worker FROM urls WHERE state = 'leased' AND lease_expires >= ?", (time.time(),)
+        )]
+
+    async def collect(self, page_data) -> Dict[str, Any]:
+        """Copy every finished page record into page_data and return summary(), on the database thread."""
+        def collect():
+            page_data.update(self.load_pages())
+            return self.summary()
+        return await self._run(collect)
+
+    def load_pages(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (normalized_url, page record) for every finished page."""
+        for normalized_url, data in self.db.execute("SELECT normalized_url, data FROM pages"):
+            yield normalized_url, json.loads(data)
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        states = dict(self.db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall())
+        per_worker = dict(self.db.execute(
+            "SELECT worker, COUNT(*) FROM pages WHERE worker IS NOT NULL GROUP BY worker"
+        ).fetchall())
+        return {
+            "urls": sum(states.values()),
+            "done": states.get("done", 0),
+            "queued": states.get("queued", 0),
+            "leased": states.get("leased", 0),
+            "skipped": states.get("skipped", 0),
+            **self.stats,
+            "pages_per_worker": per_worker
+        }
+
+    async def close(self):
+        await self._run(self.db.close)
+        self._executor.shutdown()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent processes never lease the same row."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """'host:port' -> (host, port)."""
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got {address!r}")
+    return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    """True if host only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class FrontierServer:
+    """Serves a SharedFrontier to remote workers as JSON lines over TCP."""
+
+    OPERATIONS = ("info", "add", "lease", "extend", "complete", "finished")
+
+    def __init__(self, frontier: SharedFrontier, host: str = "127.0.0.1", port: int = 8700, token: str = None):
+        """
+        Initialize the server.
+
+        Args:
+            frontier: The frontier to serve
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            token: Shared secret workers must present (None for no check, only allowed on a loopback host)
+        """
+        if token is None and not is_loopback(host):
+            raise ValueError(f"Serving the frontier on {host} needs a token; set distributed.token or --token")
+        self.frontier = frontier
+        self.host = host
+        self.port = port
+        self.token = token
+        self.server = None
+        self.requests = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=64 * 1024 * 1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                self.requests += 1
+                try:
+                    response = json.dumps(await self._respond(json.loads(line)))
+                except Exception as exc:
+                    # Every request gets a reply, so a worker never waits on a connection that will not answer
+                    response = json.dumps({"error": f"{type(exc).__name__}: {exc}"})
+                writer.write(response.encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Dropped connection or a line over the stream limit
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.token is not None and request.get("token") != self.token:
+            return {"error": "invalid token"}
+        if request.get("op") not in self.OPERATIONS:
+            return {"error": f"unknown operation {request.get('op')!r}"}
+        return {"result": await getattr(self.frontier, request["op"])(*request.get("args", []))}
+
+
+class RemoteFrontier(SharedFrontier):
+    """SharedFrontier client for a FrontierServer."""
+
+    def __init__(self, host: str, port: int, token: str = None, connect_timeout: float = 30):
+        """
+        Initialize the client.
+
+        Args:
+            host: Coordinator host
+            port: Coordinator port
+            token: Shared secret configured on the coordinator
+            connect_timeout: Keep retrying the first connection this long, so workers may start first
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.connect_timeout = connect_timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def _call(self, op: str, *args):
+        async with self._lock:
+            if self._writer is None:
+                await self._connect()
+            self._writer.write(json.dumps({"op": op, "args": args, "token": self.token}).encode() + b"\n")
+            await self._writer.drain()
+            line = await self._reader.readline()
+        if not line:
+            raise ConnectionError(f"coordinator at {self.host}:{self.port} closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"coordinator refused {op}: {response['error']}")
+        return response["result"]
+
+    async def _connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port,
+                                                                           limit=64 * 1024 * 1024)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                await asyncio.sleep(0.5)
+
+    async def info(self) -> Dict[str, Any]:
+        return await self._call("info")
+
+    async def add(self, links: List[Link]) -> int:
+        return await self._call("add", links)
+
+    async def lease(self, worker_id: str, count: int, lease_seconds: float) -> List[Link]:
+        return [tuple(link) for link in await self._call("lease", worker_id, count, lease_seconds)]
+
+    async def extend(self, worker_id: str, urls: List[str], lease_seconds: float) -> int:
+        return await self._call("extend", worker_id, urls, lease_seconds)
+
+    async def complete(self, worker_id: str, urls: List[str], pages: Dict[str, Dict[str, Any]]) -> int:
+        return await self._call("complete", worker_id, urls, pages)
+
+    async def finished(self) -> bool:
+        return await self._call("finished")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class WorkerRouter:
+    """
+    The crawler's link router in a worker (see AsyncCrawler's shard hook).
+
+    The worker only crawls the URLs it has leased; every other link it
+    discovers is buffered for the shared frontier.
+    """
+
+    def __init__(self, workers: int):
+        self.shards = workers  # rate limits are shared by this many workers
+        self.leased = set()
+        self.pending: List[Link] = []
+        self.links_sent = 0
+
+    def owns(self, normalized_url: str) -> bool:
+        return normalized_url in self.leased
+
+    def forward(self, url: str, depth: int, parent_url: Optional[str], normalized_url: str):
+        self.pending.append((url, depth, parent_url))
+
+    async def flush(self, frontier: SharedFrontier):
+        if self.pending:
+            links, self.pending = self.pending, []
+            self.links_sent += len(links)
+            await frontier.add(links)
+
+
+async def run_worker(frontier: SharedFrontier, options: Dict[str, Any] = None, worker_id: str = None,
+                     batch_size: int = 50, lease_seconds: float = 60, poll_interval: float = 0.5) -> Dict[str, Any]:
+    """
+    Lease and crawl batches of URLs until the frontier reports the crawl finished.
+
+    Args:
+        frontier: The shared frontier (SQLiteFrontier or RemoteFrontier)
+        options: AsyncCrawler keyword arguments from this worker's config
+        worker_id: Name used for leases (default: host-pid)
+        batch_size: URLs per lease
+        lease_seconds: Lease length; leases are extended every third of it while a batch runs
+        poll_interval: Wait between lease attempts while other workers hold the remaining URLs
+
+    Returns:
+        Worker statistics
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    info = await frontier.info()
+    router = WorkerRouter(max(1, info.get("workers") or 1))
+    options = shard_options(options or {}, router.shards, 0)
+    # The frontier enforces the crawl's page budget and depth
+    options.update(max_pages=info.get("max_pages") or 10 ** 9, max_depth=0)
+    # Page keys must match the coordinator's
+    options["url_policy"] = info.get("url_policy")
+    stats = {"worker": worker_id, "batches": 0, "pages": 0, "leases_extended": 0}
+
+    async with AsyncCrawler(info["base_url"], shard=router, **options) as crawler:
+        workers = crawler.start_workers()
+        try:
+            while True:
+                batch = await frontier.lease(worker_id, batch_size, lease_seconds)
+                if not batch:
+                    if await frontier.finished():
+                        break
+                    await asyncio.sleep(poll_interval)
+                    continue
+                stats["batches"] += 1
+                urls = [url for url, _, _ in batch]
+                router.leased = {normalize_url(url, crawler.url_policy) for url in urls}
+                for url, depth, parent_url in batch:
+                    # A reclaimed lease can hand this worker a URL it has seen before; crawl it again
+                    crawler.enqueue_link(url, depth, parent_url, recrawl=True)
+
+                async def keep_leases():
+                    while True:
+                        await asyncio.sleep(lease_seconds / 3)
+                        keys = {url: normalize_url(url, crawler.url_policy) for url in urls}
+                        unfinished = [url for url in urls if keys[url] not in crawler.page_data
+                                      or crawler.page_data[keys[url]].get("status") == "pending"]
+                        stats["leases_extended"] += await frontier.extend(worker_id, unfinished, lease_seconds)
+
+                renewer = asyncio.create_task(keep_leases())
+                try:
+                    await crawler.wait_until_idle()
+                finally:
+                    renewer.cancel()
+                await router.flush(frontier)
+                # Hand the records in and drop them here so memory stays flat
+                pages = {normalized_url: crawler.page_data.pop(normalized_url)
+                         for normalized_url in router.leased if normalized_url in crawler.page_data}
+                stats["pages"] += len(pages)
+                await frontier.complete(worker_id, urls, pages)
+        finally:
+            await crawler.stop_workers(workers)
+    stats["links_sent"] = router.links_sent
+    return stats
+
+
+def _worker_process(address: Tuple[str, int], token: Optional[str], options: Dict[str, Any], settings: Dict[str, Any]):
+    """Process entry point for a local worker."""
+    async def main():
+        frontier = RemoteFrontier(*address, token=token)
+        try:
+            await run_worker(frontier, options, **settings)
+        finally:
+            await frontier.close()
+    if not settings.pop("verbose", True):
+        sys.stdout = open(os.devnull, "w")
+    asyncio.run(main())
+
+
+async def run_coordinator(base_url: str, path: str, options: Dict[str, Any] = None, listen: str = "127.0.0.1:8700",
+                          token: str = None, workers: int = 0, local_workers: int = 0, batch_size: int = 50,
+                          lease_seconds: float = 60, max_attempts: int = 3, poll_interval: float = 0.5,
+                          verbose: bool = True) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Coordinate a distributed crawl until every URL is done.
+
+    Args:
+        base_url: Starting URL
+        path: Frontier database file
+        options: AsyncCrawler keyword arguments; max_pages and max_depth apply to the whole crawl,
+            the rest are used by local workers
+        listen: HOST:PORT to serve the frontier on
+        token: Shared secret for workers (None for no check)
+        workers: Expected number of workers, local and remote (0 = local_workers), for splitting rate limits
+        local_workers: Worker processes to start on this machine
+        batch_size: URLs per lease (local workers)
+        lease_seconds: Lease length (local workers)
+        max_attempts: Expired leases before a URL is recorded as an error
+        poll_interval: How often to reclaim expired leases and check for the end of the crawl
+        verbose: Let local workers print their progress
+
+    Returns:
+        (page_data from every worker, spilling to disk as options["page_store"] says; crawl statistics)
+
+    Raises:
+        RuntimeError: If every local worker exited before the crawl finished and no remote worker holds a lease
+    """
+    options = dict(options or {})
+    options.pop("score", None)
+    host, port = parse_address(listen)
+    frontier = SQLiteFrontier(path, base_url, max_pages=options.get("max_pages", 0),
+                              max_depth=options.get("max_depth", 0), workers=workers or local_workers or 1,
+                              max_attempts=max_attempts, url_policy=options.get("url_policy"))
+    try:
+        server = FrontierServer(frontier, host, port, token)
+        await frontier.add([(base_url, 0, None)])
+        await server.start()
+    except Exception:
+        await frontier.close()
+        raise
+    print(f"Coordinator serving the frontier on {host}:{server.port}")
+
+    context = multiprocessing.get_context("spawn")
+    settings = {"batch_size": batch_size, "lease_seconds": lease_seconds, "poll_interval": poll_interval,
+                "verbose": verbose}
+    processes = [context.Process(target=_worker_process, args=((host, server.port), token, options, dict(settings)),
+                                 daemon=True)
+                 for _ in range(local_workers)]
+    started = time.time()
+    for process in processes:
+        process.start()
+    # Local workers lease under their default id, host-pid
+    local_ids = {f"{socket.gethostname()}-{process.pid}" for process in processes}
+    try:
+        try:
+            while not await frontier.finished():
+                await asyncio.sleep(poll_interval)
+                await frontier.reclaim()
+                if processes and all(process.exitcode is not None for process in processes):
+                    # With no local worker left, only a remote worker's live lease can still make progress
+                    remote = set(await frontier.lease_holders()) - local_ids
+                    if not remote and not await frontier.finished():
+                        codes = ", ".join(str(process.exitcode) for process in processes)
+                        raise RuntimeError(f"all {len(processes)} local workers exited (exit codes {codes}) "
+                                           f"before the crawl finished")
+            # Workers see the crawl finished on their next lease
+            for process in processes:
+                await asyncio.to_thread(process.join, 30)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            await server.close()
+    except Exception:
+        await frontier.close()
+        raise
+
+    elapsed = time.time() - started
+    page_data = build_page_store(options.get("page_store"))
+    stats = {**await frontier.collect(page_data), "elapsed": elapsed, "requests": server.requests,
+             "pages_per_second": len(page_data) / elapsed if elapsed > 0 else 0.0}
+    await frontier.close()
+    return page_data, {"distributed": stats}
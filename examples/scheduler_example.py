@@ -3,6 +3,7 @@
 Example scheduler for periodic site analysis.
 
 This script demonstrates how to schedule periodic crawls using the schedule library.
+Sites that share a schedule and preset are crawled together in one run.
 Install: pip install schedule
 """
 
@@ -15,7 +16,9 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from analyze import run_analysis
+from analyze import run_multi_site
+from checkpoint import checkpoint_path
+from urllib.parse import urlparse
 import argparse
 
 
@@ -24,29 +27,66 @@ SITES_TO_MONITOR = [
     {
         "url": "https://example.com",
         "preset": "quick_scan",
-        "schedule": "daily"  # Options: hourly, daily, weekly
+        "schedule": "daily",  # Options: hourly, daily, weekly
+        "cache_dir": ".cache/example_com",  # Re-crawls only download pages that changed
+        "incremental": True  # Reuse the last run's results for unchanged pages and write diff.json
     },
     # Add more sites here
 ]
 
 
-def analyze_site(site_config):
-    """Run analysis for a single site."""
+def latest_run_dir(url, output_base='output'):
+    """Most recent output directory for url that has a crawl checkpoint."""
+    site_name = urlparse(url).netloc.replace('www.', '').replace('.', '_')
+    runs = sorted(Path(output_base).glob(f"{site_name}_*"), reverse=True)
+    for run_dir in runs:
+        if checkpoint_path(run_dir).exists():
+            return str(run_dir)
+    return None
+
+
+def site_job(site_config):
+    """Per-site budgets and state for a multi-site run."""
+    return {
+        "url": site_config['url'],
+        "cache_dir": site_config.get('cache_dir'),
+        "incremental": latest_run_dir(site_config['url']) if site_config.get('incremental') else None
+    }
+
+
+def analyze_sites(sites):
+    """Run one concurrent analysis of several sites."""
+    urls = ", ".join(site['url'] for site in sites)
     print(f"\n{'='*60}")
-    print(f"Starting scheduled analysis: {site_config['url']}")
+    print(f"Starting scheduled analysis: {urls}")
     print(f"{'='*60}\n")
     
     # Create args namespace
     args = argparse.Namespace(
-        url=site_config['url'],
+        url=[],
         config=None,
-        preset=site_config.get('preset'),
+        preset=sites[0].get('preset'),
         max_pages=None,
         max_concurrency=None,
         max_depth=None,
         timeout=None,
         max_retries=None,
         rate_limit=None,
+        ignore_robots=False,
+        head_probe=False,
+        max_body_mb=None,
+        cache_dir=None,
+        parser=None,
+        parse_workers=None,
+        replay=None,
+        resume=None,
+        incremental=None,
+        jobs=None,
+        total_concurrency=None,
+        shards=None,
+        coordinator=None,
+        local_workers=None,
+        worker=None,
         output='output',
         formats=['all'],
         no_visualization=False,
@@ -55,25 +95,28 @@ def analyze_site(site_config):
     )
     
     try:
-        asyncio.run(run_analysis(args))
-        print(f"\nAnalysis completed successfully for {site_config['url']}")
+        asyncio.run(run_multi_site(args, jobs=[site_job(site) for site in sites]))
+        print(f"\nAnalysis completed for {urls}")
     except Exception as e:
-        print(f"\nError analyzing {site_config['url']}: {e}")
+        print(f"\nError analyzing {urls}: {e}")
 
 
 def schedule_jobs():
-    """Schedule all configured jobs."""
+    """Schedule all configured jobs, one run per schedule and preset."""
+    groups = {}
     for site in SITES_TO_MONITOR:
-        job_schedule = site.get('schedule', 'daily')
-        
+        key = (site.get('schedule', 'daily'), site.get('preset'))
+        groups.setdefault(key, []).append(site)
+    
+    for (job_schedule, _), sites in groups.items():
         if job_schedule == 'hourly':
-            schedule.every().hour.do(analyze_site, site)
+            schedule.every().hour.do(analyze_sites, sites)
         elif job_schedule == 'daily':
-            schedule.every().day.at("02:00").do(analyze_site, site)
+            schedule.every().day.at("02:00").do(analyze_sites, sites)
         elif job_schedule == 'weekly':
-            schedule.every().monday.at("02:00").do(analyze_site, site)
+            schedule.every().monday.at("02:00").do(analyze_sites, sites)
         
-        print(f"Scheduled {job_schedule} analysis for {site['url']}")
+        print(f"Scheduled {job_schedule} analysis for {', '.join(site['url'] for site in sites)}")
 
 
 def main():
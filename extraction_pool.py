@@ -0,0 +1,176 @@
+"""
+Process-pool page extraction stage for the async crawler.
+
+Parsing is CPU-bound, so running extract_page_data on the event loop stalls
+every in-flight request and caps the crawl at one core. ExtractionPool ships
+raw response bytes to worker processes and gets back a compact tuple, which
+is expanded into the usual page record in the parent.
+
+Small pages are batched into one executor call to amortize IPC overhead;
+in-flight executor calls are bounded so a fast fetcher cannot queue up an
+unbounded backlog of bodies in memory.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawl import extract_page_data
+
+
+def decode_body(body: bytes, encoding: str) -> str:
+    """Decode a response body, falling back to UTF-8 for unknown charsets."""
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def pack_page_data(data: Dict[str, Any]) -> Tuple:
+    """
+    Shrink a page record for IPC.
+
+    internal_links and external_links are a partition of outgoing_links, so
+    only outgoing_links is sent along with one internal/external flag byte
+    per link. Counts are recomputed on unpack.
+    """
+    internal = set(data["internal_links"])
+    flags = bytes(1 if link in internal else 0 for link in data["outgoing_links"])
+    return (
+        data["h1"],
+        data["first_paragraph"],
+        data["outgoing_links"],
+        flags,
+        data["image_urls"],
+        data["page_type"],
+        data["canonical_url"]
+    )
+
+
+def unpack_page_data(packed: Tuple, page_url: str) -> Dict[str, Any]:
+    """Rebuild the extract_page_data record from pack_page_data output."""
+    h1, first_paragraph, outgoing_links, flags, image_urls, page_type, canonical_url = packed
+    internal_links = [link for link, flag in zip(outgoing_links, flags) if flag]
+    external_links = [link for link, flag in zip(outgoing_links, flags) if not flag]
+    return {
+        "url": page_url,
+        "h1": h1,
+        "first_paragraph": first_paragraph,
+        "outgoing_links": outgoing_links,
+        "internal_links": internal_links,
+        "external_links": external_links,
+        "internal_link_count": len(internal_links),
+        "external_link_count": len(external_links),
+        "total_link_count": len(outgoing_links),
+        "image_urls": image_urls,
+        "image_count": len(image_urls),
+        "page_type": page_type,
+        "canonical_url": canonical_url
+    }
+
+
+def _extract_packed(job: Tuple[bytes, str, str, Optional[str]]) -> Tuple:
+    """Worker entry point: decode, extract and pack one page."""
+    body, encoding, page_url, parser = job
+    return pack_page_data(extract_page_data(decode_body(body, encoding), page_url, parser))
+
+
+def _extract_batch(jobs: List[Tuple]) -> List[Any]:
+    """Worker entry point for a batch; a failing page returns its exception instead of sinking the batch."""
+    results = []
+    for job in jobs:
+        try:
+            results.append(_extract_packed(job))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+class ExtractionPool:
+    """Run page extraction inline or in a pool of worker processes."""
+
+    def __init__(self, workers: int = 0, parser: str = None, max_in_flight: int = 0,
+                 batch_max_bytes: int = 32 * 1024, batch_size: int = 8, batch_delay: float = 0.005):
+        """
+        Initialize the extraction stage.
+
+        Args:
+            workers: Worker processes; 0 extracts inline on the event loop
+            parser: Parser backend name passed to extract_page_data
+            max_in_flight: Executor calls allowed at once (0 for 2x workers)
+            batch_max_bytes: Pages up to this size are batched together
+            batch_size: Flush a batch once it holds this many pages
+            batch_delay: Flush a partial batch after this many seconds
+        """
+        self.workers = workers
+        self.parser = parser
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._slots = asyncio.Semaphore(max_in_flight or workers * 2) if workers > 0 else None
+        self._pending = []  # [(job, future)] waiting for the next batch flush
+        self._flush_handle = None
+        self._batch_tasks = set()
+        self.stats = {"pages": 0, "batches": 0, "batched_pages": 0, "single_pages": 0}
+
+    async def extract(self, body: bytes, encoding: str, page_url: str) -> Dict[str, Any]:
+        """Extract a page record from a raw response body."""
+        self.stats["pages"] += 1
+        if self._executor is None:
+            return extract_page_data(decode_body(body, encoding), page_url, self.parser)
+
+        job = (body, encoding, page_url, self.parser)
+        loop = asyncio.get_running_loop()
+
+        if len(body) > self.batch_max_bytes:
+            self.stats["single_pages"] += 1
+            async with self._slots:
+                packed = await loop.run_in_executor(self._executor, _extract_packed, job)
+            return unpack_page_data(packed, page_url)
+
+        future = loop.create_future()
+        self._pending.append((job, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return unpack_page_data(await future, page_url)
+
+    def _flush(self):
+        """Hand the pending small pages to a worker as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch):
+        self.stats["batches"] += 1
+        self.stats["batched_pages"] += len(batch)
+        jobs = [job for job, _ in batch]
+        try:
+            async with self._slots:
+                results = await asyncio.get_running_loop().run_in_executor(self._executor, _extract_batch, jobs)
+        except Exception as exc:
+            results = [exc] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Shut down the worker processes."""
+        self._flush()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
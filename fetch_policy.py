@@ -0,0 +1,122 @@
+"""
+Decide which URLs and responses are worth downloading.
+
+Links whose path ends in a document, archive or media extension are never
+queued. An optional HEAD probe checks Content-Type and Content-Length before
+the GET, and the GET itself is abandoned as soon as its headers show a
+non-HTML type or an oversized Content-Length, or once the streamed body
+passes max_body_bytes. BandwidthStats records what was downloaded and what
+was avoided or thrown away.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from crawl import DOCUMENT_EXTENSIONS
+
+
+DEFAULT_FETCH_CONFIG = {
+    "skip_extensions": True,
+    "extra_skip_extensions": [],
+    "head_probe": False,
+    "max_body_bytes": 5 * 1024 * 1024,
+}
+
+# Never fetched when skip_extensions is on
+SKIP_EXTENSIONS = DOCUMENT_EXTENSIONS + (
+    '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.rtf', '.epub',
+    '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar',
+    '.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm', '.apk', '.iso', '.bin',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tif', '.tiff', '.avif',
+    '.mp3', '.wav', '.ogg', '.flac', '.m4a', '.mp4', '.m4v', '.mov', '.avi', '.mkv', '.webm',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.css', '.js', '.json', '.xml', '.rss', '.csv', '.txt',
+)
+
+
+class BodyTooLarge(RuntimeError):
+    """A response body exceeded max_body_bytes."""
+
+
+def build_skip_extensions(fetch: Dict[str, Any] = None) -> Tuple[str, ...]:
+    """Extensions to filter for a fetch config; empty when skip_extensions is off."""
+    fetch = {**DEFAULT_FETCH_CONFIG, **(fetch or {})}
+    if not fetch["skip_extensions"]:
+        return ()
+    extra = tuple(ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in fetch["extra_skip_extensions"])
+    return SKIP_EXTENSIONS + extra
+
+
+def has_skipped_extension(url: str, extensions: Iterable[str]) -> bool:
+    """True if the URL path (ignoring query and fragment) ends in one of extensions."""
+    return bool(extensions) and urlparse(url).path.lower().endswith(tuple(extensions))
+
+
+def is_html_content_type(content_type: str) -> bool:
+    return content_type.lower().startswith("text/html")
+
+
+def declared_length(headers) -> Optional[int]:
+    """Content-Length from response headers, or None if missing or malformed."""
+    try:
+        return int(headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BandwidthStats:
+    """Count bytes downloaded, avoided and discarded during a crawl."""
+
+    def __init__(self):
+        self.pages_downloaded = 0
+        self.bytes_downloaded = 0
+        self.max_page_bytes = 0
+        self.skipped_links = 0
+        self.head_probes = 0
+        self.head_rejected = 0
+        self.rejected_content_type = 0
+        self.rejected_too_large = 0
+        self.bytes_avoided = 0
+        self.bytes_discarded = 0
+
+    def record_page(self, size: int):
+        self.pages_downloaded += 1
+        self.bytes_downloaded += size
+        self.max_page_bytes = max(self.max_page_bytes, size)
+
+    def record_skipped(self):
+        """Count a link left out for its extension; a URL linked from several pages counts each time."""
+        self.skipped_links += 1
+
+    def record_rejected(self, reason: str, declared: Optional[int] = None, discarded: int = 0):
+        """
+        Record a response dropped before or while downloading its body.
+
+        Args:
+            reason: "content_type" or "too_large"
+            declared: Content-Length the server announced (bytes not downloaded)
+            discarded: Body bytes read before giving up
+        """
+        if reason == "content_type":
+            self.rejected_content_type += 1
+        else:
+            self.rejected_too_large += 1
+        if declared:
+            self.bytes_avoided += max(0, declared - discarded)
+        self.bytes_discarded += discarded
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the collected statistics."""
+        return {
+            "pages_downloaded": self.pages_downloaded,
+            "bytes_downloaded": self.bytes_downloaded,
+            "avg_page_bytes": self.bytes_downloaded / self.pages_downloaded if self.pages_downloaded else 0,
+            "max_page_bytes": self.max_page_bytes,
+            "skipped_by_extension": self.skipped_links,
+            "head_probes": self.head_probes,
+            "head_rejected": self.head_rejected,
+            "rejected_content_type": self.rejected_content_type,
+            "rejected_too_large": self.rejected_too_large,
+            "bytes_avoided": self.bytes_avoided,
+            "bytes_discarded": self.bytes_discarded
+        }
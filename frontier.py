@@ -0,0 +1,243 @@
+"""
+URL frontier for the async crawler.
+
+URLs are deduplicated on their normalized form (crawl.normalize_url, under
+the crawl's url_policy.URLPolicy if given) before they are queued, so the
+queue only ever holds distinct pages and its size is bounded by the page
+budget rather than by how many links each page has. The visited set is a
+url_table.URLTable: every accepted URL gets an integer id, and its depth,
+parent and the URL it was found as live in arrays rather than in dicts
+keyed by URL strings. Queue entries are (depth, priority, counter, url_id,
+parent) with no URL strings in them; parent is the parent's id, or its URL
+when the parent isn't in the table (a link handed over by another shard or
+worker).
+
+The queue is ordered by depth (breadth-first), then by an optional score,
+so a limited page budget covers the shallow structure of a site before any
+single deep branch. URLs deeper than max_depth are dropped before queueing.
+
+A URL that failed can be handed back with defer(): it re-enters the queue
+after a delay without holding a worker in the meantime, and join() keeps
+waiting for it.
+
+With a traps.TrapDetector, new URLs that look like part of a crawler trap
+are dropped, or queued behind everything else at their depth.
+"""
+
+import asyncio
+import itertools
+from typing import Callable, Dict, Optional, Set, Tuple, Union
+
+from crawl import normalize_url, categorize_page_type
+from traps import DEPRIORITIZE, DROP, TrapDetector
+from url_policy import URLPolicy
+from url_table import NO_PARENT, URLTable
+
+
+# (url, depth, parent_url)
+FrontierItem = Tuple[str, int, Optional[str]]
+
+# score(url, depth, parent_url) -> float; higher scores are crawled first within a depth
+ScoreFunction = Callable[[str, int, Optional[str]], float]
+
+
+def page_type_score(weights: Dict[str, float]) -> ScoreFunction:
+    """Build a score function that prefers URLs whose categorize_page_type has a higher weight."""
+    def score(url: str, depth: int, parent_url: Optional[str]) -> float:
+        return weights.get(categorize_page_type(url), 0)
+    return score
+
+
+class Frontier:
+    """Deduplicating priority queue of URLs waiting to be crawled."""
+
+    def __init__(self, max_size: int = 0, max_depth: int = 0, score: ScoreFunction = None,
+                 traps: TrapDetector = None, url_policy: URLPolicy = None, urls: URLTable = None):
+        """
+        Initialize the frontier.
+
+        Args:
+            max_size: Stop accepting new URLs after this many distinct URLs (0 for no limit)
+            max_depth: Drop URLs deeper than this (0 for unlimited)
+            score: Optional tie-breaker within a depth; higher is crawled first
+            traps: Optional trap detector consulted for every new URL
+            url_policy: Normalization policy for dedup keys (None to key on host and path)
+            urls: Visited set to fill (a new URLTable if None)
+        """
+        self.max_size = max_size
+        self.max_depth = max_depth
+        self.score = score
+        self.url_policy = url_policy
+        self.traps = traps
+        self._queue = asyncio.PriorityQueue()
+        # Every URL ever accepted, with the depth of its latest queue entry and its parent
+        self.urls = urls if urls is not None else URLTable()
+        self._queued = bytearray()  # per URL id: 1 while its entry at urls.depths[id] is live
+        self._queued_count = 0
+        self._counter = itertools.count()
+        self.closed = False
+        self.dropped_too_deep = 0
+        self._delayed: Dict[int, asyncio.TimerHandle] = {}
+        self._retries: Set[int] = set()  # ids re-queued by defer(); survive close()
+        self.on_add: Optional[Callable[[str, str, int, Optional[str]], None]] = None
+
+    def add(self, url: str, depth: int, parent_url: str = None, recrawl: bool = False) -> bool:
+        """
+        Queue a URL unless it was already seen, is too deep, the frontier is full, looks like a trap,
+        or the frontier has been closed.
+
+        A URL that is still waiting in the queue and is rediscovered at a shallower
+        depth is moved up to that depth. With recrawl, a URL seen before is queued
+        again unless it is still waiting.
+        """
+        if self.closed:
+            return False
+        if self.max_depth and depth > self.max_depth:
+            self.dropped_too_deep += 1
+            return False
+
+        normalized_url = normalize_url(url, self.url_policy)
+        url_id = self.urls.get(normalized_url)
+        verdict = None
+        if url_id is not None:
+            if self._queued[url_id] and depth >= self.urls.depths[url_id]:
+                return False
+            if not self._queued[url_id] and not recrawl:
+                return False
+            # The old entry becomes stale and is skipped by get()
+        elif self.max_size and len(self.urls) >= self.max_size:
+            return False
+        elif self.traps is not None:
+            verdict = self.traps.check(normalized_url)
+            if verdict == DROP:
+                return False
+
+        parent_id, parent = self._parent(parent_url)
+        if url_id is None:
+            url_id = self._intern(normalized_url, depth, parent_id)
+        else:
+            self.urls.depths[url_id] = depth
+            self.urls.parents[url_id] = parent_id
+        self.urls.set_url(url_id, url)
+        self._mark_queued(url_id)
+        if verdict == DEPRIORITIZE:
+            # Behind every other URL at this depth
+            priority = float("inf")
+        else:
+            priority = -self.score(url, depth, parent_url) if self.score else 0
+        self._queue.put_nowait((depth, priority, next(self._counter), url_id, parent))
+        if self.on_add:
+            self.on_add(normalized_url, url, depth, parent_url)
+        return True
+
+    def _parent(self, parent_url: Optional[str]) -> Tuple[int, Union[int, str]]:
+        """
+        The parent's id for the table and the parent for a queue entry.
+
+        The entry holds the id when the table can give the parent's URL back,
+        else the URL itself (NO_PARENT if there is no parent).
+        """
+        if not parent_url:
+            return NO_PARENT, NO_PARENT
+        parent_id = self.urls.get(normalize_url(parent_url, self.url_policy))
+        if parent_id is None:
+            return NO_PARENT, parent_url
+        return parent_id, parent_id if self.urls.has_url(parent_id) else parent_url
+
+    def _item(self, depth: int, url_id: int, parent: Union[int, str]) -> FrontierItem:
+        if isinstance(parent, str):
+            return self.urls.url(url_id), depth, parent
+        return self.urls.url(url_id), depth, None if parent == NO_PARENT else self.urls.url(parent)
+
+    def _intern(self, normalized_url: str, depth: int = 0, parent: int = NO_PARENT) -> int:
+        url_id = self.urls.add(normalized_url, depth, parent)
+        if url_id == len(self._queued):
+            self._queued.append(0)
+        return url_id
+
+    def _mark_queued(self, url_id: int):
+        if not self._queued[url_id]:
+            self._queued[url_id] = 1
+            self._queued_count += 1
+
+    def _unmark_queued(self, url_id: int):
+        if self._queued[url_id]:
+            self._queued[url_id] = 0
+            self._queued_count -= 1
+
+    def is_seen(self, normalized_url: str) -> bool:
+        return self.urls.get(normalized_url) is not None
+
+    def mark_seen(self, normalized_url: str, depth: int = 0):
+        """Count a URL as already crawled, e.g. when resuming from a checkpoint."""
+        self._intern(normalized_url, depth)
+
+    async def get(self) -> FrontierItem:
+        """Wait for and return the highest-priority URL."""
+        while True:
+            depth, _, _, url_id, parent = await self._queue.get()
+            if self._queued[url_id] and self.urls.depths[url_id] == depth:
+                self._unmark_queued(url_id)
+                self._retries.discard(url_id)
+                return self._item(depth, url_id, parent)
+            # Superseded by a shallower entry for the same URL
+            self._queue.task_done()
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def defer(self, url: str, depth: int, parent_url: str = None, delay: float = 0):
+        """
+        Put a URL taken with get() back in the queue after delay seconds.
+
+        Call this instead of task_done(). The URL is not deduplicated or budgeted
+        again, jumps ahead of other URLs at its depth, and is kept by close().
+        """
+        url_id = self._intern(normalize_url(url, self.url_policy), depth)
+        self.urls.set_url(url_id, url)
+        self._retries.add(url_id)
+        loop = asyncio.get_running_loop()
+        self._delayed[url_id] = loop.call_later(
+            delay, self._requeue, depth, url_id, self._parent(parent_url)[1]
+        )
+
+    def _requeue(self, depth: int, url_id: int, parent: Union[int, str]):
+        del self._delayed[url_id]
+        self.urls.depths[url_id] = depth
+        self._mark_queued(url_id)
+        self._queue.put_nowait((depth, float("-inf"), next(self._counter), url_id, parent))
+        # Matches the get() that handed the URL out; the new entry keeps join() waiting
+        self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued URL has been taken and marked done."""
+        await self._queue.join()
+
+    def close(self):
+        """Stop accepting URLs and drop everything still queued except deferred retries."""
+        self.closed = True
+        kept = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            url_id = entry[3]
+            if url_id in self._retries and self._queued[url_id] and self.urls.depths[url_id] == entry[0]:
+                kept.append(entry)
+            elif url_id not in self._retries:
+                self._unmark_queued(url_id)
+            self._queue.task_done()
+        for entry in kept:
+            self._queue.put_nowait(entry)
+
+    def __len__(self) -> int:
+        return self._queued_count
+
+    @property
+    def seen_count(self) -> int:
+        return len(self.urls)
+
+    @property
+    def delayed_count(self) -> int:
+        return len(self._delayed)
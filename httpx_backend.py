@@ -0,0 +1,238 @@
+"""
+HTTP/2 fetch backend built on httpx (pip install -e ".[http2]").
+
+HTTPXSession covers the part of aiohttp.ClientSession the crawler uses:
+get()/head() as async context managers, responses with status, headers,
+charset and a content stream with iter_chunked() and read(n). httpx errors
+are raised as their aiohttp counterparts, so page fetches (AsyncCrawler
+fetch_once and get_html), robots.txt and sitemap loading retry and fail
+exactly as they do with the aiohttp backend.
+
+With HTTP/2 every request to a host is multiplexed over one connection
+(one TCP and TLS handshake) instead of a pool of HTTP/1.1 connections.
+Hosts that don't negotiate h2 through ALPN are served over HTTP/1.1.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from network import DEFAULT_NETWORK_CONFIG, ConnectionStats, RequestTiming
+
+
+# Hop-by-hop or transfer headers httpx manages itself (and HTTP/2 forbids)
+_UNSUPPORTED_HEADERS = {"connection", "accept-encoding", "upgrade-insecure-requests"}
+
+
+def _translate_error(exc: Exception) -> Exception:
+    """The aiohttp (or asyncio) exception the crawler expects for an httpx error."""
+    import httpx
+    if isinstance(exc, httpx.TimeoutException):
+        return asyncio.TimeoutError(str(exc) or type(exc).__name__)
+    if isinstance(exc, (httpx.ConnectError, httpx.ProxyError)):
+        return aiohttp.ClientConnectionError(str(exc) or type(exc).__name__)
+    if isinstance(exc, (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError, httpx.DecodingError)):
+        return aiohttp.ClientPayloadError(str(exc) or type(exc).__name__)
+    return aiohttp.ClientError(str(exc) or type(exc).__name__)
+
+
+class _StreamReader:
+    """The response.content of an HTTPXResponse (aiohttp.StreamReader subset)."""
+
+    def __init__(self, response):
+        self._chunks = response.aiter_bytes()
+        self._buffer = b""
+        self._eof = False
+
+    async def _next(self) -> bytes:
+        import httpx
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return b""
+        except httpx.HTTPError as exc:
+            raise _translate_error(exc) from exc
+
+    async def iter_chunked(self, n: int):
+        """Yield the decoded body in chunks of at most n bytes."""
+        while True:
+            while len(self._buffer) < n and not self._eof:
+                self._buffer += await self._next()
+            if not self._buffer:
+                return
+            chunk, self._buffer = self._buffer[:n], self._buffer[n:]
+            yield chunk
+
+    async def read(self, n: int = -1) -> bytes:
+        """Read up to n bytes (the whole body if n is negative)."""
+        while (n < 0 or len(self._buffer) < n) and not self._eof:
+            self._buffer += await self._next()
+        if n < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+
+class HTTPXResponse:
+    """An httpx response with the aiohttp.ClientResponse attributes the crawler reads."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.charset = response.charset_encoding
+        self.http_version = response.http_version
+        self.content = _StreamReader(response)
+
+    def close(self):
+        # The stream is reset when the request context exits; with HTTP/2 the connection stays up
+        pass
+
+
+class _RequestContext:
+    """async with session.get(url) as resp: ... for HTTPXSession."""
+
+    def __init__(self, session: "HTTPXSession", method: str, url: str, headers: Optional[Dict[str, str]],
+                 follow_redirects: bool, timing: Optional[RequestTiming]):
+        self.session = session
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.follow_redirects = follow_redirects
+        self.timing = timing
+        self._stream = None
+        self._deadline = None
+
+    async def __aenter__(self) -> HTTPXResponse:
+        import httpx
+        # httpx has no whole-request timeout; aiohttp's total timeout covers headers and body
+        self._deadline = asyncio.timeout(self.session.total_timeout)
+        await self._deadline.__aenter__()
+        try:
+            stream = self.session.client.stream(
+                self.method, self.url, headers=self.headers, follow_redirects=self.follow_redirects,
+                extensions={"trace": self.session.connection_tracer(self.timing)}
+            )
+            response = await stream.__aenter__()
+            self._stream = stream
+        except BaseException as exc:
+            await self._close(type(exc), exc, exc.__traceback__)
+            if isinstance(exc, httpx.HTTPError):
+                raise _translate_error(exc) from exc
+            raise
+        return HTTPXResponse(response)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return await self._close(exc_type, exc_val, exc_tb)
+
+    async def _close(self, exc_type, exc_val, exc_tb):
+        import httpx
+        try:
+            if self._stream is not None:
+                stream, self._stream = self._stream, None
+                await stream.__aexit__(exc_type, exc_val, exc_tb)
+        except httpx.HTTPError:
+            # Closing a half-read stream; the request's own outcome is what matters
+            pass
+        finally:
+            # Turns the deadline's cancellation into TimeoutError
+            await self._deadline.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class HTTPXSession:
+    """Drop-in for the crawler's aiohttp.ClientSession that speaks HTTP/2 through httpx."""
+
+    def __init__(self, network: Dict[str, Any] = None, timeout: float = 10, connection_stats: ConnectionStats = None,
+                 headers: Dict[str, str] = None):
+        """
+        Initialize the session.
+
+        Args:
+            network: The network section of config.yaml (pool, keep-alive, timeouts, http2, verify_ssl)
+            timeout: crawling.timeout, used when network.total_timeout is 0
+            connection_stats: Counts new and reused connections
+            headers: Default request headers
+        """
+        try:
+            import httpx
+            import h2  # noqa: F401  (httpx needs it for http2=True)
+        except ImportError as exc:
+            raise ImportError('The httpx backend needs httpx[http2]: pip install -e ".[http2]"') from exc
+        net = {**DEFAULT_NETWORK_CONFIG, **(network or {})}
+        self.total_timeout = net["total_timeout"] or timeout or None
+        self.connection_stats = connection_stats or ConnectionStats()
+        pool_size = net["pool_size"] or None
+        self.client = httpx.AsyncClient(
+            http2=net["http2"],
+            verify=net["verify_ssl"],
+            headers={name: value for name, value in (headers or {}).items()
+                     if name.lower() not in _UNSUPPORTED_HEADERS},
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=net["keepalive_timeout"]
+            ),
+            timeout=httpx.Timeout(
+                connect=net["connect_timeout"] or None,
+                read=net["read_timeout"] or None,
+                write=net["read_timeout"] or None,
+                pool=self.total_timeout
+            )
+        )
+
+    def get(self, url: str, headers: Dict[str, str] = None, allow_redirects: bool = True,
+            trace_request_ctx: RequestTiming = None) -> _RequestContext:
+        return _RequestContext(self, "GET", url, headers, allow_redirects, trace_request_ctx)
+
+    def head(self, url: str, headers: Dict[str, str] = None, allow_redirects: bool = False,
+             trace_request_ctx: RequestTiming = None) -> _RequestContext:
+        return _RequestContext(self, "HEAD", url, headers, allow_redirects, trace_request_ctx)
+
+    def connection_tracer(self, timing: RequestTiming = None):
+        """
+        httpcore trace hook for one request.
+
+        Counts a new connection if it connected, otherwise a reused one, and
+        records the connect (including DNS), tls and ttfb phases on timing.
+        The download phase starts with the response headers; the caller ends it.
+        """
+        stats = self.connection_stats
+        connected = False
+
+        async def trace(event_name: str, info: dict):
+            nonlocal connected
+            if event_name == "connection.connect_tcp.started":
+                if timing:
+                    timing.start("connect")
+            elif event_name == "connection.connect_tcp.complete":
+                connected = True
+                stats.connections_created += 1
+                if timing:
+                    timing.end("connect")
+            elif event_name == "connection.start_tls.started":
+                if timing:
+                    timing.start("tls")
+            elif event_name == "connection.start_tls.complete":
+                if timing:
+                    timing.end("tls")
+            elif event_name.endswith("send_request_headers.started"):
+                if not connected:
+                    stats.connections_reused += 1
+            elif event_name.endswith("send_request_headers.complete"):
+                if timing:
+                    timing.start("ttfb")
+            elif event_name.endswith("receive_response_headers.complete"):
+                if timing:
+                    timing.end("ttfb")
+                    timing.start("download")
+        return trace
+
+    @property
+    def closed(self) -> bool:
+        return self.client.is_closed
+
+    async def close(self):
+        await self.client.aclose()
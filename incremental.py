@@ -0,0 +1,226 @@
+"""
+Incremental re-crawls against a previous run.
+
+The previous run's checkpoint (see checkpoint.py) holds every page record
+together with the validators it was fetched with. A re-crawl seeds its
+frontier from those URLs and avoids work in three ways:
+
+- sitemap <lastmod> no newer than when we last fetched the page: no request
+- ETag / Last-Modified revalidation answered with 304: no body downloaded
+- body downloaded but its SHA-256 matches: no extraction
+
+In all three cases the previous extraction result is reused (with the
+current depth and incoming links). A diff of added, removed and changed
+pages is produced at the end.
+"""
+
+import asyncio
+import gzip
+import json
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from checkpoint import CrawlCheckpoint, checkpoint_path
+from crawl import normalize_url
+
+
+DEFAULT_INCREMENTAL_CONFIG = {
+    "use_sitemap": True,
+    "max_sitemaps": 50,
+    "max_sitemap_bytes": 50 * 1024 * 1024,
+}
+
+# Outcomes that reused the previous extraction
+REUSED_OUTCOMES = ("unchanged_sitemap", "not_modified", "same_content")
+
+
+def parse_lastmod(value: str) -> Optional[float]:
+    """Parse a W3C datetime (2024-05-01, 2024-05-01T10:00:00+00:00, ...Z) to a timestamp."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_sitemap(data: bytes) -> Tuple[Dict[str, Optional[float]], List[str]]:
+    """
+    Parse a sitemap or sitemap index.
+
+    Returns:
+        ({page url: lastmod timestamp or None}, [child sitemap urls])
+    """
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    pages, children = {}, []
+    root = ET.fromstring(data)
+    for entry in root:
+        tag = entry.tag.rsplit("}", 1)[-1]
+        fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in entry}
+        loc = fields.get("loc")
+        if not loc:
+            continue
+        if tag == "sitemap":
+            children.append(loc)
+        elif tag == "url":
+            pages[loc] = parse_lastmod(fields.get("lastmod"))
+    return pages, children
+
+
+class IncrementalState:
+    """What the previous run knew, and how this run's pages compare to it."""
+
+    def __init__(self, previous_run_dir: str, use_sitemap: bool = True, max_sitemaps: int = 50,
+                 max_sitemap_bytes: int = 50 * 1024 * 1024, url_policy=None):
+        """
+        Load the previous run.
+
+        Args:
+            previous_run_dir: Output directory of the run to compare against
+            use_sitemap: Skip pages whose sitemap lastmod is older than their last fetch
+            max_sitemaps: Stop following sitemap indexes after this many files
+            max_sitemap_bytes: Ignore sitemap files larger than this
+            url_policy: The crawl's url_policy.URLPolicy, so sitemap URLs get the crawler's page keys
+        """
+        path = checkpoint_path(previous_run_dir)
+        if not path.exists():
+            raise ValueError(f"No crawl checkpoint found in {previous_run_dir}")
+        checkpoint = CrawlCheckpoint(path)
+        try:
+            self.previous = dict(checkpoint.load_pages())
+        finally:
+            checkpoint.close()
+        self.previous_run_dir = previous_run_dir
+        self.use_sitemap = use_sitemap
+        self.max_sitemaps = max_sitemaps
+        self.max_sitemap_bytes = max_sitemap_bytes
+        self.url_policy = url_policy
+        self.lastmod: Dict[str, float] = {}
+        self.outcomes: Dict[str, str] = {}
+        self.sitemaps_read = 0
+
+    def seeds(self) -> List[Tuple[str, int, Optional[str]]]:
+        """(url, depth, parent_url) for every page the previous run fetched successfully, shallowest first."""
+        seeds = []
+        for record in self.previous.values():
+            if "error" in record:
+                continue
+            incoming = record.get("incoming_links") or [None]
+            seeds.append((record["url"], record.get("depth", 0), incoming[0]))
+        return sorted(seeds, key=lambda seed: seed[1])
+
+    def _reusable(self, normalized_url: str) -> Optional[Dict[str, Any]]:
+        record = self.previous.get(normalized_url)
+        if record is None or "error" in record or "outgoing_links" not in record:
+            return None
+        return record
+
+    def conditional_headers(self, normalized_url: str) -> Optional[Dict[str, str]]:
+        """Revalidation headers from the previous fetch of this page."""
+        record = self._reusable(normalized_url)
+        if record is None:
+            return None
+        headers = {}
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers or None
+
+    def unchanged_in_sitemap(self, normalized_url: str) -> bool:
+        """True if the sitemap says the page hasn't changed since the previous run fetched it."""
+        record = self._reusable(normalized_url)
+        lastmod = self.lastmod.get(normalized_url)
+        if record is None or lastmod is None or not record.get("fetched_at"):
+            return False
+        return lastmod <= record["fetched_at"]
+
+    def same_content(self, normalized_url: str, content_hash: str) -> bool:
+        record = self._reusable(normalized_url)
+        return record is not None and record.get("content_hash") == content_hash
+
+    def reuse(self, normalized_url: str, outcome: str) -> Dict[str, Any]:
+        """A copy of the previous record, recording why it was reused."""
+        self.outcomes[normalized_url] = outcome
+        data = dict(self._reusable(normalized_url))
+        if outcome != "unchanged_sitemap":
+            # Content was verified just now
+            data["fetched_at"] = time.time()
+        return data
+
+    def record_fetched(self, normalized_url: str):
+        """Note a page that was downloaded and extracted this run."""
+        previous = self.previous.get(normalized_url)
+        self.outcomes[normalized_url] = "changed" if previous is not None and "error" not in previous else "added"
+
+    async def load_sitemaps(self, session: aiohttp.ClientSession, sitemap_urls: List[str]):
+        """Fetch sitemaps (following indexes) and remember each page's lastmod."""
+        if not self.use_sitemap:
+            return
+        pending = list(sitemap_urls)
+        visited = set()
+        while pending and self.sitemaps_read < self.max_sitemaps:
+            url = pending.pop(0)
+            if url in visited:
+                continue
+            visited.add(url)
+            try:
+                async with session.get(url) as resp:
+                    if resp.status != 200:
+                        continue
+                    data = await resp.content.read(self.max_sitemap_bytes + 1)
+                if len(data) > self.max_sitemap_bytes:
+                    continue
+                pages, children = parse_sitemap(data)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError, OSError) as exc:
+                print(f"Could not read sitemap {url}: {exc}")
+                continue
+            self.sitemaps_read += 1
+            pending.extend(children)
+            for loc, lastmod in pages.items():
+                if lastmod is not None:
+                    self.lastmod[normalize_url(loc, self.url_policy)] = lastmod
+
+    def diff(self, page_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Compare this run's pages with the previous run."""
+        current_ok = {url for url, data in page_data.items() if "error" not in data and "status" not in data}
+        previous_ok = {url for url, data in self.previous.items() if "error" not in data}
+        return {
+            "previous_run": str(self.previous_run_dir),
+            "added": sorted(current_ok - previous_ok),
+            "removed": sorted(previous_ok - current_ok),
+            "changed": sorted(url for url, outcome in self.outcomes.items() if outcome == "changed"),
+            "unchanged": sorted(url for url, outcome in self.outcomes.items() if outcome in REUSED_OUTCOMES)
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        counts = {outcome: 0 for outcome in ("added", "changed") + REUSED_OUTCOMES}
+        for outcome in self.outcomes.values():
+            counts[outcome] += 1
+        return {
+            "previous_pages": len(self.previous),
+            "sitemaps_read": self.sitemaps_read,
+            "sitemap_lastmods": len(self.lastmod),
+            **counts
+        }
+
+
+def write_diff_report(diff: Dict[str, Any], output_path: str):
+    """Save the added/removed/changed page lists as JSON."""
+    report = {
+        "summary": {key: len(value) for key, value in diff.items() if isinstance(value, list)},
+        **diff
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Diff report saved to {output_path}")
@@ -1,53 +1,165 @@
 import sys
+import math
+import hashlib
+import codecs
 import asyncio
 import aiohttp
 import time
+import contextlib
+from typing import Optional
 from urllib.parse import urlparse
-from collections import defaultdict
 
-from crawl import normalize_url, extract_page_data, get_urls_from_html
+from crawl import normalize_url, get_domain_from_url, StreamingLinkExtractor
+from extraction_pool import ExtractionPool, decode_body
+from frontier import Frontier, page_type_score
+from rate_limiter import HostRateLimiter
+from network import (NETWORK_BACKENDS, ConnectionStats, RequestTiming, build_connector, build_timeout,
+                     request_timing_trace_config)
+from response_cache import ResponseCache
+from fetch_policy import (DEFAULT_FETCH_CONFIG, BandwidthStats, BodyTooLarge, build_skip_extensions,
+                          declared_length, has_skipped_extension, is_html_content_type)
+from robots import DEFAULT_ROBOTS_CONFIG, RobotsCache
+from concurrency import OVERLOAD_STATUSES, ConcurrencyController, ServerError, Throttled, parse_retry_after
+from circuit_breaker import CircuitBreaker
+from checkpoint import DEFAULT_CHECKPOINT_CONFIG, CrawlCheckpoint
+from incremental import DEFAULT_INCREMENTAL_CONFIG, IncrementalState
+from traps import build_trap_detector
+from url_policy import URLPolicy
+from url_table import build_url_table
+from page_store import build_page_store
 from csv_report import write_csv_report
 
+# Body read size; small enough that links surface early on slow responses
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Failures worth another attempt later; anything else fails the page at once
+RETRYABLE_ERRORS = (Throttled, ServerError, asyncio.TimeoutError, aiohttp.ClientError)
+
 class AsyncCrawler:
     def __init__(self, base_url: str, max_concurrency: int = 3, max_pages: int = 10, 
-                 max_retries: int = 3, retry_delay: float = 1.0, rate_limit: float = 0):
+                 max_retries: int = 3, retry_delay: float = 1.0, rate_limit: float = 0,
+                 parser: str = None, stream_links: bool = True, extraction: dict = None,
+                 max_depth: int = 0, score=None, rate_burst: int = 1, host_rate_limits: dict = None,
+                 timeout: float = 10, network: dict = None, cache: dict = None, fetch: dict = None,
+                 respect_robots_txt: bool = True, robots: dict = None, concurrency: dict = None,
+                 circuit_breaker: dict = None, checkpoint: dict = None, incremental: dict = None,
+                 session: aiohttp.ClientSession = None, extractor: ExtractionPool = None,
+                 connection_stats: ConnectionStats = None, fetch_scheduler=None, shard=None, traps: dict = None,
+                 url_policy: dict = None, url_table: dict = None, page_store: dict = None):
         self.base_url = base_url
-        self.base_domain = _get_domain_from_normalized(normalize_url(base_url))
-        self.page_data = {}
-        self.incoming_links = defaultdict(list)  # Track incoming links for each page
-        self.page_depth = {}  # Track depth of each page from base URL
+        self.url_policy = URLPolicy(url_policy)
+        self.canonical_duplicates = 0  # records whose canonical URL already had one of its own
+        self.base_domain = _get_domain_from_normalized(normalize_url(base_url, self.url_policy))
+        # Records past page_store.memory_pages spill to disk until the reports read them back
+        self.page_data = build_page_store(page_store)
         self.lock = asyncio.Lock()
         self.max_concurrency = max_concurrency
         self.max_pages = max_pages
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.rate_limit = rate_limit
-        self.last_request_time = 0
+        self.rate_limiter = HostRateLimiter(rate_limit, rate_burst, host_rate_limits)
+        self.parser = parser
+        self.stream_links = stream_links
+        self.extraction_config = extraction or {}
+        self.timeout = timeout
+        self.network_config = network or {}
+        self.connection_stats = connection_stats or ConnectionStats()
+        self.cache_config = cache or {}
+        self.cache = None
+        self.cache_summary = None
+        # A session or extractor passed in is shared with other crawlers and closed by its owner
+        self.extractor = extractor
+        self.owns_extractor = extractor is None
+        self.fetch_config = {**DEFAULT_FETCH_CONFIG, **(fetch or {})}
+        self.skip_extensions = build_skip_extensions(self.fetch_config)
+        self.max_body_bytes = self.fetch_config["max_body_bytes"]
+        self.head_probe = self.fetch_config["head_probe"]
+        self.bandwidth = BandwidthStats()
+        self.respect_robots_txt = respect_robots_txt
+        self.robots_config = {**DEFAULT_ROBOTS_CONFIG, **(robots or {})}
+        self.robots = None
+        self.robots_pending = set()  # links waiting for their host's robots.txt
         self.semaphore = asyncio.Semaphore(max_concurrency)
-        self.session = None
+        # Per-host limits adapt below max_concurrency; the semaphore caps the total
+        self.concurrency = ConcurrencyController(max_concurrency, concurrency)
+        self.breaker = CircuitBreaker(circuit_breaker)
+        self.retry_attempts = {}  # normalized URL -> failed attempts so far
+        self.retry_stats = {"retries_scheduled": 0, "retried_pages": 0, "recovered_pages": 0, "failed_after_retries": 0}
+        self.session = session
+        self.owns_session = session is None
+        self.fetch_scheduler = fetch_scheduler  # shares fetch slots fairly with other sites
+        self.shard = shard  # sharding.ShardRouter when this crawler owns one shard of the URL space
         self.should_stop = False
-        self.all_tasks = set()
+        self.max_depth = max_depth
+        self.traps = build_trap_detector(traps)
+        self.frontier = Frontier(max_size=max_pages, max_depth=max_depth, score=score, traps=self.traps,
+                                 url_policy=self.url_policy, urls=build_url_table(url_table, max_pages))
+        self.checkpoint_config = {**DEFAULT_CHECKPOINT_CONFIG, **(checkpoint or {})}
+        self.checkpoint = None
+        self.checkpoint_summary = None
+        self.resumed = False
+        self.incremental_config = {**DEFAULT_INCREMENTAL_CONFIG, **(incremental or {})}
+        self.incremental = None
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Cache-Control": "max-age=0"
-        })
+        if self.session is None:
+            self.session = create_session(self.network_config, self.timeout, self.connection_stats)
+        if self.extractor is None:
+            self.extractor = ExtractionPool(parser=self.parser, **self.extraction_config)
+        if self.cache_config.get("enabled"):
+            self.cache = ResponseCache(
+                self.cache_config.get("directory", ".cache/responses"),
+                max_size_mb=self.cache_config.get("max_size_mb", 500),
+                ttl_hours=self.cache_config.get("ttl_hours", 168)
+            )
+        if self.respect_robots_txt:
+            self.robots = RobotsCache(**self.robots_config)
+        if self.checkpoint_config["enabled"] and self.checkpoint_config.get("path"):
+            self.checkpoint = CrawlCheckpoint(
+                self.checkpoint_config["path"],
+                batch_size=self.checkpoint_config["batch_size"],
+                flush_interval=self.checkpoint_config["flush_interval"]
+            )
+            if self.checkpoint.has_state():
+                self.restore_checkpoint()
+            else:
+                self.checkpoint.set_meta("base_url", self.base_url)
+            self.frontier.on_add = self.checkpoint.record_queued
+        if self.incremental_config.get("previous_run"):
+            self.incremental = IncrementalState(
+                self.incremental_config["previous_run"],
+                use_sitemap=self.incremental_config["use_sitemap"],
+                max_sitemaps=self.incremental_config["max_sitemaps"],
+                max_sitemap_bytes=self.incremental_config["max_sitemap_bytes"],
+                url_policy=self.url_policy
+            )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+            self.checkpoint_summary = self.checkpoint.summary()
+            self.checkpoint.close()
+        if self.cache is not None:
+            self.cache_summary = self.cache.summary()
+            self.cache.close()
+        if self.extractor and self.owns_extractor:
+            await self.extractor.close()
+        if self.session and self.owns_session:
             await self.session.close()
 
+    def restore_checkpoint(self):
+        """Load finished pages and re-queue unfinished URLs from the checkpoint."""
+        for normalized_url, data in self.checkpoint.load_pages():
+            self.page_data[normalized_url] = data
+            self.frontier.mark_seen(normalized_url)
+        queued = self.checkpoint.load_frontier()
+        for url, depth, parent_url in queued:
+            self.frontier.add(url, depth, parent_url)
+        self.resumed = True
+        print(f"Resuming crawl: {len(self.page_data)} pages done, {len(queued)} queued")
+
     async def add_page_visit(self, normalized_url: str) -> bool:
         async with self.lock:
             if self.should_stop:
@@ -59,172 +171,582 @@ class AsyncCrawler:
             if len(self.page_data) >= self.max_pages:
                 print(f"Reached maximum number of pages to crawl ({self.max_pages})")
                 self.should_stop = True
-                # Cancel all running tasks
-                for task in self.all_tasks:
-                    task.cancel()
+                # In-flight pages finish; queued URLs are dropped
+                self.frontier.close()
                 return False
                 
             self.page_data[normalized_url] = {"url": normalized_url, "status": "pending"}
             return True
 
-    async def apply_rate_limit(self):
-        """Apply rate limiting if configured."""
-        if self.rate_limit > 0:
-            async with self.lock:
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                min_delay = 1.0 / self.rate_limit
-                
-                if time_since_last < min_delay:
-                    await asyncio.sleep(min_delay - time_since_last)
-                
-                self.last_request_time = time.time()
+    async def load_robots(self, url: str):
+        """Load robots.txt for url's host and slow its rate limit down to any Crawl-delay."""
+        if self.robots.is_loaded(url):
+            return
+        await self.robots.load(self.session, url)
+        delay = self.robots.crawl_delay(url)
+        if delay:
+            host = get_domain_from_url(url)
+            limit = 1 / delay
+            if self.shard is not None:
+                # Every shard fetches from this host; together they keep to the delay
+                limit /= self.shard.shards
+            rate = self.rate_limiter.get_rate(host)
+            if rate <= 0 or rate > limit:
+                self.rate_limiter.set_rate(host, limit)
+
+    async def enqueue_after_robots(self, url: str, depth: int, parent_url: str = None, recrawl: bool = False):
+        await self.load_robots(url)
+        self.enqueue_link(url, depth, parent_url, recrawl)
+
+    async def apply_rate_limit(self, url: str):
+        """Wait for the per-host rate limit; never holds the shared state lock."""
+        await self.rate_limiter.acquire(url)
     
-    async def get_html(self, url: str) -> tuple[str, int, float]:
-        """Fetch HTML with retry logic and return (html, status_code, response_time)."""
-        last_exception = None
+    async def read_body(self, resp: aiohttp.ClientResponse, url: str, encoding: str, on_link=None) -> bytes:
+        """Read the body chunk by chunk, reporting links to on_link as they arrive."""
+        extractor = None
+        if on_link:
+            extractor = StreamingLinkExtractor(url, on_link)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
         
-        for attempt in range(self.max_retries):
-            start_time = time.time()
-            try:
-                # Apply rate limiting before request
-                await self.apply_rate_limit()
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            if self.max_body_bytes and size > self.max_body_bytes:
+                # Drop the connection rather than drain the rest of the body
+                resp.close()
+                self.bandwidth.record_rejected("too_large", declared_length(resp.headers), discarded=size)
+                raise BodyTooLarge(f"body exceeds {self.max_body_bytes} bytes")
+            chunks.append(chunk)
+            if extractor:
+                extractor.feed(decoder.decode(chunk))
+        
+        if extractor:
+            extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+        return b"".join(chunks)
+    
+    async def get_html(self, url: str, on_link=None) -> tuple[str, int, float]:
+        """
+        Fetch HTML once and return (html, status_code, response_time).
+        
+        If on_link is given it is called with each absolute <a href> target as soon
+        as it is tokenized, before the rest of the body has been downloaded.
+        Failures are raised as fetch_once raises them; retrying is left to the
+        caller, as crawl_page does with schedule_retry.
+        """
+        body, encoding, status_code, response_time, _ = await self.fetch_once(url, on_link)
+        return decode_body(body, encoding), status_code, response_time
+    
+    async def probe_head(self, url: str):
+        """Reject non-HTML or oversized responses with a HEAD request before downloading them."""
+        await self.apply_rate_limit(url)
+        self.bandwidth.head_probes += 1
+        async with self.fetch_slot(), self.session.head(url, allow_redirects=True) as resp:
+            if resp.status >= 400:
+                # HEAD refused or unsupported; let the GET decide
+                return
+            content_type = resp.headers.get("Content-Type", "")
+            declared = declared_length(resp.headers)
+            if content_type and not is_html_content_type(content_type):
+                self.bandwidth.head_rejected += 1
+                self.bandwidth.record_rejected("content_type", declared)
+                raise RuntimeError(f"invalid content-type: {content_type!r}")
+            if self.max_body_bytes and declared and declared > self.max_body_bytes:
+                self.bandwidth.head_rejected += 1
+                self.bandwidth.record_rejected("too_large", declared)
+                raise BodyTooLarge(f"Content-Length {declared} exceeds {self.max_body_bytes} bytes")
+    
+    async def fetch_once(self, url: str, on_link=None, timing: RequestTiming = None) -> tuple[bytes, str, int, float, dict]:
+        """
+        Make one request attempt while holding an adaptive concurrency slot for url's host.
+        
+        Returns (body, encoding, status_code, response_time, validators), where
+        validators holds the response's etag and last_modified. body is None
+        if an incremental crawl's revalidation said the page is unchanged.
+        If timing is given, the request's phases are recorded on it; the
+        caller has started its throttle phase.
+        """
+        if timing is None:
+            timing = RequestTiming()
+            timing.start("throttle")
+        started = await self.concurrency.acquire(url)
+        outcome, latency = "error", None
+        try:
+            cached = self.cache.lookup(url) if self.cache is not None else None
+            headers = ResponseCache.conditional_headers(cached) if cached else None
+            if not headers and self.incremental is not None:
+                headers = self.incremental.conditional_headers(normalize_url(url, self.url_policy))
+            if self.head_probe and not cached and not headers:
+                timing.end("throttle")
+                await self.probe_head(url)
+                timing.start("throttle")
+            
+            # Rate limiting before the crawl-wide slot, so a throttled host never holds one while it waits
+            await self.apply_rate_limit(url)
+            async with self.fetch_slot():
+                timing.end("throttle")
+                start_time = time.time()
                 
-                async with self.session.get(url, timeout=10) as resp:
+                async with self.session.get(url, headers=headers, trace_request_ctx=timing) as resp:
                     status_code = resp.status
+                    if status_code in OVERLOAD_STATUSES:
+                        outcome = "overload"
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"), self.concurrency.config["max_retry_after"])
+                        if retry_after:
+                            self.concurrency.pause(url, retry_after)
+                        raise Throttled(status_code, retry_after)
+                    if status_code == 304 and cached:
+                        body = self.cache.load_body(cached)
+                        if body is None:
+                            raise RuntimeError("cached body missing for 304 response")
+                        self.cache.record_hit(cached, len(body))
+                        outcome, latency = "ok", time.time() - start_time
+                        return body, cached.encoding, status_code, latency, {"etag": cached.etag, "last_modified": cached.last_modified}
+                    if status_code == 304 and headers:
+                        # Unchanged since the previous run; its record is reused
+                        outcome, latency = "ok", time.time() - start_time
+                        return None, "utf-8", status_code, latency, _validators(resp)
+                    if resp.status >= 500:
+                        raise ServerError(resp.status)
                     if resp.status >= 400:
                         raise RuntimeError(f"received status code {resp.status}")
                     content_type = resp.headers.get("Content-Type", "")
-                    if not content_type.lower().startswith("text/html"):
+                    declared = declared_length(resp.headers)
+                    if not is_html_content_type(content_type):
+                        resp.close()
+                        self.bandwidth.record_rejected("content_type", declared)
                         raise RuntimeError(f"invalid content-type: {content_type!r}")
-                    html = await resp.text()
+                    if self.max_body_bytes and declared and declared > self.max_body_bytes:
+                        resp.close()
+                        self.bandwidth.record_rejected("too_large", declared)
+                        raise BodyTooLarge(f"Content-Length {declared} exceeds {self.max_body_bytes} bytes")
+                    encoding = resp.charset or "utf-8"
+                    try:
+                        codecs.lookup(encoding)
+                    except LookupError:
+                        encoding = "utf-8"
+                    body = await self.read_body(resp, url, encoding, on_link)
+                    timing.end("download")
                     response_time = time.time() - start_time
-                    return html, status_code, response_time
-                    
-            except asyncio.TimeoutError as exc:
-                last_exception = exc
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delay * (2 ** attempt)  # Exponential backoff
-                    print(f"Timeout fetching {url}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
-                    await asyncio.sleep(delay)
-                    continue
-                    
-            except aiohttp.ClientError as exc:
-                last_exception = exc
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delay * (2 ** attempt)
-                    print(f"Network error fetching {url}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
-                    await asyncio.sleep(delay)
-                    continue
-                    
-            except Exception as exc:
-                # Don't retry on other exceptions (like content-type errors)
-                raise RuntimeError(f"failed to fetch {url}: {exc}") from exc
-        
-        # All retries exhausted
-        raise RuntimeError(f"failed to fetch {url} after {self.max_retries} attempts: {last_exception}") from last_exception
+                    outcome, latency = "ok", response_time
+                    self.bandwidth.record_page(len(body))
+                    if self.cache is not None:
+                        self.cache.record_miss()
+                        self.cache.store(url, body, encoding, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                    return body, encoding, status_code, response_time, _validators(resp)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            self.concurrency.release(url, started, outcome, latency)
 
-    async def crawl_page(self, url: str, depth: int = 0, parent_url: str = None) -> None:
+    def enqueue_link(self, url: str, depth: int, parent_url: str = None, recrawl: bool = False) -> bool:
+        """
+        Queue a discovered link if it is crawlable, on the base domain and not yet seen.
+
+        With recrawl (a URL a distributed worker has leased), a URL seen before is queued again.
+        """
         if self.should_stop:
-            return
+            return False
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https", ""):
+            return False
+        normalized_url = normalize_url(url, self.url_policy)
+        if self.frontier.is_seen(normalized_url) and not recrawl:
+            return False
+        domain = _get_domain_from_normalized(normalized_url)
+        if domain != self.base_domain:
+            print(f"Skipping {url} (different domain: {domain})")
+            return False
+        if has_skipped_extension(url, self.skip_extensions):
+            self.bandwidth.record_skipped()
+            return False
+        if self.shard is not None and not self.shard.owns(normalized_url):
+            # The owning shard dedups, checks robots.txt and crawls it
+            self.shard.forward(url, depth, parent_url, normalized_url)
+            return False
+        if self.robots is not None:
+            allowed = self.robots.allowed(url)
+            if allowed is None:
+                # First link to this host; check again once its robots.txt is in
+                task = asyncio.create_task(self.enqueue_after_robots(url, depth, parent_url, recrawl))
+                self.robots_pending.add(task)
+                task.add_done_callback(self.robots_pending.discard)
+                return False
+            if not allowed:
+                return False
+        return self.frontier.add(url, depth, parent_url, recrawl)
+
+    async def crawl_page(self, url: str, depth: int = 0, parent_url: str = None) -> bool:
+        """
+        Fetch and extract one page, then queue its links.
+        
+        Returns True if the page was handed back to the frontier to be retried
+        later, in which case the caller must not mark it done.
+        """
+        current_norm = normalize_url(url, self.url_policy)
+        retrying = current_norm in self.retry_attempts
+        if self.should_stop and not retrying:
+            return False
+
+        def on_link(new_url: str):
+            self.enqueue_link(new_url, depth + 1, url)
 
         try:
-            current_norm = normalize_url(url)
-            current_domain = _get_domain_from_normalized(current_norm)
-            
-            if current_domain != self.base_domain:
-                print(f"Skipping {url} (different domain: {current_domain})")
-                return
-            if not await self.add_page_visit(current_norm):
-                return
+            if not retrying and not await self.add_page_visit(current_norm):
+                return False
             
-            # Track depth and incoming links
-            async with self.lock:
-                if current_norm not in self.page_depth:
-                    self.page_depth[current_norm] = depth
+            if self.incremental is not None and self.incremental.unchanged_in_sitemap(current_norm):
+                # Sitemap says nothing changed since the previous run fetched it
+                data = self.incremental.reuse(current_norm, "unchanged_sitemap")
+            else:
+                data = await self.fetch_and_extract(url, current_norm, depth, parent_url, on_link)
+                if data is True:
+                    # Deferred for a retry
+                    return True
+                if data is None:
+                    return False
+            canonical_key = self.url_policy.learn_canonical(url, data.get("canonical_url"))
+            if canonical_key is not None:
+                if not self.frontier.is_seen(canonical_key):
+                    # Links to the canonical URL now lead to this record instead of another fetch
+                    self.url_policy.alias(canonical_key, current_norm)
                 else:
-                    self.page_depth[current_norm] = min(self.page_depth[current_norm], depth)
-                
-                if parent_url:
-                    self.incoming_links[current_norm].append(parent_url)
+                    # The canonical URL was crawled or queued first and keeps the primary record
+                    data["duplicate_of"] = canonical_key
+                    self.canonical_duplicates += 1
+            if self.traps is not None and "error" not in data:
+                self.traps.record_page(current_norm, data)
+            data["depth"] = depth
+            # A page is claimed once, from the link that reached it first (the frontier keeps its depth and parent)
+            data["incoming_links"] = [parent_url] if parent_url else []
+            data["incoming_link_count"] = len(data["incoming_links"])
             
-            print(f"Fetching: {url} (depth: {depth})")
-            async with self.semaphore:
-                try:
-                    html, status_code, response_time = await self.get_html(url)
-                except Exception as exc:
-                    print(f"Error fetching {url}: {exc}")
-                    async with self.lock:
-                        self.page_data[current_norm] = {
-                            "url": url,
-                            "error": str(exc),
-                            "depth": depth,
-                            "incoming_link_count": len(self.incoming_links[current_norm])
-                        }
-                    return
-                
-                try:
-                    data = extract_page_data(html, url)
-                    # Add additional metadata
-                    data["status_code"] = status_code
-                    data["response_time"] = response_time
-                    data["depth"] = depth
-                    data["incoming_links"] = self.incoming_links[current_norm].copy()
-                    data["incoming_link_count"] = len(self.incoming_links[current_norm])
-                    
-                    async with self.lock:
-                        self.page_data[current_norm] = data
-                except Exception as exc:
-                    print(f"Error extracting data from {url}: {exc}")
-                    async with self.lock:
-                        self.page_data[current_norm] = {
-                            "url": url,
-                            "error": f"extract error: {exc}",
-                            "status_code": status_code,
-                            "response_time": response_time,
-                            "depth": depth,
-                            "incoming_link_count": len(self.incoming_links[current_norm])
-                        }
-                    return
-                
+            # Links already queued while streaming are skipped by the frontier
+            for new_url in data["outgoing_links"]:
                 if self.should_stop:
-                    return
-                    
-                try:
-                    urls = get_urls_from_html(html, url)
-                    tasks = []
-                    for new_url in urls:
-                        if self.should_stop:
-                            break
-                        parsed = urlparse(new_url)
-                        if parsed.scheme not in ("http", "https", ""):
-                            continue
-                        task = asyncio.create_task(self.crawl_page(new_url, depth=depth + 1, parent_url=url))
-                        tasks.append(task)
-                        self.all_tasks.add(task)
-                    if tasks:
-                        try:
-                            await asyncio.gather(*tasks)
-                        finally:
-                            for task in tasks:
-                                self.all_tasks.discard(task)
-                except Exception as exc:
-                    print(f"Error processing links from {url}: {exc}")
+                    break
+                on_link(new_url)
+            
+            # Stored after its links are queued, so a checkpoint never has a finished page without its children
+            await self.store_page(current_norm, data)
         
         except Exception as exc:
             print(f"Error crawling {url}: {exc}")
+        return False
+
+    async def fetch_and_extract(self, url: str, current_norm: str, depth: int, parent_url: str, on_link):
+        """
+        Fetch and extract a page that crawl_page has claimed.
+        
+        Returns the page record, True if the URL was deferred for a retry, or
+        None if it failed (the error record has already been stored).
+        """
+        wait = self.breaker.check(url)
+        if wait == math.inf:
+            await self.record_fetch_error(url, current_norm, depth, parent_url,
+                                          f"failed to fetch {url}: circuit open for host")
+            return None
+        if wait > 0:
+            # Host is failing; come back once its circuit allows a probe
+            self.retry_attempts.setdefault(current_norm, 0)
+            self.frontier.defer(url, depth, parent_url, wait)
+            return True
+        
+        print(f"Fetching: {url} (depth: {depth})")
+        timing = RequestTiming()
+        # Waiting for a crawl-wide slot is our own throttling too
+        timing.start("throttle")
+        async with self.semaphore:
+            try:
+                body, encoding, status_code, response_time, validators = await self.fetch_once(
+                    url, on_link=on_link if self.stream_links else None, timing=timing
+                )
+            except RETRYABLE_ERRORS as exc:
+                self.breaker.record_failure(url)
+                if self.schedule_retry(url, depth, parent_url, exc):
+                    return True
+                await self.record_fetch_error(
+                    url, current_norm, depth, parent_url, f"failed to fetch {url} after {self.max_retries} attempts: {exc}"
+                )
+                return None
+            except Exception as exc:
+                # The host answered; the page itself is unusable
+                self.breaker.record_success(url)
+                await self.record_fetch_error(url, current_norm, depth, parent_url, f"failed to fetch {url}: {exc}")
+                return None
+        self.breaker.record_success(url)
+        if self.retry_attempts.get(current_norm):
+            self.retry_stats["recovered_pages"] += 1
+        
+        content_hash = hashlib.sha256(body).hexdigest() if body is not None else None
+        if self.incremental is not None:
+            if body is None:
+                data = self.incremental.reuse(current_norm, "not_modified")
+                data["timing"] = timing.as_dict()
+                return data
+            if self.incremental.same_content(current_norm, content_hash):
+                data = self.incremental.reuse(current_norm, "same_content")
+                data.update({key: value for key, value in validators.items() if value})
+                data["timing"] = timing.as_dict()
+                return data
+        
+        # Parse outside the semaphore so fetching continues while pages are extracted
+        try:
+            data = await self.extractor.extract(body, encoding, url)
+        except Exception as exc:
+            print(f"Error extracting data from {url}: {exc}")
+            await self.store_page(current_norm, {
+                "url": url,
+                "error": f"extract error: {exc}",
+                "status_code": status_code,
+                "response_time": response_time,
+                "depth": depth,
+                "incoming_link_count": 1 if parent_url else 0
+            })
+            return None
+        # Additional metadata; the validators let a later incremental crawl skip this page
+        data["status_code"] = status_code
+        data["response_time"] = response_time
+        data["timing"] = timing.as_dict()
+        data["content_hash"] = content_hash
+        data["etag"] = validators["etag"]
+        data["last_modified"] = validators["last_modified"]
+        data["fetched_at"] = time.time()
+        if self.incremental is not None:
+            self.incremental.record_fetched(current_norm)
+        return data
+
+    def fetch_slot(self):
+        """A slot from the shared fetch scheduler when crawling alongside other sites."""
+        if self.fetch_scheduler is None:
+            return contextlib.nullcontext()
+        return self.fetch_scheduler.slot(self.base_domain)
+
+    async def store_page(self, normalized_url: str, data: dict):
+        """Record a finished page (or its error) and checkpoint it."""
+        async with self.lock:
+            self.page_data[normalized_url] = data
+        if self.checkpoint is not None:
+            self.checkpoint.record_page(normalized_url, data)
+
+    async def record_fetch_error(self, url: str, normalized_url: str, depth: int, parent_url: Optional[str], error: str):
+        print(f"Error fetching {url}: {error}")
+        await self.store_page(normalized_url, {
+            "url": url,
+            "error": error,
+            "depth": depth,
+            "incoming_link_count": 1 if parent_url else 0
+        })
+
+    def schedule_retry(self, url: str, depth: int, parent_url: str, exc: Exception) -> bool:
+        """Hand a failed fetch back to the frontier for a later attempt; False once attempts run out."""
+        normalized_url = normalize_url(url, self.url_policy)
+        attempts = self.retry_attempts.get(normalized_url, 0) + 1
+        self.retry_attempts[normalized_url] = attempts
+        if attempts >= self.max_retries:
+            self.retry_stats["failed_after_retries"] += 1
+            return False
+        # Retry-After if the server sent one, otherwise exponential backoff
+        retry_after = getattr(exc, "retry_after", None)
+        delay = retry_after if retry_after is not None else self.retry_delay * (2 ** (attempts - 1))
+        if attempts == 1:
+            self.retry_stats["retried_pages"] += 1
+        self.retry_stats["retries_scheduled"] += 1
+        print(f"{type(exc).__name__} fetching {url}, retrying in {delay:.1f}s (attempt {attempts}/{self.max_retries})")
+        self.frontier.defer(url, depth, parent_url, delay)
+        return True
+
+    async def worker(self):
+        """Take URLs off the frontier until the crawl is cancelled."""
+        while True:
+            url, depth, parent_url = await self.frontier.get()
+            deferred = False
+            try:
+                deferred = await self.crawl_page(url, depth, parent_url)
+            finally:
+                # A deferred URL is marked done when the frontier re-queues it
+                if not deferred:
+                    self.frontier.task_done()
+
+    async def seed(self):
+        """Queue the base URL (and a previous run's pages when crawling incrementally)."""
+        if self.shard is not None and not self.shard.owns(normalize_url(self.base_url, self.url_policy)):
+            # Another shard starts the crawl; links reach this one over IPC
+            return
+        if self.robots is not None:
+            await self.load_robots(self.base_url)
+        if self.robots is not None and not self.robots.allowed(self.base_url):
+            print(f"{self.base_url} is disallowed by robots.txt")
+        else:
+            self.frontier.add(self.base_url, 0)
+        if self.incremental is not None:
+            await self.seed_from_previous_run()
+
+    def start_workers(self) -> list:
+        # Enough workers to keep every fetch slot busy while others wait on extraction
+        num_workers = self.max_concurrency + self.extractor.workers
+        return [asyncio.create_task(self.worker()) for _ in range(num_workers)]
+
+    async def wait_until_idle(self):
+        """Wait until no URL is queued, in flight, deferred for a retry or waiting on robots.txt."""
+        await self.frontier.join()
+        while self.robots_pending:
+            await asyncio.gather(*self.robots_pending)
+            await self.frontier.join()
+
+    async def stop_workers(self, workers: list):
+        for task in workers + list(self.robots_pending):
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
     async def crawl(self) -> dict:
+        await self.seed()
+        workers = self.start_workers()
         try:
-            await self.crawl_page(self.base_url)
+            await self.wait_until_idle()
         except asyncio.CancelledError:
             print("Crawl cancelled")
+        finally:
+            await self.stop_workers(workers)
+        
+        network = self.connection_stats.summary()
+        print(f"Connections: {network['connections_created']} opened, {network['connections_reused']} reused "
+              f"({network['connection_reuse_rate']:.1f}%), pool waits: {network['pool_waits']} "
+              f"(avg {network['avg_pool_wait'] * 1000:.1f}ms)")
         return self.page_data
+    
+    async def seed_from_previous_run(self):
+        """Read sitemap lastmods and queue every page the previous run found."""
+        sitemap_urls = self.robots.sitemaps(self.base_url) if self.robots is not None else []
+        if not sitemap_urls:
+            parsed = urlparse(self.base_url)
+            sitemap_urls = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+        await self.incremental.load_sitemaps(self.session, sitemap_urls)
+        for url, depth, parent_url in self.incremental.seeds():
+            self.enqueue_link(url, depth, parent_url)
+        print(f"Incremental crawl: {len(self.incremental.previous)} pages from {self.incremental.previous_run_dir}, "
+              f"{len(self.incremental.lastmod)} sitemap lastmods")
+    
+    def get_crawl_stats(self) -> dict:
+        """Crawl-level statistics (not tied to any one page) for the reports."""
+        stats = {
+            "network": self.connection_stats.summary(),
+            "bandwidth": self.bandwidth.summary()
+        }
+        if self.cache is not None:
+            stats["cache"] = self.cache_summary or self.cache.summary()
+        stats["concurrency"] = self.concurrency.summary()
+        if self.checkpoint is not None:
+            stats["checkpoint"] = self.checkpoint_summary or self.checkpoint.summary()
+        stats["retries"] = dict(self.retry_stats)
+        if self.breaker.enabled:
+            stats["circuit_breaker"] = self.breaker.summary()
+        if self.robots is not None:
+            stats["robots"] = self.robots.summary()
+        if self.incremental is not None:
+            stats["incremental"] = self.incremental.summary()
+        if self.fetch_scheduler is not None:
+            stats["fair_scheduling"] = self.fetch_scheduler.summary(self.base_domain)
+        if self.traps is not None:
+            stats["traps"] = self.traps.summary()
+        stats["url_policy"] = {**self.url_policy.summary(), "canonical_duplicates": self.canonical_duplicates}
+        if self.page_data.stats["pages_spilled"]:
+            stats["page_store"] = self.page_data.summary()
+        return stats
 
 async def crawl_site_async(base_url: str, max_concurrency: int = 3, max_pages: int = 10,
-                          max_retries: int = 3, retry_delay: float = 1.0, rate_limit: float = 0) -> dict:
-    async with AsyncCrawler(base_url, max_concurrency, max_pages, max_retries, retry_delay, rate_limit) as crawler:
-        return await crawler.crawl()
+                          max_retries: int = 3, retry_delay: float = 1.0, rate_limit: float = 0,
+                          parser: str = None, stream_links: bool = True, extraction: dict = None,
+                          max_depth: int = 0, page_type_priority: dict = None,
+                          rate_burst: int = 1, host_rate_limits: dict = None,
+                          timeout: float = 10, network: dict = None) -> dict:
+    """Crawl base_url and return its page records; close() the returned PageStore once done with it."""
+    score = page_type_score(page_type_priority) if page_type_priority else None
+    async with AsyncCrawler(base_url, max_concurrency, max_pages, max_retries, retry_delay, rate_limit,
+                            parser=parser, stream_links=stream_links, extraction=extraction,
+                            max_depth=max_depth, score=score, rate_burst=rate_burst,
+                            host_rate_limits=host_rate_limits, timeout=timeout, network=network) as crawler:
+        try:
+            return await crawler.crawl()
+        except BaseException:
+            crawler.page_data.close()
+            raise
+
+def crawler_options_from_config(config) -> dict:
+    """AsyncCrawler keyword arguments from a config_loader.Config."""
+    page_type_priority = config.page_type_priority
+    return dict(
+        max_concurrency=config.max_concurrency,
+        max_pages=config.max_pages,
+        max_retries=config.max_retries,
+        retry_delay=config.retry_delay,
+        rate_limit=config.rate_limit,
+        parser=config.parser,
+        stream_links=config.stream_links,
+        extraction=config.get_extraction_config(),
+        max_depth=config.max_depth,
+        score=page_type_score(page_type_priority) if page_type_priority else None,
+        rate_burst=config.rate_burst,
+        host_rate_limits=config.host_rate_limits,
+        timeout=config.timeout,
+        network=config.get_network_config(),
+        cache=config.get_cache_config(),
+        fetch=config.get_fetch_config(),
+        respect_robots_txt=config.respect_robots_txt,
+        robots=config.get_robots_config(),
+        concurrency=config.get_concurrency_config(),
+        circuit_breaker=config.get_circuit_breaker_config(),
+        checkpoint=config.get_checkpoint_config(),
+        incremental=config.get_incremental_config(),
+        traps=config.get_traps_config(),
+        url_policy=config.get_url_policy_config(),
+        url_table=config.get_url_table_config(),
+        page_store=config.get_page_store_config()
+    )
+
+def crawler_from_config(base_url: str, config, **overrides) -> AsyncCrawler:
+    """Build an AsyncCrawler from a config_loader.Config; keyword overrides win."""
+    options = crawler_options_from_config(config)
+    options.update(overrides)
+    return AsyncCrawler(base_url, **options)
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Cache-Control": "max-age=0"
+}
+
+def create_session(network: dict, timeout: float, connection_stats: ConnectionStats):
+    """
+    The crawler's HTTP session: pooled connections, timeouts, connection tracing and browser-like headers.
+    
+    network.backend picks aiohttp (HTTP/1.1) or httpx (HTTP/2, see httpx_backend).
+    """
+    backend = (network or {}).get("backend", "aiohttp")
+    if backend == "httpx":
+        from httpx_backend import HTTPXSession
+        return HTTPXSession(network, timeout, connection_stats, headers=BROWSER_HEADERS)
+    if backend != "aiohttp":
+        raise ValueError(f"Unknown network backend {backend!r}; choose one of {', '.join(NETWORK_BACKENDS)}")
+    return aiohttp.ClientSession(
+        connector=build_connector(network),
+        timeout=build_timeout(network, timeout),
+        trace_configs=[connection_stats.trace_config(), request_timing_trace_config()],
+        headers=BROWSER_HEADERS)
+
+def _validators(resp: aiohttp.ClientResponse) -> dict:
+    return {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
 
 def _get_domain_from_normalized(normalized_url: str) -> str:
     return normalized_url.split("/", 1)[0]
@@ -257,11 +779,13 @@ async def main_async():
     print(f"max pages to crawl: {max_pages}")
     
     page_data = await crawl_site_async(base_url, max_concurrency, max_pages)
-    
-    print(f"\nCrawl complete. Pages found: {len(page_data)}")
-    print("Writing results to report.csv")
-    write_csv_report(page_data)
-    print("Report written to report.csv")
+    try:
+        print(f"\nCrawl complete. Pages found: {len(page_data)}")
+        print("Writing results to report.csv")
+        write_csv_report(page_data)
+        print("Report written to report.csv")
+    finally:
+        page_data.close()
 
 if __name__ == "__main__":
     asyncio.run(main_async())
\ No newline at end of file
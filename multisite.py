@@ -0,0 +1,200 @@
+"""
+Crawl several sites at once in one event loop.
+
+Each site keeps its own AsyncCrawler (and so its own page, concurrency and
+rate budgets, frontier and output), while the sites share one HTTP session
+(connection pool), one parser pool and a fixed number of fetch slots. The
+slots are handed out round-robin between sites, so a site with a large
+budget can't starve the others.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from config_loader import Config
+from extraction_pool import ExtractionPool
+from main import create_session
+from network import ConnectionStats
+
+
+DEFAULT_MULTISITE_CONFIG = {
+    "total_concurrency": 10,
+}
+
+# Per-site job keys and the config values they override
+SITE_OPTIONS = {
+    "max_pages": ("crawling", "max_pages"),
+    "max_concurrency": ("crawling", "max_concurrency"),
+    "rate_limit": ("crawling", "rate_limit"),
+    "max_depth": ("analysis", "max_depth"),
+    "incremental": ("incremental", "previous_run"),
+    "cache_dir": ("cache", "directory"),
+}
+
+
+def load_jobs(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Read a jobs file.
+
+    The file has a `sites` list whose entries are either a URL or a mapping
+    with `url` and any of the SITE_OPTIONS keys; other top-level keys are
+    multisite settings (e.g. total_concurrency).
+
+    Returns:
+        (site jobs, settings)
+    """
+    with open(path, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    sites = data.pop("sites", None)
+    if not sites:
+        raise ValueError(f"No sites listed in {path}")
+    jobs = []
+    for entry in sites:
+        job = {"url": entry} if isinstance(entry, str) else dict(entry)
+        if not job.get("url"):
+            raise ValueError(f"Site entry without a url in {path}: {entry!r}")
+        unknown = set(job) - set(SITE_OPTIONS) - {"url"}
+        if unknown:
+            raise ValueError(f"Unknown option(s) for {job['url']}: {', '.join(sorted(unknown))}")
+        jobs.append(job)
+    return jobs, data
+
+
+def site_config(config: Config, job: Dict[str, Any]) -> Config:
+    """A copy of config with one site's budget overrides applied."""
+    config = config.copy()
+    for key, (section, name) in SITE_OPTIONS.items():
+        if job.get(key) is not None:
+            config.set(section, name, job[key])
+    if job.get("cache_dir"):
+        config.set("cache", "enabled", True)
+    return config
+
+
+class FairScheduler:
+    """A fixed number of fetch slots shared round-robin between sites."""
+
+    def __init__(self, total_slots: int):
+        """
+        Initialize the scheduler.
+
+        Args:
+            total_slots: Fetches allowed in flight across all sites
+        """
+        self.free = total_slots
+        self.waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @asynccontextmanager
+    async def slot(self, site: str):
+        await self.acquire(site)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, site: str):
+        stats = self.stats.setdefault(site, {"fetches": 0, "waits": 0, "wait_time": 0.0})
+        stats["fetches"] += 1
+        if self.free > 0 and not self.waiting:
+            self.free -= 1
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.waiting.setdefault(site, deque()).append(future)
+        started = loop.time()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; pass the slot on
+                self.release()
+            raise
+        stats["waits"] += 1
+        stats["wait_time"] += loop.time() - started
+
+    def release(self):
+        """Hand the slot to the next waiting site in rotation, or free it."""
+        while self.waiting:
+            site, queue = self.waiting.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # Back of the line until every other waiting site has had a turn
+                self.waiting[site] = queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+    def summary(self, site: str) -> Dict[str, Any]:
+        """One site's share of the fetch slots."""
+        stats = self.stats.get(site, {"fetches": 0, "waits": 0, "wait_time": 0.0})
+        return {
+            **stats,
+            "avg_wait": stats["wait_time"] / stats["waits"] if stats["waits"] else 0.0
+        }
+
+
+class MultiSiteCrawl:
+    """Resources shared by the crawlers of a multi-site run."""
+
+    def __init__(self, total_concurrency: int = 10, network: dict = None, timeout: float = 10,
+                 parser: str = None, extraction: dict = None):
+        """
+        Initialize the run.
+
+        Args:
+            total_concurrency: Fetches in flight across all sites (0 for no shared limit)
+            network: The `network` config section for the shared connection pool
+            timeout: Request timeout in seconds
+            parser: HTML parser backend for the shared parser pool
+            extraction: The `extraction` config section for the shared parser pool
+        """
+        self.total_concurrency = total_concurrency
+        self.network = network or {}
+        self.timeout = timeout
+        self.parser = parser
+        self.extraction = extraction or {}
+        self.connection_stats = ConnectionStats()
+        self.scheduler = FairScheduler(total_concurrency) if total_concurrency else None
+        self.session = None
+        self.extractor = None
+
+    async def __aenter__(self):
+        self.session = create_session(self.network, self.timeout, self.connection_stats)
+        self.extractor = ExtractionPool(parser=self.parser, **self.extraction)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.extractor:
+            await self.extractor.close()
+        if self.session:
+            await self.session.close()
+
+    def crawler_options(self) -> Dict[str, Any]:
+        """Keyword arguments that make an AsyncCrawler use the shared resources."""
+        return {
+            "session": self.session,
+            "extractor": self.extractor,
+            "connection_stats": self.connection_stats,
+            "fetch_scheduler": self.scheduler,
+        }
+
+    async def crawl(self, crawlers: List[Any]) -> List[Optional[BaseException]]:
+        """
+        Crawl every site concurrently.
+
+        Returns:
+            Per crawler, None on success or the exception that ended its crawl;
+            one site failing doesn't stop the others
+        """
+        async def crawl_one(crawler):
+            async with crawler:
+                await crawler.crawl()
+
+        results = await asyncio.gather(*(crawl_one(crawler) for crawler in crawlers), return_exceptions=True)
+        return [result if isinstance(result, BaseException) else None for result in results]
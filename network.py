@@ -0,0 +1,187 @@
+"""
+aiohttp connection pool, timeout and tracing setup for the async crawler.
+
+The `network` section of config.yaml controls the connector (pool size,
+per-host limit, keep-alive, DNS cache) and the timeouts. ConnectionStats
+hooks aiohttp's tracing signals to count new vs. reused connections and
+time spent waiting for a free connection from the pool. RequestTiming
+splits a single request into phases (our own throttling, DNS, connect,
+TLS, time to first byte, download) through the same signals.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+
+DEFAULT_NETWORK_CONFIG = {
+    "pool_size": 100,
+    "limit_per_host": 0,
+    "keepalive_timeout": 30,
+    "dns_cache_ttl": 300,
+    "connect_timeout": 5,
+    "read_timeout": 10,
+    "total_timeout": 0,
+    "backend": "aiohttp",
+    "http2": True,
+    "verify_ssl": True,
+}
+
+# Fetch backends selectable with network.backend
+NETWORK_BACKENDS = ("aiohttp", "httpx")
+
+# Request phases in the order they happen. throttle is time spent waiting on
+# the crawler's own concurrency and rate limits; aiohttp reports TLS as part
+# of connect, and httpx reports DNS as part of connect.
+TIMING_PHASES = ("throttle", "dns", "connect", "tls", "ttfb", "download")
+
+
+def build_connector(network: Dict[str, Any] = None) -> aiohttp.TCPConnector:
+    """Create the TCP connector described by the network config."""
+    net = {**DEFAULT_NETWORK_CONFIG, **(network or {})}
+    dns_cache_ttl = net["dns_cache_ttl"]
+    return aiohttp.TCPConnector(
+        limit=net["pool_size"],
+        limit_per_host=net["limit_per_host"],
+        keepalive_timeout=net["keepalive_timeout"],
+        use_dns_cache=dns_cache_ttl > 0,
+        ttl_dns_cache=dns_cache_ttl if dns_cache_ttl > 0 else None,
+        ssl=None if net["verify_ssl"] else False
+    )
+
+
+def build_timeout(network: Dict[str, Any] = None, default_total: float = 10) -> aiohttp.ClientTimeout:
+    """Create request timeouts; a total_timeout of 0 falls back to crawling.timeout."""
+    net = {**DEFAULT_NETWORK_CONFIG, **(network or {})}
+    return aiohttp.ClientTimeout(
+        total=net["total_timeout"] or default_total or None,
+        connect=net["connect_timeout"] or None,
+        sock_read=net["read_timeout"] or None
+    )
+
+
+class ConnectionStats:
+    """Collect connection pool statistics through aiohttp tracing."""
+
+    def __init__(self):
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.pool_waits = 0
+        self.pool_wait_time = 0.0
+        self.pool_wait_max = 0.0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Build a TraceConfig wired to this collector."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_create)
+        trace_config.on_connection_reuseconn.append(self._on_reuse)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        trace_config.on_dns_cache_hit.append(self._on_dns_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_miss)
+        return trace_config
+
+    async def _on_create(self, session, ctx, params):
+        self.connections_created += 1
+
+    async def _on_reuse(self, session, ctx, params):
+        self.connections_reused += 1
+
+    async def _on_queued_start(self, session, ctx, params):
+        ctx.pool_wait_start = time.monotonic()
+
+    async def _on_queued_end(self, session, ctx, params):
+        waited = time.monotonic() - getattr(ctx, "pool_wait_start", time.monotonic())
+        self.pool_waits += 1
+        self.pool_wait_time += waited
+        self.pool_wait_max = max(self.pool_wait_max, waited)
+
+    async def _on_dns_hit(self, session, ctx, params):
+        self.dns_cache_hits += 1
+
+    async def _on_dns_miss(self, session, ctx, params):
+        self.dns_cache_misses += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the collected statistics."""
+        total = self.connections_created + self.connections_reused
+        return {
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "connection_reuse_rate": (self.connections_reused / total * 100) if total else 0,
+            "pool_waits": self.pool_waits,
+            "avg_pool_wait": self.pool_wait_time / self.pool_waits if self.pool_waits else 0,
+            "max_pool_wait": self.pool_wait_max,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses
+        }
+
+
+class RequestTiming:
+    """Durations of one request's phases; passed to the session as trace_request_ctx."""
+
+    def __init__(self):
+        self.phases = {}
+        self._started = {}
+
+    def start(self, phase: str):
+        self._started[phase] = time.perf_counter()
+
+    def end(self, phase: str):
+        """Add the time since start(phase); repeated phases (redirects) accumulate."""
+        started = self._started.pop(phase, None)
+        if started is not None:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - started
+
+    def as_dict(self) -> Dict[str, float]:
+        """Measured phases in seconds; phases that didn't happen (reused connection, cached DNS) are left out."""
+        return {phase: round(self.phases[phase], 6) for phase in TIMING_PHASES if phase in self.phases}
+
+
+def _request_timing(ctx) -> Optional[RequestTiming]:
+    return ctx.trace_request_ctx if isinstance(ctx.trace_request_ctx, RequestTiming) else None
+
+
+def request_timing_trace_config() -> aiohttp.TraceConfig:
+    """A TraceConfig that fills the RequestTiming passed as a request's trace_request_ctx."""
+    async def on_dns_start(session, ctx, params):
+        if timing := _request_timing(ctx):
+            timing.start("dns")
+
+    async def on_dns_end(session, ctx, params):
+        if timing := _request_timing(ctx):
+            timing.end("dns")
+
+    async def on_create_start(session, ctx, params):
+        if timing := _request_timing(ctx):
+            ctx.dns_before_connect = timing.phases.get("dns", 0.0)
+            timing.start("connect")
+
+    async def on_create_end(session, ctx, params):
+        if timing := _request_timing(ctx):
+            timing.end("connect")
+            # aiohttp resolves the host inside connection setup; keep DNS separate
+            if "connect" in timing.phases:
+                timing.phases["connect"] -= timing.phases.get("dns", 0.0) - ctx.dns_before_connect
+
+    async def on_headers_sent(session, ctx, params):
+        if timing := _request_timing(ctx):
+            timing.start("ttfb")
+
+    async def on_request_end(session, ctx, params):
+        # Fired once the response headers are in; the caller ends download after reading the body
+        if timing := _request_timing(ctx):
+            timing.end("ttfb")
+            timing.start("download")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_create_start)
+    trace_config.on_connection_create_end.append(on_create_end)
+    trace_config.on_request_headers_sent.append(on_headers_sent)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
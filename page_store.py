@@ -0,0 +1,199 @@
+"""
+Page records that spill to disk instead of all staying in memory.
+
+AsyncCrawler.page_data used to be a dict holding every extracted record,
+link and image lists included, until the reports were written. PageStore
+keeps the same mapping interface over two tiers:
+
+- memory: the memory_pages most recently stored or read records (LRU)
+- disk: records evicted from memory, as JSON rows in a SQLite file
+
+Evictions are written in batches, one transaction each. store[key] pulls
+a spilled record back into memory, so changing it in place sticks just as
+it does for records that never left. items() and values() stream the disk
+tier through a cursor before the memory tier, so the report generators
+only ever hold one spilled record at a time; the spilled records they
+yield are copies, and changes to them need store[key] = record.
+
+The database is a scratch file: no journal, no fsync, deleted by close()
+or when the store is garbage collected. memory_pages: 0 never spills.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+DEFAULT_PAGE_STORE_CONFIG = {
+    "memory_pages": 5000,   # records kept in memory before spilling (0 = never spill)
+    "directory": None,      # where the spill file goes (None = the system temp directory)
+}
+
+
+def _remove(db: sqlite3.Connection, path: str):
+    db.close()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for _, data in self._mapping._iter_items():
+            yield data
+
+
+class PageStore(MutableMapping):
+    """Normalized URL -> page record, with the least recently used records on disk."""
+
+    def __init__(self, memory_pages: int = 5000, directory: str = None):
+        """
+        Initialize an empty store; the spill file is created on the first eviction.
+
+        Args:
+            memory_pages: Records held in memory (0 keeps everything in memory)
+            directory: Directory for the spill file (None for the system temp directory)
+        """
+        self.memory_pages = memory_pages
+        self.directory = directory
+        # Evict a tenth of the memory tier at a time so commits stay rare
+        self.evict_batch = max(1, memory_pages // 10)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self._finalizer = None
+        self._disk_count = 0
+        self.stats = {"pages_spilled": 0, "spill_batches": 0, "disk_reads": 0}
+
+    def _open(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        fd, self._path = tempfile.mkstemp(prefix="pages-", suffix=".sqlite3", dir=self.directory)
+        os.close(fd)
+        # Filled in one thread and read in another, e.g. by crawl_sharded under asyncio.to_thread; never concurrently
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE pages (normalized_url TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self._finalizer = weakref.finalize(self, _remove, self._db, self._path)
+
+    def _spill(self):
+        """Move the least recently used records to disk in one transaction."""
+        if self._db is None:
+            self._open()
+        memory = self._memory
+        rows = [memory.popitem(last=False) for _ in range(min(self.evict_batch, len(memory)))]
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages (normalized_url, data) VALUES (?, ?)",
+                ((key, json.dumps(data)) for key, data in rows)
+            )
+        self._disk_count += len(rows)
+        self.stats["pages_spilled"] += len(rows)
+        self.stats["spill_batches"] += 1
+
+    def _load(self, key: str) -> Dict[str, Any]:
+        row = None
+        if self._disk_count:
+            row = self._db.execute("SELECT data FROM pages WHERE normalized_url = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        self.stats["disk_reads"] += 1
+        return json.loads(row[0])
+
+    def _delete_from_disk(self, key: str) -> bool:
+        if not self._disk_count:
+            return False
+        deleted = self._db.execute("DELETE FROM pages WHERE normalized_url = ?", (key,)).rowcount
+        self._disk_count -= deleted
+        return deleted > 0
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        memory = self._memory
+        if key in memory:
+            memory.move_to_end(key)
+            return memory[key]
+        # Pulled back into memory: changes made in place to a copy that is never stored again would be lost
+        data = self._load(key)
+        self[key] = data
+        return data
+
+    def __setitem__(self, key: str, data: Dict[str, Any]):
+        memory = self._memory
+        if key in memory:
+            memory.move_to_end(key)
+        else:
+            # A placeholder that was spilled before the page finished
+            self._delete_from_disk(key)
+        memory[key] = data
+        if self.memory_pages and len(memory) > self.memory_pages:
+            self._spill()
+
+    def __delitem__(self, key: str):
+        if key in self._memory:
+            del self._memory[key]
+        elif not self._delete_from_disk(key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._memory:
+            return True
+        return bool(self._disk_count) and self._db.execute(
+            "SELECT 1 FROM pages WHERE normalized_url = ?", (key,)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._disk_count
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self._iter_items():
+            yield key
+
+    def _iter_items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if self._disk_count:
+            for key, data in self._db.execute("SELECT normalized_url, data FROM pages"):
+                yield key, json.loads(data)
+        yield from self._memory.items()
+
+    def items(self) -> ItemsView:
+        """(normalized URL, record) pairs, spilled records first, read one at a time (as copies)."""
+        return _Items(self)
+
+    def values(self) -> ValuesView:
+        """Records, spilled ones first, read one at a time (as copies)."""
+        return _Values(self)
+
+    def close(self):
+        """Drop every record and delete the spill file."""
+        self._memory.clear()
+        self._disk_count = 0
+        if self._finalizer is not None:
+            self._finalizer()
+            self._db = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        return {
+            "memory_pages": self.memory_pages,
+            "pages_in_memory": len(self._memory),
+            "pages_on_disk": self._disk_count,
+            **self.stats,
+            "disk_bytes": os.path.getsize(self._path) if self._db is not None else 0
+        }
+
+
+def build_page_store(config: Dict[str, Any] = None) -> PageStore:
+    """A PageStore for the page_store config section."""
+    config = {**DEFAULT_PAGE_STORE_CONFIG, **(config or {})}
+    return PageStore(config["memory_pages"], config["directory"])
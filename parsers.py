@@ -0,0 +1,360 @@
+"""
+HTML parser backends for page extraction.
+
+Every backend walks a document once and returns the raw fields that
+crawl.extract_page_data turns into a page record:
+
+    (h1_text, first_paragraph_text, [href, ...], [img src, ...], canonical_href)
+
+hrefs, srcs and the canonical href are returned exactly as they appear in
+the markup; resolving and classifying them is left to the caller so all
+backends share that logic. canonical_href is the href of the first
+<link rel="canonical"> outside <body> (None if there is none); links in
+comments and scripts are never elements, so they can't match.
+
+html.parser is the reference: its output is what the crawler has always
+produced. The other backends follow its text rules (the whole text of the
+element, without <script>, <style> and <template> text) and agree with it
+on well-formed markup. They can't agree where the trees themselves differ:
+
+- implied end tags: html.parser never closes an element implicitly, so in
+  <p>one<p>two or <p>Text<div>more</div> the paragraph keeps the text that
+  follows ("onetwo", "Textmore"); lxml and lexbor close the <p> as the HTML
+  spec says ("one", "Text"), and lexbor also closes an <h1> at a nested
+  heading
+- misnested tables: lxml moves a <table> out of an open <p>
+- CDATA sections: html.parser keeps their text; lxml and lexbor read them
+  as comments, as the HTML spec does outside SVG and MathML
+- <template>: lexbor keeps template contents out of the document, so links
+  and images inside a <template> are missing from its output, and a <p>
+  inside one is never taken as the first paragraph
+
+test_parsers.DIVERGENT_PAGES lists these cases.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+RawPageFields = Tuple[str, str, List[str], List[str], Optional[str]]
+
+DEFAULT_PARSER = "html.parser"
+
+# Their text is left out of headings and paragraphs, as BeautifulSoup's get_text() does
+SKIPPED_TAGS = frozenset({"script", "style", "template"})
+
+# Elements that may come before <body> without opening it
+HEAD_TAGS = frozenset({"html", "head", "base", "link", "meta", "noscript", "script", "style", "template", "title"})
+
+
+def _is_canonical(rel: Optional[str]) -> bool:
+    return bool(rel) and "canonical" in rel.lower().split()
+
+
+class ParserBackend:
+    """Base class for HTML parser backends."""
+
+    name = None
+    requires = None  # pip package needed for this backend, if any
+
+    def extract(self, html: str) -> RawPageFields:
+        """Parse html and return (h1, first_paragraph, hrefs, image_srcs, canonical_href)."""
+        raise NotImplementedError
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup with the stdlib html.parser (the original behavior)."""
+
+    name = "html.parser"
+
+    # Tags extraction needs; everything else is skipped during the walk.
+    TAGS = ["h1", "main", "p", "a", "img", "link"]
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, NavigableString, Tag
+        self._soup = BeautifulSoup
+        self._tag = Tag
+        # Comments, CDATA sections and doctypes are NavigableString subclasses
+        self._string = NavigableString
+
+    def extract(self, html: str) -> RawPageFields:
+        soup = self._soup(html, 'html.parser')
+
+        h1_tag = None
+        main_tag = None
+        first_p = None
+        main_p = None
+        hrefs = []
+        srcs = []
+        canonical = None
+
+        for tag in soup.find_all(self.TAGS):
+            name = tag.name
+            if name == 'a':
+                href = tag.get('href')
+                if href:
+                    hrefs.append(href)
+            elif name == 'img':
+                src = tag.get('src')
+                if src:
+                    srcs.append(src)
+            elif name == 'p':
+                if first_p is None:
+                    first_p = tag
+                if main_p is None and main_tag is not None and main_tag in tag.parents:
+                    main_p = tag
+            elif name == 'h1':
+                if h1_tag is None:
+                    h1_tag = tag
+            elif name == 'main':
+                if main_tag is None:
+                    main_tag = tag
+            elif name == 'link':
+                # rel is multi-valued, so BeautifulSoup already split it
+                if (canonical is None and tag.get('href') and _is_canonical(" ".join(tag.get('rel', [])))
+                        and tag.find_parent('template') is None and self._before_body(tag)):
+                    canonical = tag['href']
+
+        paragraph = main_p if main_p is not None else first_p
+        return (
+            h1_tag.get_text() if h1_tag else "",
+            paragraph.get_text() if paragraph else "",
+            hrefs,
+            srcs,
+            canonical
+        )
+
+    def _before_body(self, tag) -> bool:
+        """
+        True if tag comes before the body opens.
+
+        html.parser has no implied <body>, so this looks for what would open
+        one in the other parsers: an element that doesn't belong in <head> or
+        visible text.
+        """
+        for node in tag.previous_elements:
+            if node.find_parent('template') is not None:
+                continue
+            if isinstance(node, self._tag):
+                if node.name not in HEAD_TAGS:
+                    return False
+            elif type(node) is self._string and node.strip() and node.parent.name not in HEAD_TAGS:
+                return False
+        return True
+
+
+class LxmlBackend(ParserBackend):
+    """libxml2's HTML parser via lxml.html."""
+
+    name = "lxml"
+    requires = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        self._fromstring = lxml.html.document_fromstring
+        # Parsing bytes sidesteps lxml refusing str input with an encoding declaration
+        self._parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def extract(self, html: str) -> RawPageFields:
+        if not html.strip():
+            return "", "", [], [], None
+        root = self._fromstring(html.encode('utf-8', errors='replace'), parser=self._parser)
+
+        h1_el = None
+        main_el = None
+        first_p = None
+        main_p = None
+        hrefs = []
+        srcs = []
+        canonical = None
+
+        for el in root.iter('h1', 'main', 'p', 'a', 'img', 'link'):
+            tag = el.tag
+            if tag == 'a':
+                href = el.get('href')
+                if href:
+                    hrefs.append(href)
+            elif tag == 'img':
+                src = el.get('src')
+                if src:
+                    srcs.append(src)
+            elif tag == 'p':
+                if first_p is None:
+                    first_p = el
+                if main_p is None and main_el is not None and any(a is main_el for a in el.iterancestors('main')):
+                    main_p = el
+            elif tag == 'h1':
+                if h1_el is None:
+                    h1_el = el
+            elif tag == 'main':
+                if main_el is None:
+                    main_el = el
+            elif tag == 'link':
+                if (canonical is None and el.get('href') and _is_canonical(el.get('rel'))
+                        and next(el.iterancestors('body', 'template'), None) is None):
+                    canonical = el.get('href')
+
+        paragraph = main_p if main_p is not None else first_p
+        return (
+            self._text(h1_el) if h1_el is not None else "",
+            self._text(paragraph) if paragraph is not None else "",
+            hrefs,
+            srcs,
+            canonical
+        )
+
+    @classmethod
+    def _text(cls, el) -> str:
+        # BeautifulSoup treats all text inside a <template> as template text, which get_text() skips
+        if next(el.iterancestors('template'), None) is not None:
+            return ""
+        parts = [el.text or ""]
+        cls._collect(el, parts)
+        return "".join(parts)
+
+    @classmethod
+    def _collect(cls, el, parts: List[str]):
+        """Append the text below el, leaving out SKIPPED_TAGS."""
+        for child in el:
+            tag = child.tag
+            # Comments and processing instructions have a function as their tag; only their tail is text
+            if isinstance(tag, str) and tag not in SKIPPED_TAGS:
+                if child.text:
+                    parts.append(child.text)
+                cls._collect(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+
+class SelectolaxBackend(ParserBackend):
+    """The lexbor HTML5 engine via selectolax."""
+
+    name = "selectolax"
+    requires = "selectolax"
+
+    SELECTOR = "h1, main, p, a, img, link"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def extract(self, html: str) -> RawPageFields:
+        tree = self._parser(html)
+
+        h1_node = None
+        main_node = None
+        first_p = None
+        main_p = None
+        hrefs = []
+        srcs = []
+        canonical = None
+
+        for node in tree.css(self.SELECTOR):
+            tag = node.tag
+            if tag == 'a':
+                href = node.attributes.get('href')
+                if href:
+                    hrefs.append(href)
+            elif tag == 'img':
+                src = node.attributes.get('src')
+                if src:
+                    srcs.append(src)
+            elif tag == 'p':
+                if first_p is None:
+                    first_p = node
+                if main_p is None and main_node is not None and self._is_inside(node, main_node):
+                    main_p = node
+            elif tag == 'h1':
+                if h1_node is None:
+                    h1_node = node
+            elif tag == 'main':
+                if main_node is None:
+                    main_node = node
+            elif tag == 'link':
+                attributes = node.attributes
+                if (canonical is None and attributes.get('href') and _is_canonical(attributes.get('rel'))
+                        and not self._is_inside(node, tree.body)):
+                    canonical = attributes['href']
+
+        paragraph = main_p if main_p is not None else first_p
+        return (
+            self._text(h1_node) if h1_node is not None else "",
+            self._text(paragraph) if paragraph is not None else "",
+            hrefs,
+            srcs,
+            canonical
+        )
+
+    @classmethod
+    def _text(cls, node) -> str:
+        parts = []
+        cls._collect(node, parts)
+        return "".join(parts)
+
+    @classmethod
+    def _collect(cls, node, parts: List[str]):
+        """Append the text below node, leaving out SKIPPED_TAGS."""
+        for child in node.iter(include_text=True):
+            tag = child.tag
+            if tag == '-text':
+                parts.append(child.text_content)
+            elif tag not in SKIPPED_TAGS and tag[0] != '-':
+                cls._collect(child, parts)
+
+    @staticmethod
+    def _is_inside(node, ancestor) -> bool:
+        target = ancestor.mem_id
+        parent = node.parent
+        while parent is not None:
+            if parent.mem_id == target:
+                return True
+            parent = parent.parent
+        return False
+
+
+PARSER_BACKENDS = {
+    backend.name: backend
+    for backend in (SoupBackend, LxmlBackend, SelectolaxBackend)
+}
+
+_instances: Dict[str, ParserBackend] = {}
+
+
+def get_parser_backend(name: str = None) -> ParserBackend:
+    """
+    Return a (cached) parser backend by name.
+
+    Args:
+        name: Backend name from PARSER_BACKENDS; None selects DEFAULT_PARSER
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the backend's package is not installed
+    """
+    name = name or DEFAULT_PARSER
+    backend = _instances.get(name)
+    if backend is not None:
+        return backend
+
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser '{name}'. Options: {', '.join(PARSER_BACKENDS)}")
+
+    backend_cls = PARSER_BACKENDS[name]
+    try:
+        backend = backend_cls()
+    except ImportError as exc:
+        raise ImportError(f"Parser '{name}' requires the '{backend_cls.requires}' package: pip install {backend_cls.requires}") from exc
+
+    _instances[name] = backend
+    return backend
+
+
+def available_parsers() -> List[str]:
+    """Return the names of backends whose dependencies are installed."""
+    names = []
+    for name in PARSER_BACKENDS:
+        try:
+            get_parser_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,175 @@
+"""
+Offline replay of archived responses through the analysis pipeline.
+
+A response cache directory (see response_cache.py) doubles as an archive of
+every page a crawl downloaded. Replaying it runs extract_page_data over the
+stored bodies in parallel worker processes and rebuilds the crawler's
+page_data (depth and incoming links included) without touching the network,
+so report and page-type changes can be iterated on in seconds.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Optional, Tuple
+
+from crawl import normalize_url, get_domain_from_url
+from extraction_pool import _extract_batch, _extract_packed, unpack_page_data
+from response_cache import ResponseCache
+
+
+def infer_base_url(archive_dir: str) -> Optional[str]:
+    """Pick the archived URL closest to a site root (fewest path characters)."""
+    cache = ResponseCache(archive_dir, max_size_mb=0, ttl_hours=0)
+    try:
+        urls = [row[0] for row in cache.db.execute("SELECT url FROM entries")]
+    finally:
+        cache.close()
+    if not urls:
+        return None
+    return min(urls, key=lambda url: (len(normalize_url(url)), url))
+
+
+def _extract_archive(cache: ResponseCache, parser: str, workers: int,
+                     batch_size: int) -> Tuple[Dict[str, Tuple], Dict[str, Exception]]:
+    """Extract every archived page, returning ({url: packed page data}, {url: error})."""
+    results = {}
+    errors = {}
+
+    if workers <= 0:
+        for url, body, encoding in cache.iter_responses():
+            try:
+                results[url] = _extract_packed((body, encoding, url, parser))
+            except Exception as exc:
+                errors[url] = exc
+        return results, errors
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        batch = []
+
+        def collect(done):
+            for future in done:
+                urls = pending.pop(future)
+                for url, packed in zip(urls, future.result()):
+                    if isinstance(packed, Exception):
+                        errors[url] = packed
+                    else:
+                        results[url] = packed
+
+        def submit(jobs):
+            # Keep a bounded number of batches in flight so bodies aren't all held in memory
+            while len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(_extract_batch, jobs)] = [job[2] for job in jobs]
+
+        for url, body, encoding in cache.iter_responses():
+            batch.append((body, encoding, url, parser))
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    return results, errors
+
+
+def replay_archive(archive_dir: str, base_url: str = None, parser: str = None, workers: int = None,
+                   max_pages: int = 0, max_depth: int = 0, batch_size: int = 16,
+                   url_policy=None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Rebuild page_data from archived responses.
+
+    Pages are linked up breadth-first from base_url over the archived pages:
+    depth is the shortest link distance from base_url and each page's incoming
+    link is the page it was first discovered from, as in a live crawl. Archived
+    pages that can't be reached from base_url are left out.
+
+    Args:
+        archive_dir: Response cache directory to replay
+        base_url: Start page; inferred from the archive if None
+        parser: Parser backend name
+        workers: Extraction processes (None for one per CPU core, 0 for inline)
+        max_pages: Stop after this many pages (0 for no limit)
+        max_depth: Ignore pages deeper than this (0 for unlimited)
+        batch_size: Pages per worker job
+        url_policy: url_policy.URLPolicy for page keys (None to key on host and path)
+
+    Returns:
+        (page_data, replay statistics)
+    """
+    base_url = base_url or infer_base_url(archive_dir)
+    if base_url is None:
+        raise ValueError(f"No archived responses found in {archive_dir}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    cache = ResponseCache(archive_dir, max_size_mb=0, ttl_hours=0)
+    try:
+        archived = len(cache)
+        packed_pages, errors = _extract_archive(cache, parser, workers, batch_size)
+    finally:
+        cache.close()
+    extract_time = time.perf_counter() - start
+
+    base_domain = get_domain_from_url(base_url)
+    by_norm = {}
+    for url in list(packed_pages) + list(errors):
+        norm = normalize_url(url, url_policy)
+        if get_domain_from_url(url) == base_domain and norm not in by_norm:
+            by_norm[norm] = url
+
+    page_data = {}
+    base_norm = normalize_url(base_url, url_policy)
+    queue = deque([(base_norm, 0, None)])
+    queued = {base_norm}
+    while queue:
+        norm, depth, parent_url = queue.popleft()
+        url = by_norm.get(norm)
+        if url is None:
+            continue
+        if max_pages and len(page_data) >= max_pages:
+            break
+
+        incoming_links = [parent_url] if parent_url else []
+        if url in errors:
+            page_data[norm] = {
+                "url": url,
+                "error": f"extract error: {errors[url]}",
+                "depth": depth,
+                "incoming_link_count": len(incoming_links)
+            }
+            continue
+
+        data = unpack_page_data(packed_pages[url], url)
+        data["status_code"] = 200
+        data["response_time"] = 0.0
+        data["depth"] = depth
+        data["incoming_links"] = incoming_links
+        data["incoming_link_count"] = len(incoming_links)
+        page_data[norm] = data
+
+        if max_depth and depth >= max_depth:
+            continue
+        for link in data["internal_links"]:
+            link_norm = normalize_url(link, url_policy)
+            if link_norm not in queued and link_norm in by_norm:
+                queued.add(link_norm)
+                queue.append((link_norm, depth + 1, url))
+
+    stats = {
+        "archived_responses": archived,
+        "pages_replayed": len(page_data),
+        "unreachable_pages": len(by_norm) - len(page_data),
+        "extract_errors": len(errors),
+        "workers": workers,
+        "extract_time": extract_time,
+        "pages_per_second": len(packed_pages) / extract_time if extract_time > 0 else 0
+    }
+    return page_data, stats
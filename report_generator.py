@@ -1,31 +1,66 @@
 import json
+import heapq
+from itertools import islice
 from pathlib import Path
 from typing import Dict, Any, List
 from collections import defaultdict, Counter
 from datetime import datetime
 
+from concurrency import percentile
+from network import TIMING_PHASES
+
 
 class ReportGenerator:
     """Generate various report formats from crawl data."""
     
-    def __init__(self, page_data: Dict[str, Any], base_url: str):
+    def __init__(self, page_data: Dict[str, Any], base_url: str, crawl_stats: Dict[str, Dict[str, Any]] = None):
         """
         Initialize the report generator.
         
         Args:
-            page_data: Dictionary of page data from crawler
+            page_data: Page data from crawler (a dict or page_store.PageStore; only iterated and counted)
             base_url: Base URL of the crawled site
+            crawl_stats: Optional crawl-level statistics by section (e.g. "network")
         """
         self.page_data = page_data
         self.base_url = base_url
+        self.crawl_stats = crawl_stats or {}
         self.stats = self._calculate_statistics()
     
     def _calculate_statistics(self) -> Dict[str, Any]:
-        """Calculate comprehensive statistics from page data."""
+        """Calculate comprehensive statistics from page data in one pass over the records."""
         total_pages = len(self.page_data)
-        error_pages = sum(1 for p in self.page_data.values() if "error" in p)
-        successful_pages = total_pages - error_pages
+        error_pages = 0
+        
+        # Collect metrics
+        response_times = []
+        internal_link_counts = []
+        external_link_counts = []
+        image_counts = []
+        page_types = Counter()
+        depths = Counter()
+        phase_times = defaultdict(list)
         
+        for page in self.page_data.values():
+            if "error" in page:
+                error_pages += 1
+            else:
+                if "response_time" in page:
+                    response_times.append(page["response_time"])
+                for phase, seconds in (page.get("timing") or {}).items():
+                    phase_times[phase].append(seconds)
+                if "internal_link_count" in page:
+                    internal_link_counts.append(page["internal_link_count"])
+                if "external_link_count" in page:
+                    external_link_counts.append(page["external_link_count"])
+                if "image_count" in page:
+                    image_counts.append(page["image_count"])
+                if "page_type" in page:
+                    page_types[page["page_type"]] += 1
+                if "depth" in page:
+                    depths[page["depth"]] += 1
+        
+        successful_pages = total_pages - error_pages
         if successful_pages == 0:
             return {
                 "total_pages": total_pages,
@@ -37,6 +72,7 @@ class ReportGenerator:
                 "avg_response_time": 0,
                 "min_response_time": 0,
                 "max_response_time": 0,
+                "timing_percentiles": {},
                 "page_types": {},
                 "depth_distribution": {},
                 "max_depth": 0,
@@ -46,29 +82,6 @@ class ReportGenerator:
                 "avg_images_per_page": 0
             }
         
-        # Collect metrics
-        response_times = []
-        internal_link_counts = []
-        external_link_counts = []
-        image_counts = []
-        page_types = []
-        depths = []
-        
-        for page in self.page_data.values():
-            if "error" not in page:
-                if "response_time" in page:
-                    response_times.append(page["response_time"])
-                if "internal_link_count" in page:
-                    internal_link_counts.append(page["internal_link_count"])
-                if "external_link_count" in page:
-                    external_link_counts.append(page["external_link_count"])
-                if "image_count" in page:
-                    image_counts.append(page["image_count"])
-                if "page_type" in page:
-                    page_types.append(page["page_type"])
-                if "depth" in page:
-                    depths.append(page["depth"])
-        
         # Calculate statistics
         stats = {
             "total_pages": total_pages,
@@ -87,9 +100,19 @@ class ReportGenerator:
             "avg_response_time": sum(response_times) / len(response_times) if response_times else 0,
             "min_response_time": min(response_times) if response_times else 0,
             "max_response_time": max(response_times) if response_times else 0,
+            # Per request phase; only pages where the phase happened (e.g. a new connection) count
+            "timing_percentiles": {
+                phase: {
+                    "count": len(phase_times[phase]),
+                    "p50": percentile(phase_times[phase], 50),
+                    "p95": percentile(phase_times[phase], 95),
+                    "p99": percentile(phase_times[phase], 99)
+                }
+                for phase in TIMING_PHASES if phase_times[phase]
+            },
             
-            "page_types": dict(Counter(page_types)),
-            "depth_distribution": dict(Counter(depths)),
+            "page_types": dict(page_types),
+            "depth_distribution": dict(depths),
             "max_depth": max(depths) if depths else 0
         }
         
@@ -99,6 +122,9 @@ class ReportGenerator:
         """
         Generate a comprehensive JSON report.
         
+        Pages are written as they are read from page_data, so the report is
+        never built in memory as a whole.
+        
         Args:
             output_path: Path to save the JSON file
         """
@@ -109,41 +135,55 @@ class ReportGenerator:
                 "total_pages_crawled": len(self.page_data)
             },
             "statistics": self.stats,
+            "crawl_statistics": self.crawl_stats,
             "pages": []
         }
+        # Everything up to the pages list, laid out as json.dump(report, indent=2) would
+        head = json.dumps(report, indent=2, ensure_ascii=False)
+        head = head[:head.rindex("[]")]
         
-        # Add page details
-        for norm_url, data in self.page_data.items():
-            page_info = {
-                "normalized_url": norm_url,
-                "url": data.get("url", norm_url),
-                "depth": data.get("depth", 0),
-                "page_type": data.get("page_type", "unknown"),
-                "h1": data.get("h1", ""),
-                "first_paragraph": data.get("first_paragraph", ""),
-                "internal_link_count": data.get("internal_link_count", 0),
-                "external_link_count": data.get("external_link_count", 0),
-                "image_count": data.get("image_count", 0),
-                "incoming_link_count": data.get("incoming_link_count", 0),
-                "response_time": data.get("response_time", 0),
-                "status_code": data.get("status_code", 0),
-                "error": data.get("error", None)
-            }
-            
-            # Optionally include links (can make the file large)
-            if "internal_links" in data:
-                page_info["internal_links"] = data["internal_links"][:50]  # Limit to first 50
-            if "external_links" in data:
-                page_info["external_links"] = data["external_links"][:50]
-            
-            report["pages"].append(page_info)
-        
-        # Save JSON
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write(head + "[")
+            separator = "\n    "
+            for norm_url, data in self.page_data.items():
+                f.write(separator)
+                f.write(json.dumps(self._page_entry(norm_url, data), indent=2, ensure_ascii=False)
+                        .replace("\n", "\n    "))
+                separator = ",\n    "
+            f.write("]\n}" if separator == "\n    " else "\n  ]\n}")
         
         print(f"JSON report saved to {output_path}")
     
+    @staticmethod
+    def _page_entry(norm_url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """One page's entry in the JSON report."""
+        page_info = {
+            "normalized_url": norm_url,
+            "url": data.get("url", norm_url),
+            "depth": data.get("depth", 0),
+            "page_type": data.get("page_type", "unknown"),
+            "h1": data.get("h1", ""),
+            "first_paragraph": data.get("first_paragraph", ""),
+            "internal_link_count": data.get("internal_link_count", 0),
+            "external_link_count": data.get("external_link_count", 0),
+            "image_count": data.get("image_count", 0),
+            "incoming_link_count": data.get("incoming_link_count", 0),
+            "response_time": data.get("response_time", 0),
+            "timing": data.get("timing", {}),
+            "status_code": data.get("status_code", 0),
+            "error": data.get("error", None)
+        }
+        if "duplicate_of" in data:
+            page_info["duplicate_of"] = data["duplicate_of"]
+        
+        # Optionally include links (can make the file large)
+        if "internal_links" in data:
+            page_info["internal_links"] = data["internal_links"][:50]  # Limit to first 50
+        if "external_links" in data:
+            page_info["external_links"] = data["external_links"][:50]
+        
+        return page_info
+    
     def generate_statistics_report(self, output_path: str):
         """
         Generate a plain text statistics report.
@@ -180,6 +220,18 @@ class ReportGenerator:
             f"Avg Response Time: {self.stats['avg_response_time']:.3f}s",
             f"Min Response Time: {self.stats['min_response_time']:.3f}s",
             f"Max Response Time: {self.stats['max_response_time']:.3f}s",
+        ]
+        
+        if self.stats['timing_percentiles']:
+            lines.extend([
+                "",
+                f"{'Request Phase':14s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'Pages':>7s}",
+            ])
+            for phase, values in self.stats['timing_percentiles'].items():
+                lines.append(f"{phase:14s} {values['p50']:8.3f}s {values['p95']:8.3f}s {values['p99']:8.3f}s "
+                             f"{values['count']:7d}")
+        
+        lines.extend([
             "",
             "-" * 60,
             "CONTENT",
@@ -190,7 +242,7 @@ class ReportGenerator:
             "-" * 60,
             "PAGE TYPE DISTRIBUTION",
             "-" * 60,
-        ]
+        ])
         
         for page_type, count in sorted(self.stats['page_types'].items(), key=lambda x: x[1], reverse=True):
             percentage = (count / self.stats['successful_pages'] * 100) if self.stats['successful_pages'] > 0 else 0
@@ -207,6 +259,7 @@ class ReportGenerator:
             percentage = (count / self.stats['total_pages'] * 100) if self.stats['total_pages'] > 0 else 0
             lines.append(f"Depth {depth:2d}: {count:4d} pages ({percentage:5.1f}%)")
         
+        lines.extend(self._crawl_stats_lines())
         lines.append("=" * 60)
         
         # Save to file
@@ -218,6 +271,26 @@ class ReportGenerator:
         # Also print to console
         print('\n'.join(lines))
     
+    def _crawl_stats_lines(self) -> List[str]:
+        """Render each crawl statistics section as a block of the text report."""
+        lines = []
+        for section, values in self.crawl_stats.items():
+            lines.extend([
+                "",
+                "-" * 60,
+                section.replace("_", " ").upper(),
+                "-" * 60,
+            ])
+            for key, value in values.items():
+                label = key.replace("_", " ").title()
+                if isinstance(value, dict):
+                    lines.append(f"{label}:")
+                    for sub_key, sub_value in value.items():
+                        lines.append(f"  {sub_key}: {_format_stat(sub_value)}")
+                else:
+                    lines.append(f"{label}: {_format_stat(value)}")
+        return lines
+    
     def generate_html_report(self, output_path: str, graph_path: str = None):
         """
         Generate an HTML report.
@@ -227,14 +300,14 @@ class ReportGenerator:
             graph_path: Optional path to embedded graph visualization
         """
         # Get top pages by incoming links
-        pages_by_importance = sorted(
-            [p for p in self.page_data.values() if "error" not in p],
-            key=lambda x: x.get("incoming_link_count", 0),
-            reverse=True
-        )[:20]
+        pages_by_importance = heapq.nlargest(
+            20,
+            (p for p in self.page_data.values() if "error" not in p),
+            key=lambda x: x.get("incoming_link_count", 0)
+        )
         
-        # Get error pages
-        error_pages = [p for p in self.page_data.values() if "error" in p]
+        # Get error pages (only the first 20 are listed)
+        error_pages = list(islice((p for p in self.page_data.values() if "error" in p), 20))
         
         html = f"""<!DOCTYPE html>
 <html lang="en">
@@ -441,7 +514,7 @@ class ReportGenerator:
             </thead>
             <tbody>
 """
-            for page in error_pages[:20]:  # Limit to first 20 errors
+            for page in error_pages:
                 html += f"""
                 <tr>
                     <td class="url">{page['url']}</td>
@@ -497,7 +570,21 @@ class ReportGenerator:
         print(f"HTML report saved to {output_path}")
 
 
-def generate_all_reports(page_data: Dict[str, Any], base_url: str, output_dir: str):
+def _format_stat(value: Any) -> str:
+    """Format a crawl statistic for the text report."""
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    if isinstance(value, dict):
+        return ", ".join(f"{k}={_format_stat(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if len(value) > 10:
+            return f"{len(value)} entries"
+        return ", ".join(_format_stat(v) for v in value)
+    return str(value)
+
+
+def generate_all_reports(page_data: Dict[str, Any], base_url: str, output_dir: str,
+                         crawl_stats: Dict[str, Dict[str, Any]] = None):
     """
     Generate all report formats.
     
@@ -505,11 +592,12 @@ def generate_all_reports(page_data: Dict[str, Any], base_url: str, output_dir: s
         page_data: Dictionary of page data from crawler
         base_url: Base URL of the crawled site
         output_dir: Directory to save reports
+        crawl_stats: Optional crawl-level statistics by section
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    generator = ReportGenerator(page_data, base_url)
+    generator = ReportGenerator(page_data, base_url, crawl_stats)
     
     # Generate all reports
     generator.generate_json_report(str(output_path / "site_structure.json"))
@@ -0,0 +1,224 @@
+"""
+Persistent on-disk HTTP response cache.
+
+Bodies are stored content-addressed (named by the SHA-256 of the raw body)
+and zlib-compressed, so identical pages under different URLs share one
+blob. A small SQLite index maps each URL to its blob plus the validators
+(ETag, Last-Modified) needed for conditional re-requests. When a server
+answers 304 Not Modified the body is served from disk.
+
+Entries older than the TTL are dropped on lookup, and once the blobs
+exceed the size limit the least recently used URLs are evicted.
+"""
+
+import hashlib
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    content_hash: str
+    encoding: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseCache:
+    """Content-addressed, compressed response cache with LRU eviction and TTL expiry."""
+
+    def __init__(self, directory: str, max_size_mb: float = 500, ttl_hours: float = 168):
+        """
+        Open (or create) a cache directory.
+
+        Args:
+            directory: Where the index and blobs are stored
+            max_size_mb: Compressed size limit before LRU eviction (0 for no limit)
+            ttl_hours: Drop entries stored longer ago than this (0 to keep forever)
+        """
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl = ttl_hours * 3600
+
+        self.db = sqlite3.connect(str(self.directory / "index.sqlite3"))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                refs INTEGER NOT NULL
+            );
+        """)
+        self.db.commit()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "bytes_saved": 0,
+            "evicted": 0,
+            "expired": 0
+        }
+
+    def _blob_path(self, content_hash: str) -> Path:
+        return self.blob_dir / content_hash[:2] / f"{content_hash}.z"
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for url, or None if missing or expired."""
+        row = self.db.execute(
+            "SELECT url, content_hash, encoding, etag, last_modified, stored_at FROM entries WHERE url = ?",
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row)
+        if self.ttl and time.time() - entry.stored_at > self.ttl:
+            self._delete(url, entry.content_hash)
+            self.db.commit()
+            self.stats["expired"] += 1
+            return None
+        if not self._blob_path(entry.content_hash).exists():
+            # Blob removed behind our back; don't revalidate something we can't serve
+            self._delete(url, entry.content_hash)
+            self.db.commit()
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        """Request headers that let the server answer 304 for an unchanged page."""
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def load_body(self, entry: CacheEntry) -> Optional[bytes]:
+        """Read and decompress a cached body; None if the blob has gone missing."""
+        try:
+            return zlib.decompress(self._blob_path(entry.content_hash).read_bytes())
+        except (OSError, zlib.error):
+            return None
+
+    def record_hit(self, entry: CacheEntry, body_size: int):
+        """Mark a 304 revalidation: the entry is fresh again and its body was not downloaded."""
+        now = time.time()
+        self.db.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE url = ?", (now, now, entry.url))
+        self.db.commit()
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += body_size
+
+    def record_miss(self):
+        self.stats["misses"] += 1
+
+    def store(self, url: str, body: bytes, encoding: str, etag: str = None, last_modified: str = None):
+        """Store a freshly downloaded body and its validators."""
+        content_hash = hashlib.sha256(body).hexdigest()
+        now = time.time()
+
+        old = self.db.execute("SELECT content_hash FROM entries WHERE url = ?", (url,)).fetchone()
+        if old and old[0] == content_hash:
+            self.db.execute(
+                "UPDATE entries SET encoding = ?, etag = ?, last_modified = ?, stored_at = ?, last_access = ? WHERE url = ?",
+                (encoding, etag, last_modified, now, now, url)
+            )
+            self.db.commit()
+            return
+        if old:
+            self._delete(url, old[0])
+
+        blob = self.db.execute("SELECT refs FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if blob:
+            self.db.execute("UPDATE blobs SET refs = refs + 1 WHERE content_hash = ?", (content_hash,))
+        else:
+            compressed = zlib.compress(body, 6)
+            path = self._blob_path(content_hash)
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(compressed)
+            self.db.execute(
+                "INSERT INTO blobs (content_hash, size, raw_size, refs) VALUES (?, ?, ?, 1)",
+                (content_hash, len(compressed), len(body))
+            )
+
+        self.db.execute(
+            "INSERT INTO entries (url, content_hash, encoding, etag, last_modified, stored_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, content_hash, encoding, etag, last_modified, now, now)
+        )
+        self.db.commit()
+        self.stats["stored"] += 1
+        self._evict()
+
+    def _delete(self, url: str, content_hash: str):
+        """Remove an entry and drop its blob once nothing references it (caller commits)."""
+        self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+        self.db.execute("UPDATE blobs SET refs = refs - 1 WHERE content_hash = ?", (content_hash,))
+        row = self.db.execute("SELECT refs FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row and row[0] <= 0:
+            self.db.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+            self._blob_path(content_hash).unlink(missing_ok=True)
+
+    def size(self) -> int:
+        """Compressed bytes currently stored."""
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self):
+        """Evict least recently used entries until the cache is back under its size limit."""
+        if not self.max_bytes:
+            return
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self.db.execute("SELECT url, content_hash FROM entries ORDER BY last_access").fetchall()
+        for url, content_hash in rows:
+            if total <= target:
+                break
+            self._delete(url, content_hash)
+            self.stats["evicted"] += 1
+            total = self.size()
+        self.db.commit()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def iter_responses(self) -> Iterator[Tuple[str, bytes, str]]:
+        """Yield (url, body, encoding) for every unexpired entry."""
+        rows = self.db.execute("SELECT url, content_hash, encoding, etag, last_modified, stored_at FROM entries").fetchall()
+        for row in rows:
+            entry = CacheEntry(*row)
+            if self.ttl and time.time() - entry.stored_at > self.ttl:
+                continue
+            body = self.load_body(entry)
+            if body is not None:
+                yield entry.url, body, entry.encoding
+
+    def summary(self) -> Dict[str, int]:
+        """Counters for the statistics report."""
+        return {
+            **self.stats,
+            "entries": len(self),
+            "size_bytes": self.size()
+        }
+
+    def close(self):
+        self.db.close()
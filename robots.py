@@ -0,0 +1,167 @@
+"""
+robots.txt rules for the async crawler.
+
+Each host's robots.txt is fetched once, parsed with robotexclusionrulesparser
+and kept in memory for the rest of the crawl. The raw file is also cached on
+disk so later crawls within ttl_hours don't request it again. Rules are
+checked when a link is discovered, before it can take a frontier slot.
+
+Following RFC 9309, a 4xx robots.txt allows everything; a 5xx or a network
+error disallows the host for this crawl (and is not cached on disk).
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from robotexclusionrulesparser import RobotExclusionRulesParser
+
+
+DEFAULT_ROBOTS_CONFIG = {
+    "user_agent": "*",
+    "cache_dir": ".cache/robots",
+    "ttl_hours": 24,
+}
+
+# RFC 9309 lets crawlers ignore anything past the first 500 KiB
+MAX_ROBOTS_BYTES = 500 * 1024
+
+ALLOW_ALL = ""
+DISALLOW_ALL = "User-agent: *\nDisallow: /\n"
+
+
+def robots_url(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+
+def _parse(text: str) -> RobotExclusionRulesParser:
+    rules = RobotExclusionRulesParser()
+    rules.parse(text)
+    return rules
+
+
+class RobotsCache:
+    """Per-host robots.txt rules with an on-disk cache of the raw files."""
+
+    def __init__(self, user_agent: str = "*", cache_dir: str = None, ttl_hours: float = 24):
+        """
+        Initialize the cache.
+
+        Args:
+            user_agent: Token matched against User-agent lines
+            cache_dir: Directory for cached robots.txt files (None to keep them in memory only)
+            ttl_hours: Re-fetch cached files older than this
+        """
+        self.user_agent = user_agent
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_hours * 3600
+        self.rules: Dict[str, RobotExclusionRulesParser] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.disallowed = 0  # Refused checks; a URL counts each time a link to it is checked
+        self.stats = {"fetched": 0, "disk_hits": 0, "fetch_errors": 0}
+
+    def _host(self, url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+    def _cache_path(self, host: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(host.encode()).hexdigest()}.json"
+
+    def _read_disk(self, host: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            cached = json.loads(self._cache_path(host).read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get("fetched_at", 0) > self.ttl:
+            return None
+        return cached.get("body", "")
+
+    def _write_disk(self, host: str, body: str):
+        if self.cache_dir:
+            self._cache_path(host).write_text(json.dumps({"host": host, "fetched_at": time.time(), "body": body}))
+
+    def is_loaded(self, url: str) -> bool:
+        return self._host(url) in self.rules
+
+    def allowed(self, url: str) -> Optional[bool]:
+        """Check url against its host's rules; None if they haven't been loaded yet."""
+        rules = self.rules.get(self._host(url))
+        if rules is None:
+            return None
+        if rules.is_allowed(self.user_agent, url):
+            return True
+        self.disallowed += 1
+        return False
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        rules = self.rules.get(self._host(url))
+        return rules.get_crawl_delay(self.user_agent) if rules else None
+
+    def sitemaps(self, url: str) -> List[str]:
+        """Sitemap URLs listed in url's host's robots.txt."""
+        rules = self.rules.get(self._host(url))
+        return list(rules.sitemaps) if rules else []
+
+    async def load(self, session: aiohttp.ClientSession, url: str) -> RobotExclusionRulesParser:
+        """Load the rules for url's host, fetching robots.txt at most once per host."""
+        host = self._host(url)
+        if host in self.rules:
+            return self.rules[host]
+        task = self._loading.get(host)
+        if task is None:
+            task = self._loading[host] = asyncio.ensure_future(self._fetch(session, host, url))
+        return await task
+
+    async def _fetch(self, session: aiohttp.ClientSession, host: str, url: str) -> RobotExclusionRulesParser:
+        body = self._read_disk(host)
+        if body is not None:
+            self.stats["disk_hits"] += 1
+        else:
+            body = await self._download(session, url)
+            if body is None:
+                self.stats["fetch_errors"] += 1
+                print(f"Could not fetch {robots_url(url)}; not crawling {host}")
+                body = DISALLOW_ALL
+            else:
+                self.stats["fetched"] += 1
+                self._write_disk(host, body)
+        self.rules[host] = _parse(body)
+        self._loading.pop(host, None)
+        return self.rules[host]
+
+    async def _download(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Return robots.txt text (ALLOW_ALL for 4xx), or None if the host is unavailable."""
+        try:
+            async with session.get(robots_url(url)) as resp:
+                if 400 <= resp.status < 500:
+                    return ALLOW_ALL
+                if resp.status >= 500:
+                    return None
+                data = await resp.content.read(MAX_ROBOTS_BYTES)
+                return data.decode("utf-8", errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        delays = {}
+        for host, rules in self.rules.items():
+            delay = rules.get_crawl_delay(self.user_agent)
+            if delay:
+                delays[host] = delay
+        return {
+            "hosts": len(self.rules),
+            **self.stats,
+            "disallowed_links": self.disallowed,
+            "crawl_delays": delays
+        }
@@ -0,0 +1,349 @@
+"""
+Sharded crawling: one crawler event loop per core.
+
+A single AsyncCrawler does its parsing, dedup and bookkeeping on one core.
+In sharded mode the URL space is split over several processes by a
+consistent hash of the normalized URL. Each shard runs its own crawler
+(with its own frontier, rate limiter and parser) and only crawls the URLs
+it owns; links it discovers that belong to another shard are batched and
+sent to that shard's inbox queue.
+
+The parent process detects the end of the crawl: each shard reports when
+it runs out of work, with counts of the link batches it has sent and
+received. Once every shard is idle, sent equals received (nothing in
+transit) and no report has arrived for a quiet period, the parent tells
+the shards to stop. Each shard then sends its page records in batches and
+the parent streams them into one page_store.PageStore, so neither side
+holds a pickled copy of every record at once.
+
+Budgets are split between the shards: each gets its share of max_pages and
+max_concurrency, and rate limits (including robots.txt Crawl-delay) are
+divided so the shards together keep to them. The response cache, crawl
+checkpoint and incremental mode are not used in sharded mode.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from frontier import page_type_score
+from main import AsyncCrawler
+from page_store import PageStore, build_page_store
+
+
+DEFAULT_SHARDING_CONFIG = {
+    "shards": 0,
+    "replicas": 64,
+    "batch_size": 256,
+    "flush_interval": 0.02,
+    "quiet_period": 0.2,
+}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping normalized URLs to shard numbers."""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        """
+        Build the ring.
+
+        Args:
+            shards: Number of shards
+            replicas: Points per shard on the ring; more points even out the split
+        """
+        points = sorted((_hash(f"shard-{shard}-{replica}"), shard)
+                        for shard in range(shards) for replica in range(replicas))
+        self.shards = shards
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def owner(self, normalized_url: str) -> int:
+        index = bisect.bisect(self._hashes, _hash(normalized_url)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardRouter:
+    """One shard's view of the ring: which URLs it owns, and batched links for the others."""
+
+    def __init__(self, shard_id: int, ring: HashRing, inboxes: List[Any], batch_size: int = 256,
+                 flush_interval: float = 0.02):
+        """
+        Initialize the router.
+
+        Args:
+            shard_id: This shard's number
+            ring: Hash ring shared by all shards
+            inboxes: One multiprocessing queue per shard
+            batch_size: Send a shard's links once this many are buffered
+            flush_interval: Send buffered links at least this often (seconds)
+        """
+        self.shard_id = shard_id
+        self.ring = ring
+        self.shards = ring.shards
+        self.inboxes = inboxes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.forwarded: Dict[str, int] = {}  # normalized URL -> shallowest depth sent; the owner dedups the rest
+        self._buffers: Dict[int, List[Tuple[str, int, Optional[str]]]] = {}
+        self._timer = None
+        self.stats = {"links_forwarded": 0, "links_received": 0, "batches_sent": 0, "batches_received": 0}
+
+    def owns(self, normalized_url: str) -> bool:
+        return self.ring.owner(normalized_url) == self.shard_id
+
+    def forward(self, url: str, depth: int, parent_url: Optional[str], normalized_url: str):
+        """Buffer a link for the shard that owns it."""
+        sent_depth = self.forwarded.get(normalized_url)
+        if sent_depth is not None and sent_depth <= depth:
+            return
+        # Sent again if found shallower: shards run at different paces, and the owner's
+        # frontier moves a still-queued URL up to its shallowest depth
+        self.forwarded[normalized_url] = depth
+        owner = self.ring.owner(normalized_url)
+        buffer = self._buffers.setdefault(owner, [])
+        buffer.append((url, depth, parent_url))
+        self.stats["links_forwarded"] += 1
+        if len(buffer) >= self.batch_size:
+            self._send(owner)
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+
+    def _send(self, owner: int):
+        batch = self._buffers.pop(owner)
+        self.inboxes[owner].put(("links", batch))
+        self.stats["batches_sent"] += 1
+
+    def flush(self):
+        """Send every buffered link now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for owner in list(self._buffers):
+            self._send(owner)
+
+    def received(self, batch: list):
+        self.stats["batches_received"] += 1
+        self.stats["links_received"] += len(batch)
+
+
+def split_budget(total: int, shards: int, shard_id: int) -> int:
+    """shard_id's share of an integer budget; the shares add up to total."""
+    return total // shards + (1 if shard_id < total % shards else 0)
+
+
+def _split_rate(limit, shards: int):
+    if isinstance(limit, dict):
+        return {**limit, "rate": limit.get("rate", 0) / shards}
+    return limit / shards
+
+
+def shard_options(options: Dict[str, Any], shards: int, shard_id: int) -> Dict[str, Any]:
+    """AsyncCrawler keyword arguments for one shard, with the budgets split between shards."""
+    options = dict(options)
+    options["max_pages"] = split_budget(options.get("max_pages", 10), shards, shard_id)
+    options["max_concurrency"] = max(1, math.ceil(options.get("max_concurrency", 3) / shards))
+    options["rate_limit"] = options.get("rate_limit", 0) / shards
+    options["host_rate_limits"] = {host: _split_rate(limit, shards)
+                                   for host, limit in (options.get("host_rate_limits") or {}).items()}
+    # Each shard is a process of its own; parse on its event loop
+    options["extraction"] = {**(options.get("extraction") or {}), "workers": 0}
+    # Per-run state that would need coordinating between processes
+    options["cache"] = {**(options.get("cache") or {}), "enabled": False}
+    options["checkpoint"] = {**(options.get("checkpoint") or {}), "enabled": False}
+    options["incremental"] = None
+    return options
+
+
+def _shard_main(shard_id: int, base_url: str, options: Dict[str, Any], page_type_priority: Dict[str, float],
+                inboxes: List[Any], control: Any, settings: Dict[str, Any]):
+    """Process entry point for one shard."""
+    if not settings["verbose"]:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        asyncio.run(_run_shard(shard_id, base_url, options, page_type_priority, inboxes, control, settings))
+    except BaseException:
+        control.put(("error", shard_id, traceback.format_exc()))
+
+
+async def _run_shard(shard_id: int, base_url: str, options: Dict[str, Any], page_type_priority: Dict[str, float],
+                     inboxes: List[Any], control: Any, settings: Dict[str, Any]):
+    ring = HashRing(len(inboxes), settings["replicas"])
+    router = ShardRouter(shard_id, ring, inboxes, settings["batch_size"], settings["flush_interval"])
+    score = page_type_score(page_type_priority) if page_type_priority else None
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    stopping = False
+
+    async with AsyncCrawler(base_url, score=score, shard=router, **options) as crawler:
+        def deliver(message):
+            nonlocal stopping
+            kind, payload = message
+            if kind == "stop":
+                stopping = True
+            else:
+                router.received(payload)
+                for url, depth, parent_url in payload:
+                    crawler.enqueue_link(url, depth, parent_url)
+            wake.set()
+
+        def read_inbox():
+            while True:
+                message = inboxes[shard_id].get()
+                loop.call_soon_threadsafe(deliver, message)
+                if message[0] == "stop":
+                    return
+
+        reader = threading.Thread(target=read_inbox, daemon=True)
+        reader.start()
+        started = time.time()
+        await crawler.seed()
+        workers = crawler.start_workers()
+        try:
+            while not stopping:
+                await crawler.wait_until_idle()
+                router.flush()
+                if wake.is_set():
+                    # Links arrived while finishing up; check again
+                    wake.clear()
+                    continue
+                control.put(("idle", shard_id, router.stats["batches_sent"], router.stats["batches_received"]))
+                await wake.wait()
+                wake.clear()
+                if not stopping:
+                    control.put(("busy", shard_id))
+        finally:
+            await crawler.stop_workers(workers)
+        elapsed = time.time() - started
+    reader.join()
+
+    stats = crawler.get_crawl_stats()
+    stats["shard"] = {**router.stats, "pages": len(crawler.page_data), "elapsed": elapsed}
+    batch = []
+    for record in crawler.page_data.items():
+        batch.append(record)
+        if len(batch) >= settings["batch_size"]:
+            control.put(("pages", shard_id, batch))
+            batch = []
+    if batch:
+        control.put(("pages", shard_id, batch))
+    crawler.page_data.close()
+    control.put(("done", shard_id, stats))
+
+
+def crawl_sharded(base_url: str, options: Dict[str, Any], shards: int, page_type_priority: Dict[str, float] = None,
+                  replicas: int = 64, batch_size: int = 256, flush_interval: float = 0.02,
+                  quiet_period: float = 0.2, verbose: bool = True) -> Tuple[PageStore, Dict[str, Any]]:
+    """
+    Crawl base_url with one crawler process per shard.
+
+    Args:
+        base_url: Starting URL
+        options: AsyncCrawler keyword arguments for the whole crawl (see shard_options)
+        shards: Number of shard processes
+        page_type_priority: Frontier score weights (see frontier.page_type_score)
+        replicas: Points per shard on the hash ring
+        batch_size: Links (and page records at the end) per IPC message
+        flush_interval: Longest a discovered link waits before being sent to its shard (seconds)
+        quiet_period: How long every shard must stay idle before the crawl is declared finished
+        verbose: Let the shards print their progress
+
+    Returns:
+        (page_data merged from all shards, crawl statistics); page_data spills to disk
+        as options["page_store"] says
+    """
+    context = multiprocessing.get_context("spawn")
+    inboxes = [context.Queue() for _ in range(shards)]
+    control = context.Queue()
+    settings = {"replicas": replicas, "batch_size": batch_size, "flush_interval": flush_interval, "verbose": verbose}
+    processes = [
+        context.Process(
+            target=_shard_main,
+            args=(shard_id, base_url, shard_options(options, shards, shard_id), page_type_priority or {},
+                  inboxes, control, settings),
+            daemon=True
+        )
+        for shard_id in range(shards)
+    ]
+    started = time.time()
+    for process in processes:
+        process.start()
+
+    state = {shard_id: None for shard_id in range(shards)}  # None while busy, else (sent, received)
+    page_data = build_page_store(options.get("page_store"))
+    results = {}
+    errors = {}
+    stopping = False
+
+    def stop_all():
+        nonlocal stopping
+        if not stopping:
+            stopping = True
+            for inbox in inboxes:
+                inbox.put(("stop", None))
+
+    while len(results) + len(errors) < shards:
+        try:
+            message = control.get(timeout=quiet_period)
+        except queue.Empty:
+            idle = [counts for counts in state.values() if counts is not None]
+            if len(idle) == shards and sum(sent for sent, _ in idle) == sum(received for _, received in idle):
+                stop_all()
+            for shard_id, process in enumerate(processes):
+                # A clean exit's "done" message may still be on its way
+                if process.exitcode not in (None, 0) and shard_id not in results and shard_id not in errors:
+                    errors[shard_id] = f"exited with code {process.exitcode}"
+                    stop_all()
+            continue
+        kind, shard_id = message[0], message[1]
+        if kind == "idle":
+            state[shard_id] = (message[2], message[3])
+        elif kind == "busy":
+            state[shard_id] = None
+        elif kind == "pages":
+            for normalized_url, data in message[2]:
+                page_data[normalized_url] = data
+        elif kind == "done":
+            results[shard_id] = message[2]
+        elif kind == "error":
+            errors[shard_id] = message[2]
+            stop_all()
+
+    for process in processes:
+        process.join(timeout=10)
+    if errors:
+        details = "\n".join(f"shard {shard_id}: {error}" for shard_id, error in sorted(errors.items()))
+        page_data.close()
+        raise RuntimeError(f"{len(errors)} of {shards} shards failed:\n{details}")
+
+    elapsed = time.time() - started
+    return page_data, {"sharding": merge_shard_stats([results[shard_id] for shard_id in sorted(results)], elapsed)}
+
+
+def merge_shard_stats(shard_stats: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Crawl-wide summary of the shards' statistics."""
+    pages = sum(stats["shard"]["pages"] for stats in shard_stats)
+    return {
+        "shards": len(shard_stats),
+        "pages": pages,
+        "elapsed": elapsed,
+        "pages_per_second": pages / elapsed if elapsed > 0 else 0.0,
+        "pages_per_shard": {f"shard {shard_id}": stats["shard"]["pages"]
+                            for shard_id, stats in enumerate(shard_stats)},
+        "links_forwarded": sum(stats["shard"]["links_forwarded"] for stats in shard_stats),
+        "batches_sent": sum(stats["shard"]["batches_sent"] for stats in shard_stats),
+        "connections_created": sum(stats["network"]["connections_created"] for stats in shard_stats),
+        "retries_scheduled": sum(stats["retries"]["retries_scheduled"] for stats in shard_stats),
+    }
@@ -0,0 +1,85 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from checkpoint import CrawlCheckpoint, read_base_url
+from main import AsyncCrawler
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test crawl checkpointing and resume."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "crawl_state.sqlite3"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batches_and_reloads_state(self):
+        checkpoint = CrawlCheckpoint(self.path, batch_size=3, flush_interval=60)
+        checkpoint.set_meta("base_url", "https://example.com/")
+        checkpoint.record_queued("example.com/a", "https://example.com/a", 1, "https://example.com/")
+        checkpoint.record_queued("example.com/b", "https://example.com/b", 2)
+        checkpoint.record_page("example.com/a", {"url": "https://example.com/a", "h1": "A"})
+        self.assertEqual(checkpoint.stats["commits"], 0)
+        checkpoint.record_queued("example.com/c", "https://example.com/c", 1)
+        self.assertEqual(checkpoint.stats["commits"], 1)
+        # Simulate a crash: nothing after the last batch is committed
+        checkpoint.record_queued("example.com/d", "https://example.com/d", 1)
+        checkpoint.db.close()
+
+        reopened = CrawlCheckpoint(self.path)
+        self.assertTrue(reopened.has_state())
+        self.assertEqual(dict(reopened.load_pages()), {"example.com/a": {"url": "https://example.com/a", "h1": "A"}})
+        self.assertEqual(reopened.load_frontier(), [
+            ("https://example.com/c", 1, None),
+            ("https://example.com/b", 2, None),
+        ])
+        reopened.close()
+        self.assertEqual(read_base_url(self.tmp.name), "https://example.com/")
+
+    def test_resume_after_interrupted_crawl(self):
+        hits = []
+
+        async def handler(request):
+            hits.append(request.path)
+            await asyncio.sleep(0.01)
+            i = int(request.path.strip("/p") or 0)
+            links = "".join(f'<a href="/p{i * 3 + n}">x</a>' for n in range(1, 4))
+            return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+
+        async def crawl(server, stop_after=None):
+            crawler = AsyncCrawler(str(server.make_url("/")), max_pages=30, respect_robots_txt=False,
+                                   checkpoint={"path": str(self.path), "batch_size": 1})
+            async with crawler:
+                task = asyncio.create_task(crawler.crawl())
+                while stop_after and crawler.checkpoint.stats["rows_written"] < stop_after:
+                    await asyncio.sleep(0.005)
+                if stop_after:
+                    task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            return crawler
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                await crawl(server, stop_after=20)
+                first_hits = len(hits)
+                resumed = await crawl(server)
+                return first_hits, resumed
+
+        first_hits, resumed = asyncio.run(run())
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(len(resumed.page_data), 30)
+        self.assertTrue(all("h1" in page for page in resumed.page_data.values()))
+        # Only pages in flight at the interruption are fetched twice
+        self.assertLessEqual(len(hits) - len(set(hits)), resumed.max_concurrency)
+        self.assertLess(len(hits) - first_hits, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
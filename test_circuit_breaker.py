@@ -0,0 +1,99 @@
+import asyncio
+import math
+import time
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from circuit_breaker import CircuitBreaker
+from main import AsyncCrawler
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the per-host circuit breaker and the delayed retry queue."""
+
+    def test_opens_probes_and_recovers(self):
+        breaker = CircuitBreaker({"failure_threshold": 2, "recovery_time": 0.05})
+        url = "https://example.com/a"
+        breaker.record_failure(url)
+        self.assertEqual(breaker.check(url), 0)
+        breaker.record_failure(url)
+        self.assertGreater(breaker.check(url), 0)
+        self.assertEqual(breaker.check("https://other.com/"), 0)
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.check(url), 0)  # the probe
+        self.assertGreater(breaker.check(url), 0)  # everyone else waits for it
+        breaker.record_success(url)
+        self.assertEqual(breaker.check(url), 0)
+        self.assertEqual(breaker.summary()["trips"], 1)
+        self.assertEqual(breaker.summary()["recoveries"], 1)
+
+    def test_gives_up_after_failed_probes(self):
+        breaker = CircuitBreaker({"failure_threshold": 1, "recovery_time": 0, "max_failed_probes": 2})
+        url = "https://example.com/a"
+        breaker.record_failure(url)
+        for _ in range(2):
+            self.assertEqual(breaker.check(url), 0)
+            breaker.record_failure(url)
+        self.assertEqual(breaker.check(url), math.inf)
+        self.assertEqual(breaker.summary()["abandoned_hosts"], ["example.com"])
+
+    def test_failed_page_is_retried_without_holding_a_slot(self):
+        fetched = []
+        failures = {"count": 0}
+
+        async def handler(request):
+            fetched.append(request.path)
+            if request.path == "/flaky" and failures["count"] < 2:
+                failures["count"] += 1
+                return web.Response(status=500)
+            links = '<a href="/flaky">f</a>' + "".join(f'<a href="/p{i}">p</a>' for i in range(5))
+            return web.Response(text=f"<html><body><h1>x</h1>{links}</body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                crawler = AsyncCrawler(str(server.make_url("/")), max_concurrency=1, max_pages=20,
+                                       max_retries=3, retry_delay=0.1, respect_robots_txt=False)
+                async with crawler:
+                    page_data = await crawler.crawl()
+                return crawler, page_data
+
+        crawler, page_data = asyncio.run(run())
+        stats = crawler.get_crawl_stats()["retries"]
+        self.assertNotIn("error", page_data["127.0.0.1/flaky"])
+        self.assertEqual(stats["retries_scheduled"], 2)
+        self.assertEqual(stats["recovered_pages"], 1)
+        # With a single slot, the other pages were fetched while /flaky waited
+        self.assertLess(fetched.index("/p4"), len(fetched) - 1)
+        self.assertEqual(fetched[-1], "/flaky")
+
+    def test_dead_host_is_given_up(self):
+        async def handler(request):
+            if request.path == "/":
+                links = "".join(f'<a href="/p{i}">p</a>' for i in range(6))
+                return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+            return web.Response(status=502)
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                crawler = AsyncCrawler(str(server.make_url("/")), max_concurrency=2, max_pages=20,
+                                       max_retries=3, retry_delay=0.01, respect_robots_txt=False,
+                                       circuit_breaker={"failure_threshold": 3, "recovery_time": 0.02,
+                                                        "max_failed_probes": 2})
+                async with crawler:
+                    page_data = await asyncio.wait_for(crawler.crawl(), timeout=10)
+                return crawler, page_data
+
+        crawler, page_data = asyncio.run(run())
+        stats = crawler.get_crawl_stats()["circuit_breaker"]
+        self.assertEqual(sum(1 for page in page_data.values() if "error" in page), 6)
+        self.assertGreaterEqual(stats["trips"], 1)
+        self.assertEqual(stats["abandoned_hosts"], ["127.0.0.1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+from email.utils import formatdate
+import time
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from concurrency import AdaptiveLimit, ConcurrencyController, parse_retry_after, percentile
+from main import AsyncCrawler
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test the adaptive per-host concurrency controller."""
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after("600", max_delay=60), 60)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 10, usegmt=True)), 10, delta=1.5)
+
+    def test_percentile(self):
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([5.0], 95), 5.0)
+
+    def test_grows_while_latency_is_stable(self):
+        async def run():
+            limit = AdaptiveLimit(initial=2, maximum=5, window=4)
+            for _ in range(10):
+                starts = [await limit.acquire() for _ in range(int(limit.limit))]
+                for started in starts:
+                    limit.release(started, "ok", 0.1)
+            return limit.limit
+
+        self.assertEqual(asyncio.run(run()), 5)
+
+    def test_overload_cuts_once_per_burst(self):
+        async def run():
+            limit = AdaptiveLimit(initial=8, maximum=8)
+            starts = [await limit.acquire() for _ in range(8)]
+            reasons = [limit.release(started, "overload") for started in starts]
+            return limit.limit, reasons
+
+        value, reasons = asyncio.run(run())
+        self.assertEqual(value, 4)
+        self.assertEqual(reasons.count("overload"), 1)
+
+    def test_rising_latency_cuts_limit(self):
+        async def run():
+            limit = AdaptiveLimit(initial=4, maximum=8, window=4)
+            for latency in (0.1, 0.1, 0.1, 0.1, 0.5, 0.5, 0.5, 0.5):
+                limit.release(await limit.acquire(), "ok", latency)
+            return limit.limit
+
+        self.assertEqual(asyncio.run(run()), 2)
+
+    def test_fixed_when_not_adaptive(self):
+        controller = ConcurrencyController(6, {"adaptive": False})
+        self.assertEqual(controller.get_limit("https://example.com/"), 6)
+
+    def test_trajectory_keeps_every_change_within_its_bound(self):
+        async def run():
+            controller = ConcurrencyController(8, {"initial": 8, "trajectory_length": 3})
+            url = "https://example.com/"
+            for _ in range(3):
+                # Back-to-back cuts land within the same 10 ms and must not overwrite each other
+                controller.release(url, await controller.acquire(url), "overload")
+            controller.get_limit("https://other.com/")
+            return controller.summary()["trajectory"]
+
+        trajectory = asyncio.run(run())
+        self.assertEqual([(host, limit, reason) for _, host, limit, reason in trajectory], [
+            ("example.com", 2, "overload"), ("example.com", 1, "overload"), ("other.com", 8, "start"),
+        ])
+
+    def test_crawl_backs_off_a_fragile_server(self):
+        state = {"in_flight": 0, "throttled": 0}
+
+        async def page(request):
+            if state["in_flight"] >= 3:
+                state["throttled"] += 1
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            state["in_flight"] += 1
+            try:
+                await asyncio.sleep(0.01)
+                i = int(request.match_info.get("i", 0))
+                links = "".join(f'<a href="/p/{i * 4 + n}">x</a>' for n in range(1, 5))
+                return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+            finally:
+                state["in_flight"] -= 1
+
+        async def run():
+            app = web.Application()
+            app.add_routes([web.get("/", page), web.get("/p/{i}", page)])
+            async with TestServer(app) as server:
+                crawler = AsyncCrawler(str(server.make_url("/")), max_concurrency=12, max_pages=60,
+                                       max_retries=5, retry_delay=0.01, respect_robots_txt=False,
+                                       concurrency={"initial": 2, "window": 4})
+                async with crawler:
+                    page_data = await crawler.crawl()
+                return crawler, page_data
+
+        crawler, page_data = asyncio.run(run())
+        stats = crawler.get_crawl_stats()["concurrency"]
+        self.assertEqual(sum(1 for page in page_data.values() if "error" not in page), 60)
+        self.assertGreater(stats["increases"], 0)
+        if state["throttled"]:
+            self.assertGreater(stats["decreases"], 0)
+        self.assertLess(stats["final_limits"]["127.0.0.1"], 12)
+        self.assertTrue(stats["trajectory"])
+
+
+if __name__ == "__main__":
+    unittest.main()
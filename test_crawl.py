@@ -5,7 +5,9 @@ from crawl import (
     get_first_paragraph_from_html,
     get_urls_from_html,
     get_images_from_html,
-    extract_page_data
+    get_classified_links,
+    extract_page_data,
+    StreamingLinkExtractor
 )
 
 class TestCrawl(unittest.TestCase):
@@ -227,6 +229,62 @@ class TestCrawl(unittest.TestCase):
         }
         self.assertEqual(actual, expected)
 
+    def test_extract_page_data_matches_individual_helpers(self):
+        input_url = "https://blog.boot.dev/articles"
+        input_bodies = [
+            '''<html><body>
+            <p>Before main.</p>
+            <h1>First <em>heading</em></h1>
+            <h1>Second heading</h1>
+            <main><div>No paragraph here</div></main>
+            <main><p>Second main paragraph.</p></main>
+            <a href="/a">A</a>
+            <a>No href</a>
+            <a href="https://other.com/b">B</a>
+            <img src="/i.png"><img>
+        </body></html>''',
+            # Blocks nested in headings and paragraphs, which html.parser never closes implicitly
+            '<h1>Title<div>sub</div></h1><p>one<p>two</p><a href="/c">C</a>',
+            '<h1>A<h2>sub</h2></h1><p>Text<div>more</div></p><p>x<table><tr><td>c</td></tr></table>y</p>',
+            # <template> text is left out, but its links and images are still found
+            '''<template><h1>Inert</h1><p>tp</p><a href="/t">T</a><img src="/t.png"></template>
+            <h1>Real</h1><p>a<script>var s;</script>b</p><a href="/b">B</a>''',
+            '<main><p>m1<p>m2<div>m3</div></main><p>outside</p>',
+            '<main><template><p>tp</p></template><p>real</p></main><p>outside</p>',
+        ]
+        for input_body in input_bodies:
+            with self.subTest(input_body=input_body[:40]):
+                actual = extract_page_data(input_body, input_url)
+                classified = get_classified_links(input_body, input_url)
+                self.assertEqual(actual["h1"], get_h1_from_html(input_body))
+                self.assertEqual(actual["first_paragraph"], get_first_paragraph_from_html(input_body))
+                self.assertEqual(actual["outgoing_links"], get_urls_from_html(input_body, input_url))
+                self.assertEqual(actual["internal_links"], classified["internal"])
+                self.assertEqual(actual["external_links"], classified["external"])
+                self.assertEqual(actual["total_link_count"], len(classified["all"]))
+                self.assertEqual(actual["image_urls"], get_images_from_html(input_body, input_url))
+                self.assertEqual(actual["image_count"], len(actual["image_urls"]))
+
+    def test_streaming_link_extractor_across_chunks(self):
+        input_url = "https://blog.boot.dev/articles/"
+        input_body = '<html><body><a href="/one">1</a><p>text</p><a href="two?x=1&amp;y=2">2</a><a>none</a></body></html>'
+        found = []
+        extractor = StreamingLinkExtractor(input_url, found.append)
+        for i in range(0, len(input_body), 7):
+            extractor.feed(input_body[i:i + 7])
+        extractor.close()
+        self.assertEqual(found, get_urls_from_html(input_body, input_url))
+
+    def test_streaming_link_extractor_reports_template_links(self):
+        input_url = "https://blog.boot.dev/"
+        input_body = '<a href="/a">a</a><template><a href="/t">t</a></template><a href="/b">b</a>'
+        found = []
+        extractor = StreamingLinkExtractor(input_url, found.append)
+        extractor.feed(input_body)
+        extractor.close()
+        self.assertEqual(found, get_urls_from_html(input_body, input_url))
+        self.assertEqual(found, extract_page_data(input_body, input_url)["outgoing_links"])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
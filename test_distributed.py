@@ -0,0 +1,241 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from distributed import FrontierServer, RemoteFrontier, SQLiteFrontier, SharedFrontier, parse_address, run_coordinator, run_worker
+
+
+class TestSQLiteFrontier(unittest.TestCase):
+    """Test leasing, extending and reclaiming URLs in the shared frontier."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "frontier.sqlite3"
+        self.frontier = SQLiteFrontier(self.path, "https://example.com/", max_pages=5, max_depth=2, max_attempts=2)
+
+    def tearDown(self):
+        asyncio.run(self.frontier.close())
+        self.tmp.cleanup()
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_add_dedups_and_enforces_budget_and_depth(self):
+        added = self.run_async(self.frontier.add([
+            ("https://example.com/", 0, None),
+            ("https://example.com/a", 1, "https://example.com/"),
+            ("https://example.com/a/", 1, "https://example.com/"),
+            ("https://example.com/deep", 3, "https://example.com/a"),
+        ]))
+        self.assertEqual(added, 2)
+        added = self.run_async(self.frontier.add([(f"https://example.com/p{i}", 1, None) for i in range(10)]))
+        self.assertEqual(added, 3)
+
+    def test_leases_are_exclusive_and_ordered_by_depth(self):
+        self.run_async(self.frontier.add([("https://example.com/b", 2, None), ("https://example.com/", 0, None),
+                                          ("https://example.com/a", 1, None)]))
+        first = self.run_async(self.frontier.lease("w1", 2, 60))
+        second = self.run_async(self.frontier.lease("w2", 2, 60))
+        self.assertEqual([depth for _, depth, _ in first], [0, 1])
+        self.assertEqual([url for url, _, _ in second], ["https://example.com/b"])
+        self.assertEqual(self.run_async(self.frontier.lease("w3", 2, 60)), [])
+        self.assertFalse(self.run_async(self.frontier.finished()))
+
+    def test_expired_lease_is_reclaimed_and_late_result_dropped(self):
+        self.run_async(self.frontier.add([("https://example.com/", 0, None)]))
+        self.run_async(self.frontier.lease("slow", 1, 0.01))
+        time.sleep(0.05)
+        leased = self.run_async(self.frontier.lease("fast", 1, 60))
+        self.assertEqual(leased, [("https://example.com/", 0, None)])
+        # The first worker's lease is gone: it can neither extend nor complete it
+        self.assertEqual(self.run_async(self.frontier.extend("slow", ["https://example.com/"], 60)), 0)
+        self.assertEqual(self.run_async(self.frontier.complete("slow", ["https://example.com/"], {})), 0)
+        page = {"url": "https://example.com/", "depth": 0, "title": "Home"}
+        self.assertEqual(self.run_async(self.frontier.complete("fast", ["https://example.com/"], {"example.com": page})), 1)
+        self.assertTrue(self.run_async(self.frontier.finished()))
+        self.assertEqual(dict(self.frontier.load_pages()), {"example.com": page})
+        summary = self.frontier.summary()
+        self.assertEqual(summary["reclaimed"], 1)
+        self.assertEqual(summary["stale_completions"], 1)
+        self.assertEqual(summary["pages_per_worker"], {"fast": 1})
+
+    def test_skipped_urls_free_their_budget(self):
+        self.run_async(self.frontier.add([(f"https://example.com/p{i}", 1, None) for i in range(5)]))
+        self.run_async(self.frontier.lease("w1", 5, 60))
+        # p0 was disallowed by robots.txt, so the worker sends no record for it
+        urls = [f"https://example.com/p{i}" for i in range(5)]
+        pages = {f"example.com/p{i}": {"url": urls[i]} for i in range(1, 5)}
+        self.assertEqual(self.run_async(self.frontier.complete("w1", urls, pages)), 5)
+        self.assertTrue(self.run_async(self.frontier.finished()))
+        self.assertEqual(self.run_async(self.frontier.add([("https://example.com/more", 1, None)])), 1)
+        self.assertEqual(self.frontier.summary()["skipped"], 1)
+        # The budget is a running counter in the database, shared with every process that opens it
+        other = SQLiteFrontier(self.path)
+        self.assertEqual(self.run_async(other.add([("https://example.com/over", 1, None)])), 0)
+        self.run_async(other.close())
+        self.assertNotIn("accepted", self.run_async(self.frontier.info()))
+
+    def test_extended_lease_is_not_reclaimed(self):
+        self.run_async(self.frontier.add([("https://example.com/", 0, None)]))
+        self.run_async(self.frontier.lease("w1", 1, 0.05))
+        self.assertEqual(self.run_async(self.frontier.extend("w1", ["https://example.com/"], 60)), 1)
+        time.sleep(0.1)
+        self.assertEqual(self.frontier.reclaim_expired(), 0)
+
+    def test_lease_holders_leave_out_expired_leases(self):
+        self.run_async(self.frontier.add([("https://example.com/", 0, None), ("https://example.com/a", 1, None)]))
+        self.run_async(self.frontier.lease("w1", 1, 0.01))
+        self.run_async(self.frontier.lease("w2", 1, 60))
+        time.sleep(0.05)
+        self.assertEqual(self.run_async(self.frontier.lease_holders()), ["w2"])
+
+    def test_url_is_abandoned_after_max_attempts(self):
+        self.run_async(self.frontier.add([("https://example.com/", 0, None)]))
+        for _ in range(2):
+            self.run_async(self.frontier.lease("w1", 1, 0.01))
+            time.sleep(0.05)
+            self.frontier.reclaim_expired()
+        self.assertTrue(self.run_async(self.frontier.finished()))
+        self.assertIn("lease expired", dict(self.frontier.load_pages())["example.com"]["error"])
+
+    def test_workers_read_settings_from_the_database(self):
+        other = SQLiteFrontier(self.path)
+        info = self.run_async(other.info())
+        self.run_async(other.close())
+        self.assertEqual(info["base_url"], "https://example.com/")
+        self.assertEqual(info["max_pages"], 5)
+
+    def test_remote_frontier(self):
+        async def run():
+            server = FrontierServer(self.frontier, "127.0.0.1", 0, token="secret")
+            await server.start()
+            remote = RemoteFrontier("127.0.0.1", server.port, token="secret")
+            intruder = RemoteFrontier("127.0.0.1", server.port, token="wrong")
+            try:
+                await remote.add([("https://example.com/", 0, None)])
+                leased = await remote.lease("w1", 5, 60)
+                with self.assertRaises(RuntimeError):
+                    await intruder.info()
+                # A call that fails on the coordinator gets an error reply, and the connection stays usable
+                with self.assertRaises(RuntimeError):
+                    await remote._call("lease", "w1")
+                self.assertFalse(await remote.finished())
+                return leased
+            finally:
+                await remote.close()
+                await intruder.close()
+                await server.close()
+
+        self.assertEqual(self.run_async(run()), [("https://example.com/", 0, None)])
+
+    def test_server_needs_token_beyond_loopback(self):
+        with self.assertRaises(ValueError):
+            FrontierServer(self.frontier, "0.0.0.0", 0)
+        FrontierServer(self.frontier, "0.0.0.0", 0, token="secret")
+        FrontierServer(self.frontier, "localhost", 0)
+        FrontierServer(self.frontier, "::1", 0)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("0.0.0.0:8700"), ("0.0.0.0", 8700))
+        with self.assertRaises(ValueError):
+            parse_address("8700")
+
+
+class ReleasingFrontier(SharedFrontier):
+    """Leases the same URL twice, as when a worker's expired lease comes back to it."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.leases = 2
+        self.completed = []
+
+    async def info(self):
+        return {"base_url": self.base_url, "workers": 1, "max_pages": 10}
+
+    async def add(self, links):
+        return 0
+
+    async def lease(self, worker_id, count, lease_seconds):
+        if not self.leases:
+            return []
+        self.leases -= 1
+        return [(self.base_url, 0, None)]
+
+    async def complete(self, worker_id, urls, pages):
+        self.completed.append(pages)
+        return len(urls)
+
+    async def finished(self):
+        return not self.leases
+
+
+class TestDistributedCrawl(unittest.TestCase):
+    """Test a crawl spread over several local worker processes."""
+
+    def test_worker_crawls_a_url_leased_again(self):
+        async def handler(request):
+            return web.Response(text="<html><body><h1>Home</h1></body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                frontier = ReleasingFrontier(str(server.make_url("/")))
+                stats = await run_worker(frontier, dict(rate_limit=0, respect_robots_txt=False), "w1", poll_interval=0.01)
+                return frontier.completed, stats
+
+        completed, stats = asyncio.run(run())
+        self.assertEqual(stats["pages"], 2)
+        self.assertEqual([[page["h1"] for page in pages.values()] for pages in completed], [["Home"], ["Home"]])
+
+    def test_workers_share_one_frontier(self):
+        async def handler(request):
+            i = int(request.path.strip("/p") or 0)
+            links = "".join(f'<a href="/p{(i * 3 + n) % 40}">x</a>' for n in range(1, 4))
+            # Slow enough that the second worker is up before the first has crawled everything
+            await asyncio.sleep(0.1)
+            return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+
+        async def run(path):
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                options = dict(max_pages=100, max_concurrency=4, rate_limit=0, respect_robots_txt=False, max_depth=0,
+                               page_store={"memory_pages": 10, "directory": str(path.parent)})
+                return await run_coordinator(str(server.make_url("/")), path, options, listen="127.0.0.1:0",
+                                             local_workers=2, batch_size=5, poll_interval=0.1, verbose=False)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            page_data, stats = asyncio.run(run(Path(tmp) / "frontier.sqlite3"))
+            # Loaded from the frontier database into a store that spilled past 10 records
+            self.assertGreater(page_data.summary()["pages_on_disk"], 0)
+            pages = dict(page_data.items())
+            page_data.close()
+        page_data = pages
+        # The home page and /p0..p39, each crawled once
+        self.assertEqual(len(page_data), 41)
+        self.assertTrue(all("h1" in page and "outgoing_links" in page for page in page_data.values()))
+        self.assertEqual(stats["distributed"]["done"], 41)
+        self.assertEqual(sum(stats["distributed"]["pages_per_worker"].values()), 41)
+        self.assertEqual(len(stats["distributed"]["pages_per_worker"]), 2)
+
+    def test_coordinator_fails_when_every_local_worker_dies(self):
+        async def run(path):
+            # AsyncCrawler rejects the unknown option, so each worker process exits with an error
+            options = dict(max_pages=10, respect_robots_txt=False, no_such_option=True)
+            return await asyncio.wait_for(
+                run_coordinator("http://127.0.0.1:9/", path, options, listen="127.0.0.1:0",
+                                local_workers=2, poll_interval=0.1, verbose=False),
+                timeout=60
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaisesRegex(RuntimeError, "all 2 local workers exited"):
+                asyncio.run(run(Path(tmp) / "frontier.sqlite3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -370,6 +370,27 @@ class TestReportGenerator(unittest.TestCase):
         self.assertEqual(stats["min_response_time"], 0.3)
         self.assertEqual(stats["max_response_time"], 0.5)
     
+    def test_timing_percentiles(self):
+        """Test per-phase request timing percentiles."""
+        import os
+        import tempfile
+        self.page_data["example.com"]["timing"] = {"throttle": 0.5, "connect": 0.02, "ttfb": 0.2, "download": 0.01}
+        self.page_data["example.com/page1"]["timing"] = {"throttle": 0.1, "ttfb": 0.1, "download": 0.03}
+        generator = ReportGenerator(self.page_data, self.base_url)
+        timing = generator.stats["timing_percentiles"]
+        
+        self.assertEqual(list(timing), ["throttle", "connect", "ttfb", "download"])
+        self.assertEqual(timing["connect"]["count"], 1)
+        self.assertEqual(timing["ttfb"]["p50"], 0.1)
+        self.assertEqual(timing["ttfb"]["p99"], 0.2)
+        with tempfile.TemporaryDirectory() as tmp:
+            stats_path = os.path.join(tmp, "statistics.txt")
+            generator.generate_statistics_report(stats_path)
+            with open(stats_path, encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn("Request Phase", text)
+        self.assertRegex(text, r"ttfb\s+0\.100s\s+0\.200s\s+0\.200s\s+2")
+    
     def test_error_rate_calculation(self):
         """Test error rate calculation."""
         generator = ReportGenerator(self.page_data, self.base_url)
@@ -378,6 +399,29 @@ class TestReportGenerator(unittest.TestCase):
         expected_error_rate = (1 / 3) * 100  # 1 error out of 3 pages
         self.assertAlmostEqual(stats["error_rate"], expected_error_rate, places=1)
 
+    def test_crawl_statistics_sections(self):
+        """Test that crawl-level statistics are rendered as report sections."""
+        import json
+        import os
+        import tempfile
+        crawl_stats = {"network": {"connections_created": 2, "connections_reused": 8, "avg_pool_wait": 0.0125}}
+        generator = ReportGenerator(self.page_data, self.base_url, crawl_stats)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            stats_path = os.path.join(tmp, "statistics.txt")
+            json_path = os.path.join(tmp, "site_structure.json")
+            generator.generate_statistics_report(stats_path)
+            generator.generate_json_report(json_path)
+            with open(stats_path, encoding="utf-8") as f:
+                text = f.read()
+            with open(json_path, encoding="utf-8") as f:
+                report = json.load(f)
+        
+        self.assertIn("NETWORK", text)
+        self.assertIn("Connections Reused: 8", text)
+        self.assertIn("Avg Pool Wait: 0.013", text)
+        self.assertEqual(report["crawl_statistics"], crawl_stats)
+
 
 class TestEmptyDataHandling(unittest.TestCase):
     """Test handling of empty or minimal data."""
@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+from crawl import extract_page_data
+from extraction_pool import ExtractionPool, pack_page_data, unpack_page_data, decode_body
+
+
+PAGE_URL = "https://example.com/blog/post"
+PAGE_HTML = '''<html><body>
+    <h1>Café</h1>
+    <main><p>Main paragraph.</p></main>
+    <a href="/a">A</a><a href="https://other.com/b">B</a><a href="/a">A again</a>
+    <img src="/i.png">
+</body></html>'''
+
+
+class TestExtractionPool(unittest.TestCase):
+    """Test the extraction stage."""
+
+    def test_pack_roundtrip(self):
+        data = extract_page_data(PAGE_HTML, PAGE_URL)
+        self.assertEqual(unpack_page_data(pack_page_data(data), PAGE_URL), data)
+
+    def test_decode_body_unknown_charset(self):
+        self.assertEqual(decode_body("café".encode("utf-8"), "no-such-charset"), "café")
+
+    def test_inline_and_process_pool_match(self):
+        expected = extract_page_data(PAGE_HTML, PAGE_URL)
+        big_html = PAGE_HTML.replace("</body>", "<p>x</p>" * 10000 + "</body>")
+        big_expected = extract_page_data(big_html, PAGE_URL)
+
+        async def run(workers):
+            pool = ExtractionPool(workers=workers, batch_max_bytes=4096, batch_size=4)
+            try:
+                small = [pool.extract(PAGE_HTML.encode("latin-1"), "latin-1", PAGE_URL) for _ in range(6)]
+                big = pool.extract(big_html.encode("utf-8"), "utf-8", PAGE_URL)
+                results = await asyncio.gather(*small, big)
+            finally:
+                await pool.close()
+            return results, pool.stats
+
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                results, stats = asyncio.run(run(workers))
+                self.assertEqual(results[:-1], [expected] * 6)
+                self.assertEqual(results[-1], big_expected)
+                self.assertEqual(stats["pages"], 7)
+                if workers:
+                    self.assertEqual(stats["batched_pages"], 6)
+                    self.assertEqual(stats["single_pages"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
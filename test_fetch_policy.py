@@ -0,0 +1,43 @@
+import unittest
+from fetch_policy import BandwidthStats, build_skip_extensions, has_skipped_extension
+
+
+class TestFetchPolicy(unittest.TestCase):
+    """Test URL filtering and bandwidth accounting."""
+
+    def test_skipped_extensions(self):
+        extensions = build_skip_extensions()
+        self.assertTrue(has_skipped_extension("https://example.com/files/report.PDF", extensions))
+        self.assertTrue(has_skipped_extension("https://example.com/a.tar.gz?download=1", extensions))
+        self.assertTrue(has_skipped_extension("https://example.com/logo.png#top", extensions))
+        self.assertFalse(has_skipped_extension("https://example.com/blog/pdf-tips", extensions))
+        self.assertFalse(has_skipped_extension("https://example.com/page.html", extensions))
+        self.assertFalse(has_skipped_extension("https://example.com/", extensions))
+
+    def test_config(self):
+        self.assertEqual(build_skip_extensions({"skip_extensions": False}), ())
+        extensions = build_skip_extensions({"extra_skip_extensions": ["ICS"]})
+        self.assertTrue(has_skipped_extension("https://example.com/cal.ics", extensions))
+        self.assertFalse(has_skipped_extension("https://example.com/cal.ics", ()))
+
+    def test_bandwidth_stats(self):
+        stats = BandwidthStats()
+        stats.record_page(1000)
+        stats.record_page(3000)
+        stats.record_skipped()
+        stats.record_skipped()
+        stats.record_rejected("content_type", declared=5000)
+        stats.record_rejected("too_large", declared=None, discarded=2000)
+
+        summary = stats.summary()
+        self.assertEqual(summary["avg_page_bytes"], 2000)
+        self.assertEqual(summary["max_page_bytes"], 3000)
+        self.assertEqual(summary["skipped_by_extension"], 2)
+        self.assertEqual(summary["rejected_content_type"], 1)
+        self.assertEqual(summary["rejected_too_large"], 1)
+        self.assertEqual(summary["bytes_avoided"], 5000)
+        self.assertEqual(summary["bytes_discarded"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+from frontier import Frontier, page_type_score
+
+
+class TestFrontier(unittest.TestCase):
+    """Test the crawl frontier."""
+
+    def test_deduplicates_on_normalized_url(self):
+        async def run():
+            frontier = Frontier()
+            self.assertTrue(frontier.add("https://example.com/a", 1))
+            self.assertFalse(frontier.add("https://www.example.com/a/", 2))
+            self.assertFalse(frontier.add("http://example.com/a?utm=x", 2))
+            self.assertTrue(frontier.add("https://example.com/b", 1))
+            self.assertEqual(len(frontier), 2)
+            self.assertEqual(frontier.seen_count, 2)
+            return await frontier.get()
+
+        self.assertEqual(asyncio.run(run()), ("https://example.com/a", 1, None))
+
+    def test_max_size_caps_distinct_urls(self):
+        async def run():
+            frontier = Frontier(max_size=2)
+            results = [frontier.add(f"https://example.com/{i}", 1) for i in range(5)]
+            return results, len(frontier)
+
+        results, size = asyncio.run(run())
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(size, 2)
+
+    def test_close_drops_queue_and_releases_join(self):
+        async def run():
+            frontier = Frontier()
+            for i in range(3):
+                frontier.add(f"https://example.com/{i}", 1)
+            frontier.close()
+            await asyncio.wait_for(frontier.join(), timeout=1)
+            return frontier.add("https://example.com/new", 1), len(frontier)
+
+        self.assertEqual(asyncio.run(run()), (False, 0))
+
+    def test_orders_by_depth_then_score(self):
+        async def run():
+            frontier = Frontier(score=page_type_score({"listing": 2, "blog_post": 1}))
+            frontier.add("https://example.com/deep/page", 3)
+            frontier.add("https://example.com/about", 1)
+            frontier.add("https://example.com/blog/post", 1)
+            frontier.add("https://example.com/category/news", 1)
+            frontier.add("https://example.com/", 0)
+            return [(await frontier.get())[0] for _ in range(5)]
+
+        self.assertEqual(asyncio.run(run()), [
+            "https://example.com/",
+            "https://example.com/category/news",
+            "https://example.com/blog/post",
+            "https://example.com/about",
+            "https://example.com/deep/page",
+        ])
+
+    def test_drops_urls_beyond_max_depth(self):
+        async def run():
+            frontier = Frontier(max_depth=2)
+            added = [frontier.add(f"https://example.com/{d}", d) for d in range(4)]
+            return added, frontier.dropped_too_deep
+
+        self.assertEqual(asyncio.run(run()), ([True, True, True, False], 1))
+
+    def test_rediscovered_url_moves_to_shallower_depth(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://example.com/a", 3, "https://example.com/x")
+            frontier.add("https://example.com/b", 2)
+            self.assertTrue(frontier.add("https://example.com/a", 1, "https://example.com/"))
+            self.assertEqual(len(frontier), 2)
+            items = [await frontier.get() for _ in range(2)]
+            for _ in items:
+                frontier.task_done()
+            # An idle worker skips the stale depth-3 entry, so the queue still drains
+            idle_worker = asyncio.create_task(frontier.get())
+            await asyncio.wait_for(frontier.join(), timeout=1)
+            idle_worker.cancel()
+            return items
+
+        self.assertEqual(asyncio.run(run()), [
+            ("https://example.com/a", 1, "https://example.com/"),
+            ("https://example.com/b", 2, None),
+        ])
+
+    def test_recrawl_requeues_a_seen_url(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://example.com/a", 1)
+            await frontier.get()
+            frontier.task_done()
+            self.assertFalse(frontier.add("https://example.com/a", 1))
+            self.assertTrue(frontier.add("https://example.com/a", 1, recrawl=True))
+            # Still waiting: not queued twice
+            self.assertFalse(frontier.add("https://example.com/a", 1, recrawl=True))
+            return await frontier.get(), len(frontier)
+
+        self.assertEqual(asyncio.run(run()), (("https://example.com/a", 1, None), 0))
+
+    def test_deferred_url_returns_and_keeps_join_waiting(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://example.com/a", 1)
+            frontier.add("https://example.com/b", 1)
+            url, depth, parent = await frontier.get()
+            frontier.defer(url, depth, parent, delay=0.05)
+            join = asyncio.create_task(frontier.join())
+
+            order = [(await frontier.get())[0]]
+            frontier.task_done()
+            await asyncio.sleep(0)
+            self.assertFalse(join.done())
+            order.append((await frontier.get())[0])
+            frontier.task_done()
+            await asyncio.wait_for(join, timeout=1)
+            return order
+
+        self.assertEqual(asyncio.run(run()), ["https://example.com/b", "https://example.com/a"])
+
+    def test_close_keeps_deferred_retries(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://example.com/a", 1)
+            url, depth, parent = await frontier.get()
+            frontier.defer(url, depth, parent, delay=0)
+            await asyncio.sleep(0.01)
+            frontier.add("https://example.com/b", 1)
+            frontier.close()
+            item = await asyncio.wait_for(frontier.get(), timeout=1)
+            frontier.task_done()
+            await asyncio.wait_for(frontier.join(), timeout=1)
+            return item
+
+        self.assertEqual(asyncio.run(run()), ("https://example.com/a", 1, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import unittest
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from main import AsyncCrawler, create_session
+from network import ConnectionStats
+
+try:
+    import httpx  # noqa: F401
+    import h2  # noqa: F401
+    HAVE_HTTPX = True
+except ImportError:
+    HAVE_HTTPX = False
+
+
+def site():
+    async def page(request):
+        i = int(request.match_info.get("i", 0))
+        links = "".join(f'<a href="/p/{(i + n) % 10}">x</a>' for n in range(1, 3))
+        return web.Response(text=f"<html><body><h1>Page {i}</h1><p>Text {i}</p>{links}</body></html>",
+                            content_type="text/html")
+
+    async def slow(request):
+        await asyncio.sleep(2)
+        return web.Response(text="late", content_type="text/html")
+
+    async def big(request):
+        return web.Response(body=b"x" * 100000, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", page)
+    app.router.add_get("/p/{i}", page)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/big", big)
+    return app
+
+
+@unittest.skipUnless(HAVE_HTTPX, "httpx[http2] not installed")
+class TestHTTPXBackend(unittest.TestCase):
+    """Test the httpx session against the fetch contract of the aiohttp one."""
+
+    def test_crawl_matches_aiohttp_backend(self):
+        async def run():
+            async with TestServer(site()) as server:
+                results = {}
+                for backend in ("aiohttp", "httpx"):
+                    async with AsyncCrawler(str(server.make_url("/")), max_pages=20, max_concurrency=1, rate_limit=0,
+                                            respect_robots_txt=False, network={"backend": backend}) as crawler:
+                        results[backend] = await crawler.crawl()
+                    results[backend + "_connections"] = crawler.connection_stats.summary()
+                return results
+
+        results = asyncio.run(run())
+        fields = ("h1", "first_paragraph", "outgoing_links", "depth", "status_code")
+        self.assertEqual(len(results["httpx"]), 11)
+        self.assertEqual({url: {field: page.get(field) for field in fields} for url, page in results["aiohttp"].items()},
+                         {url: {field: page.get(field) for field in fields} for url, page in results["httpx"].items()})
+        self.assertTrue(all({"ttfb", "download"} <= set(page["timing"]) for page in results["httpx"].values()))
+        connections = results["httpx_connections"]
+        self.assertGreaterEqual(connections["connections_created"], 1)
+        self.assertGreater(connections["connections_reused"], 0)
+
+    def test_errors_are_raised_as_aiohttp_errors(self):
+        async def run():
+            async with TestServer(site()) as server:
+                session = create_session({"backend": "httpx", "total_timeout": 0.2}, 10, ConnectionStats())
+                try:
+                    with self.assertRaises(asyncio.TimeoutError):
+                        async with session.get(str(server.make_url("/slow"))) as resp:
+                            await resp.content.read()
+                    async with session.get(str(server.make_url("/big"))) as resp:
+                        self.assertEqual(resp.status, 200)
+                        self.assertEqual(len(await resp.content.read(1000)), 1000)
+                        chunks = [chunk async for chunk in resp.content.iter_chunked(4096)]
+                        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+                        self.assertEqual(sum(map(len, chunks)), 99000)
+                    with socket.socket() as sock:
+                        sock.bind(("127.0.0.1", 0))
+                        port = sock.getsockname()[1]
+                    with self.assertRaises(aiohttp.ClientConnectionError):
+                        async with session.get(f"http://127.0.0.1:{port}/"):
+                            pass
+                finally:
+                    await session.close()
+
+        asyncio.run(run())
+
+
+class TestCreateSession(unittest.TestCase):
+    """Test backend selection."""
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_session({"backend": "curl"}, 10, ConnectionStats())
+
+
+if __name__ == "__main__":
+    unittest.main()
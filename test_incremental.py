@@ -0,0 +1,153 @@
+import asyncio
+import gzip
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from checkpoint import checkpoint_path
+from incremental import IncrementalState, parse_lastmod, parse_sitemap
+from main import AsyncCrawler
+
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-pages.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{base}p2</loc><lastmod>2000-01-01</lastmod></url>
+  <url><loc>{base}p3</loc><lastmod>2999-01-01T00:00:00Z</lastmod></url>
+  <url><loc>{base}p4</loc></url>
+</urlset>"""
+
+
+def _page(normalized_url):
+    """Path of a normalized URL without the leading slash ("" for the home page)."""
+    return normalized_url.partition("/")[2]
+
+
+class TestSitemapParsing(unittest.TestCase):
+    """Test sitemap and lastmod parsing."""
+
+    def test_parse_lastmod(self):
+        self.assertEqual(parse_lastmod("1970-01-02"), 86400)
+        self.assertEqual(parse_lastmod("1970-01-01T01:00:00Z"), 3600)
+        self.assertEqual(parse_lastmod("1970-01-01T01:00:00+01:00"), 0)
+        self.assertIsNone(parse_lastmod("yesterday"))
+        self.assertIsNone(parse_lastmod(""))
+
+    def test_parse_index_and_gzipped_urlset(self):
+        pages, children = parse_sitemap(SITEMAP_INDEX)
+        self.assertEqual(pages, {})
+        self.assertEqual(children, ["https://example.com/sitemap-pages.xml.gz"])
+
+        data = gzip.compress(SITEMAP.format(base="https://example.com/").encode())
+        pages, children = parse_sitemap(data)
+        self.assertEqual(children, [])
+        self.assertEqual(pages["https://example.com/p2"], parse_lastmod("2000-01-01"))
+        self.assertIsNone(pages["https://example.com/p4"])
+
+
+class TestIncrementalCrawl(unittest.TestCase):
+    """Test re-crawling against a previous run."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.first_run = Path(self.tmp.name) / "first"
+        self.second_run = Path(self.tmp.name) / "second"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_checkpoint(self):
+        with self.assertRaises(ValueError):
+            IncrementalState(self.tmp.name)
+
+    def test_recrawl_skips_unchanged_pages(self):
+        hits = []
+        site = {
+            "/": ["/p1", "/p2", "/p3", "/p4", "/p5"],
+            "/p1": [], "/p2": [], "/p3": [], "/p4": [], "/p5": [],
+        }
+        titles = {}
+
+        async def page(request):
+            if request.path not in site:
+                raise web.HTTPNotFound()
+            hits.append(request.path)
+            links = "".join(f'<a href="{link}">x</a>' for link in site[request.path])
+            html = f"<html><body><h1>{titles.get(request.path, request.path)}</h1>{links}</body></html>"
+            if request.path == "/p1":
+                etag = '"%s"' % hashlib.md5(html.encode()).hexdigest()
+                if request.headers.get("If-None-Match") == etag:
+                    return web.Response(status=304, headers={"ETag": etag})
+                return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+            return web.Response(text=html, content_type="text/html")
+
+        async def sitemap(request):
+            return web.Response(text=SITEMAP.format(base=str(request.url.origin()) + "/"), content_type="application/xml")
+
+        async def crawl(server, run_dir, previous_run=None):
+            crawler = AsyncCrawler(str(server.make_url("/")), max_pages=20, respect_robots_txt=False,
+                                   checkpoint={"path": str(checkpoint_path(run_dir))},
+                                   incremental={"previous_run": previous_run})
+            async with crawler:
+                await crawler.crawl()
+            return crawler
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/sitemap.xml", sitemap)
+            app.router.add_get("/{tail:.*}", page)
+            async with TestServer(app) as server:
+                await crawl(server, self.first_run)
+                first_hits = list(hits)
+                hits.clear()
+                # Between runs: /p3 changes, /p5 disappears, /p6 is new
+                titles["/p3"] = "new p3"
+                site["/"] = ["/p1", "/p2", "/p3", "/p4", "/p6"]
+                site["/p6"] = []
+                del site["/p5"]
+                crawler = await crawl(server, self.second_run, str(self.first_run))
+                return first_hits, crawler
+
+        first_hits, crawler = asyncio.run(run())
+        self.assertEqual(sorted(first_hits), ["/", "/p1", "/p2", "/p3", "/p4", "/p5"])
+        # /p2's sitemap lastmod predates the first run, so it isn't requested at all
+        self.assertNotIn("/p2", hits)
+        self.assertEqual(sorted(hits), ["/", "/p1", "/p3", "/p4", "/p6"])
+
+        outcomes = {_page(url): outcome for url, outcome in crawler.incremental.outcomes.items()}
+        self.assertEqual(outcomes, {
+            "": "changed",
+            "p1": "not_modified",
+            "p2": "unchanged_sitemap",
+            "p3": "changed",
+            "p4": "same_content",
+            "p6": "added",
+        })
+
+        # Reused pages keep their extraction results
+        pages = {_page(url): data for url, data in crawler.page_data.items()}
+        self.assertEqual(pages["p1"]["h1"], "/p1")
+        self.assertEqual(pages["p2"]["h1"], "/p2")
+        self.assertEqual(pages["p3"]["h1"], "new p3")
+        self.assertEqual(pages["p2"]["depth"], 1)
+
+        diff = crawler.incremental.diff(crawler.page_data)
+        self.assertEqual([_page(url) for url in diff["added"]], ["p6"])
+        self.assertEqual([_page(url) for url in diff["removed"]], ["p5"])
+        self.assertEqual(sorted(_page(url) for url in diff["changed"]), ["", "p3"])
+        self.assertEqual(len(diff["unchanged"]), 3)
+
+        stats = crawler.get_crawl_stats()["incremental"]
+        self.assertEqual(stats["previous_pages"], 6)
+        self.assertEqual(stats["sitemaps_read"], 1)
+        self.assertEqual(stats["unchanged_sitemap"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
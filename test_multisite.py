@@ -0,0 +1,170 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from config_loader import load_config
+from main import crawler_from_config
+from multisite import FairScheduler, MultiSiteCrawl, load_jobs, site_config
+
+
+class TestFairScheduler(unittest.TestCase):
+    """Test round-robin fetch slots."""
+
+    def test_sites_take_turns(self):
+        order = []
+
+        async def fetch(scheduler, site):
+            async with scheduler.slot(site):
+                order.append(site)
+                await asyncio.sleep(0.001)
+
+        async def run():
+            scheduler = FairScheduler(1)
+            # The busy site queues everything first
+            tasks = [asyncio.create_task(fetch(scheduler, "busy")) for _ in range(6)]
+            await asyncio.sleep(0)
+            tasks += [asyncio.create_task(fetch(scheduler, "small")) for _ in range(2)]
+            await asyncio.gather(*tasks)
+            return scheduler
+
+        scheduler = asyncio.run(run())
+        self.assertEqual(order, ["busy", "busy", "small", "busy", "small", "busy", "busy", "busy"])
+        self.assertEqual(scheduler.free, 1)
+        self.assertEqual(scheduler.summary("small")["waits"], 2)
+
+    def test_cancelled_waiter_gives_up_its_turn(self):
+        async def run():
+            scheduler = FairScheduler(1)
+            await scheduler.acquire("a")
+            waiter = asyncio.create_task(scheduler.acquire("b"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            scheduler.release()
+            return scheduler
+
+        self.assertEqual(asyncio.run(run()).free, 1)
+
+
+class TestJobs(unittest.TestCase):
+    """Test jobs files and per-site config."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "sites.yaml"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_load_jobs_and_site_config(self):
+        self.path.write_text(
+            "total_concurrency: 4\n"
+            "sites:\n"
+            "  - https://example.com\n"
+            "  - url: https://example.org\n"
+            "    max_pages: 7\n"
+            "    rate_limit: 0.5\n"
+            "    cache_dir: .cache/org\n"
+        )
+        jobs, settings = load_jobs(str(self.path))
+        self.assertEqual(settings, {"total_concurrency": 4})
+        self.assertEqual(jobs[0], {"url": "https://example.com"})
+
+        config = load_config()
+        org = site_config(config, jobs[1])
+        self.assertEqual(org.max_pages, 7)
+        self.assertEqual(org.rate_limit, 0.5)
+        self.assertTrue(org.get_cache_config()["enabled"])
+        # The shared config is untouched
+        self.assertNotEqual(config.max_pages, 7)
+        self.assertFalse(config.get_cache_config().get("enabled"))
+
+    def test_rejects_unknown_options(self):
+        self.path.write_text("sites:\n  - url: https://example.com\n    max_pagez: 3\n")
+        with self.assertRaises(ValueError):
+            load_jobs(str(self.path))
+
+
+class TestMultiSiteCrawl(unittest.TestCase):
+    """Test crawling several sites in one loop."""
+
+    def test_concurrent_sites_share_slots(self):
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            i = int(request.path.strip("/p") or 0)
+            links = "".join(f'<a href="/p{i * 3 + n}">x</a>' for n in range(1, 4))
+            return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as first, TestServer(app) as second:
+                config = load_config()
+                config.set('crawling', 'respect_robots_txt', False)
+                config.set('crawling', 'rate_limit', 0)
+                config.set('analysis', 'max_depth', 0)
+                # Distinct host names, so the sites get distinct scheduler keys
+                jobs = [{"url": f"http://127.0.0.1:{first.port}/", "max_pages": 20, "max_concurrency": 4},
+                        {"url": f"http://localhost:{second.port}/", "max_pages": 5, "max_concurrency": 2}]
+                async with MultiSiteCrawl(3, timeout=5) as multisite:
+                    crawlers = [crawler_from_config(job["url"], site_config(config, job), **multisite.crawler_options())
+                                for job in jobs]
+                    errors = await multisite.crawl(crawlers)
+                    self.assertFalse(multisite.session.closed)
+                return crawlers, errors
+
+        crawlers, errors = asyncio.run(run())
+        self.assertEqual(errors, [None, None])
+        self.assertEqual([len(crawler.page_data) for crawler in crawlers], [20, 5])
+        self.assertTrue(all("h1" in page for crawler in crawlers for page in crawler.page_data.values()))
+        self.assertLessEqual(in_flight["max"], 3)
+        self.assertIs(crawlers[0].session, crawlers[1].session)
+        stats = crawlers[1].get_crawl_stats()["fair_scheduling"]
+        self.assertGreaterEqual(stats["fetches"], 5)
+        self.assertNotEqual(crawlers[0].base_domain, crawlers[1].base_domain)
+
+    def test_throttled_site_does_not_hold_shared_slots(self):
+        finished = {}
+
+        async def handler(request):
+            finished[request.host.split(":")[0]] = asyncio.get_running_loop().time()
+            i = int(request.path.strip("/p") or 0)
+            links = "".join(f'<a href="/p{i * 3 + n}">x</a>' for n in range(1, 4))
+            return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as slow, TestServer(app) as fast:
+                config = load_config()
+                config.set('crawling', 'respect_robots_txt', False)
+                config.set('crawling', 'rate_limit', 0)
+                config.set('analysis', 'max_depth', 0)
+                # 2 requests/s: its workers spend most of the crawl sleeping in the rate limiter
+                jobs = [{"url": f"http://127.0.0.1:{slow.port}/", "max_pages": 4, "max_concurrency": 2,
+                         "rate_limit": 2},
+                        {"url": f"http://localhost:{fast.port}/", "max_pages": 10, "max_concurrency": 2}]
+                async with MultiSiteCrawl(2, timeout=5) as multisite:
+                    crawlers = [crawler_from_config(job["url"], site_config(config, job), **multisite.crawler_options())
+                                for job in jobs]
+                    started = asyncio.get_running_loop().time()
+                    errors = await multisite.crawl(crawlers)
+                return crawlers, errors, started
+
+        crawlers, errors, started = asyncio.run(run())
+        self.assertEqual(errors, [None, None])
+        self.assertEqual([len(crawler.page_data) for crawler in crawlers], [4, 10])
+        # The fast site finishes long before the throttled one instead of waiting behind its sleeps
+        self.assertLess(finished["localhost"] - started, 0.5)
+        self.assertGreater(finished["127.0.0.1"] - started, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
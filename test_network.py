@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from main import AsyncCrawler
+from concurrency import ServerError
+from network import TIMING_PHASES, RequestTiming
+
+
+class TestRequestTiming(unittest.TestCase):
+    """Test per-phase request timing."""
+
+    def test_phases_accumulate_and_skip_unmeasured(self):
+        timing = RequestTiming()
+        timing.start("ttfb")
+        timing.end("ttfb")
+        first = timing.phases["ttfb"]
+        timing.start("ttfb")
+        timing.end("ttfb")
+        timing.end("connect")  # never started
+        self.assertGreater(timing.phases["ttfb"], first)
+        self.assertEqual(list(timing.as_dict()), ["ttfb"])
+
+    def test_crawl_records_phases(self):
+        async def handler(request):
+            await asyncio.sleep(0.05)
+            links = '<a href="/a">a</a><a href="/b">b</a>' if request.path == "/" else ""
+            return web.Response(text=f"<html><body><h1>{request.path}</h1>{links}</body></html>",
+                                content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncCrawler(str(server.make_url("/")), max_pages=3, max_concurrency=1, rate_limit=0,
+                                        respect_robots_txt=False) as crawler:
+                    return await crawler.crawl()
+
+        page_data = asyncio.run(run())
+        self.assertEqual(len(page_data), 3)
+        for page in page_data.values():
+            timing = page["timing"]
+            self.assertTrue(set(timing) <= set(TIMING_PHASES))
+            self.assertGreaterEqual(timing["ttfb"], 0.04)
+            self.assertIn("download", timing)
+            self.assertIn("throttle", timing)
+            self.assertLessEqual(timing["ttfb"] + timing["download"], page["response_time"] + 0.01)
+        # One connection, opened for the first page and reused afterwards
+        self.assertEqual(sum("connect" in page["timing"] for page in page_data.values()), 1)
+
+    def test_get_html_makes_one_attempt(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request.path)
+            if request.path == "/down":
+                return web.Response(status=500)
+            return web.Response(body="<h1>Caf\u00e9</h1>".encode("latin-1"), content_type="text/html",
+                                charset="latin-1")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncCrawler(str(server.make_url("/")), max_pages=3, max_concurrency=1, rate_limit=0,
+                                        respect_robots_txt=False) as crawler:
+                    html, status, response_time = await crawler.get_html(str(server.make_url("/page")))
+                    with self.assertRaises(ServerError):
+                        await crawler.get_html(str(server.make_url("/down")))
+                    return html, status, response_time
+
+        html, status, response_time = asyncio.run(run())
+        self.assertEqual((html, status), ("<h1>Caf\u00e9</h1>", 200))
+        self.assertGreaterEqual(response_time, 0)
+        # No retries of its own: the failing page was requested once
+        self.assertEqual(requests, ["/page", "/down"])
+
+
+if __name__ == "__main__":
+    unittest.main()
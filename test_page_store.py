@@ -0,0 +1,159 @@
+import os
+import csv
+import json
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from main import AsyncCrawler
+from page_store import PageStore, build_page_store
+from report_generator import generate_all_reports
+from csv_report import write_csv_report
+
+
+def page(i: int, error: bool = False) -> dict:
+    if error:
+        return {"url": f"https://example.com/{i}", "error": "HTTP 404", "depth": 1}
+    return {"url": f"https://example.com/{i}", "h1": f"Page {i}", "first_paragraph": "Text",
+            "depth": i % 3, "page_type": "other", "incoming_link_count": i,
+            "internal_links": [f"https://example.com/{i + 1}"], "outgoing_links": [f"https://example.com/{i + 1}"],
+            "image_urls": [], "internal_link_count": 1, "external_link_count": 0, "image_count": 0,
+            "response_time": 0.01 * i, "timing": {"ttfb": 0.001 * i}}
+
+
+class TestPageStore(unittest.TestCase):
+    """Test the memory tier spilling into the disk tier."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_spills_least_recently_used_records(self):
+        store = PageStore(memory_pages=10, directory=self.directory)
+        for i in range(11):
+            store[f"example.com/{i}"] = page(i)
+            if i == 9:
+                store["example.com/0"]  # recently read records stay in memory
+        self.assertIn("example.com/0", store._memory)
+        self.assertNotIn("example.com/1", store._memory)
+        for i in range(11, 25):
+            store[f"example.com/{i}"] = page(i)
+        self.assertEqual(len(store), 25)
+        self.assertLessEqual(store.summary()["pages_in_memory"], 10)
+        self.assertGreater(store.summary()["pages_on_disk"], 0)
+        self.assertEqual(store["example.com/1"], page(1))
+        self.assertIn("example.com/2", store)
+        self.assertNotIn("example.com/99", store)
+        self.assertEqual(dict(store.items()), {f"example.com/{i}": page(i) for i in range(25)})
+        self.assertEqual(sorted(store), sorted(f"example.com/{i}" for i in range(25)))
+
+    def test_overwrite_and_pop_spilled_records(self):
+        store = PageStore(memory_pages=2, directory=self.directory)
+        store["example.com/a"] = {"url": "example.com/a", "status": "pending"}
+        for i in range(5):
+            store[f"example.com/{i}"] = page(i)
+        store["example.com/a"] = page(7)
+        self.assertEqual(len(store), 6)
+        self.assertEqual(store["example.com/a"], page(7))
+        self.assertEqual(sum(1 for key in store if key == "example.com/a"), 1)
+        self.assertEqual(store.pop("example.com/0"), page(0))
+        self.assertEqual(len(store), 5)
+        with self.assertRaises(KeyError):
+            del store["example.com/0"]
+
+    def test_in_place_changes_to_spilled_records_persist(self):
+        store = PageStore(memory_pages=2, directory=self.directory)
+        for i in range(5):
+            store[f"example.com/{i}"] = page(i)
+        self.assertNotIn("example.com/0", store._memory)
+        store["example.com/0"]["incoming_links"] = ["https://example.com/late"]
+        store["example.com/1"]["internal_links"].append("https://example.com/late")
+        # Reading the others pushes both back out to disk
+        for i in range(2, 5):
+            store[f"example.com/{i}"]
+        self.assertNotIn("example.com/0", store._memory)
+        self.assertEqual(store["example.com/0"]["incoming_links"], ["https://example.com/late"])
+        self.assertEqual(store["example.com/1"]["internal_links"][-1], "https://example.com/late")
+        self.assertEqual(len(store), 5)
+        self.assertEqual(sum(1 for key in store if key == "example.com/0"), 1)
+
+    def test_close_deletes_spill_file(self):
+        store = PageStore(memory_pages=1, directory=self.directory)
+        store["example.com/a"] = page(1)
+        store["example.com/b"] = page(2)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        store.close()
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(len(store), 0)
+
+    def test_never_spills_without_limit(self):
+        store = build_page_store({"memory_pages": 0, "directory": self.directory})
+        for i in range(100):
+            store[f"example.com/{i}"] = page(i)
+        self.assertEqual(store.summary()["pages_on_disk"], 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_reports_match_in_memory_data(self):
+        records = {f"example.com/{i}": page(i, error=i % 7 == 0) for i in range(60)}
+        store = PageStore(memory_pages=8, directory=self.directory)
+        for key, data in records.items():
+            store[key] = data
+
+        outputs = []
+        for i, page_data in enumerate((records, store)):
+            output_dir = Path(self.directory) / f"reports-{i}"
+            generator = generate_all_reports(page_data, "https://example.com", str(output_dir))
+            write_csv_report(page_data, str(output_dir / "report.csv"))
+            with open(output_dir / "site_structure.json", encoding="utf-8") as f:
+                report = json.load(f)
+            with open(output_dir / "report.csv", newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            html = (output_dir / "report.html").read_text(encoding="utf-8")
+            outputs.append((generator.stats, report, rows, html))
+
+        (stats, report, rows, html), (store_stats, store_report, store_rows, store_html) = outputs
+        self.assertEqual(store_stats, stats)
+        by_url = lambda pages: sorted(pages, key=lambda p: p["normalized_url"])
+        self.assertEqual(by_url(store_report["pages"]), by_url(report["pages"]))
+        self.assertEqual(sorted(store_rows, key=lambda r: r["page_url"]), sorted(rows, key=lambda r: r["page_url"]))
+        self.assertIn("https://example.com/59", store_html)
+        self.assertEqual(store_html.count('class="error"'), html.count('class="error"'))
+
+
+class TestPageStoreCrawl(unittest.TestCase):
+    """Test a crawl whose page records do not fit in the memory tier."""
+
+    def test_crawl_spills_and_keeps_every_page(self):
+        async def handler(request):
+            n = int(request.path.strip("/") or 0)
+            links = "".join(f'<a href="/{n * 3 + k}">{k}</a>' for k in (1, 2, 3) if n * 3 + k < 30)
+            return web.Response(text=f"<html><body><h1>Page {n}</h1>{links}</body></html>",
+                                content_type="text/html")
+
+        async def run(directory):
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncCrawler(str(server.make_url("/")), max_pages=100, rate_limit=0,
+                                        respect_robots_txt=False,
+                                        page_store={"memory_pages": 4, "directory": directory}) as crawler:
+                    page_data = await crawler.crawl()
+                return page_data, crawler.get_crawl_stats()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            page_data, stats = asyncio.run(run(tmp))
+            self.assertEqual(len(page_data), 30)
+            self.assertGreater(stats["page_store"]["pages_on_disk"], 0)
+            h1s = sorted(data["h1"] for data in page_data.values())
+            self.assertEqual(h1s, sorted(f"Page {n}" for n in range(30)))
+            self.assertFalse(any(data.get("status") == "pending" for data in page_data.values()))
+            page_data.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
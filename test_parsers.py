@@ -0,0 +1,120 @@
+import unittest
+from crawl import extract_page_data
+from parsers import PARSER_BACKENDS, DEFAULT_PARSER, get_parser_backend, available_parsers
+
+
+# Documents every backend must extract identically to html.parser
+CONFORMANCE_PAGES = [
+    ("https://example.com", '<html><body></body></html>'),
+    ("https://example.com", ''),
+    ("https://example.com/blog/post", '''<html><head><title>Post</title></head><body>
+        <h1>Title with <span>nested</span> tags</h1>
+        <p>Outside paragraph.</p>
+        <main>
+            <div><p>Main <b>paragraph</b> &amp; more.</p></div>
+            <p>Second main paragraph.</p>
+        </main>
+        <a href="/relative">Relative</a>
+        <a href="https://other.com/page">External</a>
+        <a href="https://www.example.com/www">WWW</a>
+        <a>No href</a>
+        <a href="">Empty href</a>
+        <img src="/logo.png" alt="Logo">
+        <img alt="No src">
+        <img src="https://cdn.example.com/a.jpg">
+    </body></html>'''),
+    ("https://example.com/docs/", '''<!DOCTYPE html>
+<html><body>
+    <main><section>No paragraph in main</section></main>
+    <p>Fallback paragraph<!-- with a comment --> here.</p>
+    <h1>First</h1><h1>Second</h1>
+    <a href="../up">Up</a><a href="?q=1">Query</a><a href="#frag">Fragment</a>
+</body></html>'''),
+    ("https://example.com/encoding", '''<?xml version="1.0" encoding="utf-8"?>
+<html><body><h1>Caf&eacute; &#8212; menu</h1><p>Unicode: naïve façade</p></body></html>'''),
+    ("https://example.com/block-in-h1", '<body><h1>Head<a href="/x">link<p>in</p></a></h1></body>'),
+    ("https://example.com/script-in-p", '''<body>
+        <p>a<script>var s;</script>b<style>p {}</style><!--c-->d</p><a href="/b">b</a></body>'''),
+    # Only a real <link rel=canonical> before <body> counts; html.parser has no implied <body>
+    ("https://example.com/canonical", '''<!DOCTYPE html><title>T</title><!-- <link rel="canonical" href="/c"> -->
+        <script>s = '<link rel="canonical" href="/s">'</script><template><link rel="canonical" href="/t"></template>
+        <link rel="alternate CANONICAL" href=" /real?x=1 "><link rel="canonical" href="/second"><p>body</p>'''),
+    ("https://example.com/canonical-in-body", '<p>text</p><link rel="canonical" href="/late">'),
+    ("https://example.com/canonical-after-text", 'text<link rel="canonical" href="/late">'),
+]
+
+# Documents the parsers build different trees for, with the backends whose output differs
+# from html.parser (see the parsers module docstring)
+DIVERGENT_PAGES = [
+    ("https://example.com/implied-p", '<html><body><p>one<p>two</body></html>', {"lxml", "selectolax"}),
+    ("https://example.com/div-in-p", '<html><body><p>Text<div>more</div></p></body></html>', {"lxml", "selectolax"}),
+    ("https://example.com/table-in-p", '<body><p>x<table><tr><td>c</td></tr></table>y</p></body>', {"lxml"}),
+    ("https://example.com/main-implied-p", '<body><main><p>m1<p>m2</main><p>outside</p></body>',
+     {"lxml", "selectolax"}),
+    ("https://example.com/nested-h1", '<body><h1>A<h2>sub</h2></h1><p>x</p></body>', {"selectolax"}),
+    ("https://example.com/h1-in-h1", '<body><h1>One<h1>Two</h1></h1><p>x</p></body>', {"selectolax"}),
+    ("https://example.com/cdata", '<body><p>a<![CDATA[x]]>b</p></body>', {"lxml", "selectolax"}),
+    ("https://example.com/template", '''<body><template><a href="/t">t</a><p>tp</p><img src="/t.png"></template>
+        <p>a<script>var s;</script>b</p><a href="/b">b</a></body>''', {"selectolax"}),
+]
+
+
+class TestParserBackends(unittest.TestCase):
+    """Conformance tests: every installed backend matches the default parser."""
+
+    def test_default_parser_always_available(self):
+        self.assertIn(DEFAULT_PARSER, available_parsers())
+
+    def test_unknown_parser_rejected(self):
+        with self.assertRaises(ValueError):
+            get_parser_backend("no-such-parser")
+
+    def test_backends_match_default_output(self):
+        for name in PARSER_BACKENDS:
+            if name == DEFAULT_PARSER:
+                continue
+            if name not in available_parsers():
+                continue
+            pages = CONFORMANCE_PAGES + [(url, html) for url, html, backends in DIVERGENT_PAGES
+                                         if name not in backends]
+            for url, html in pages:
+                with self.subTest(parser=name, url=url, html=html[:40]):
+                    expected = extract_page_data(html, url)
+                    actual = extract_page_data(html, url, parser=name)
+                    self.assertEqual(actual, expected)
+
+    def test_default_parser_keeps_text_after_nested_blocks(self):
+        backend = get_parser_backend(DEFAULT_PARSER)
+        self.assertEqual(backend.extract('<p>one<p>two</p>')[1], "onetwo")
+        self.assertEqual(backend.extract('<p>Text<div>more</div></p>')[1], "Textmore")
+        self.assertEqual(backend.extract('<h1>Title<div>sub</div></h1>')[0], "Titlesub")
+        self.assertEqual(backend.extract('<h1>A<h2>sub</h2></h1>')[0], "Asub")
+
+    def test_template_text_left_out_but_links_kept(self):
+        html = next(html for url, html, backends in DIVERGENT_PAGES if url.endswith("/template"))
+        for name in available_parsers():
+            if name == "selectolax":
+                continue
+            with self.subTest(parser=name):
+                self.assertEqual(get_parser_backend(name).extract(html), ("", "", ["/t", "/b"], ["/t.png"], None))
+
+    @unittest.skipUnless("lxml" in available_parsers(), "lxml not installed")
+    def test_lxml_backend_fields(self):
+        h1, paragraph, hrefs, srcs, canonical = get_parser_backend("lxml").extract(CONFORMANCE_PAGES[2][1])
+        self.assertEqual(h1, "Title with nested tags")
+        self.assertEqual(paragraph, "Main paragraph & more.")
+        self.assertEqual(hrefs, ["/relative", "https://other.com/page", "https://www.example.com/www"])
+        self.assertEqual(srcs, ["/logo.png", "https://cdn.example.com/a.jpg"])
+        self.assertIsNone(canonical)
+
+    @unittest.skipUnless("selectolax" in available_parsers(), "selectolax not installed")
+    def test_selectolax_backend_fields(self):
+        h1, paragraph, hrefs, srcs, canonical = get_parser_backend("selectolax").extract(CONFORMANCE_PAGES[3][1])
+        self.assertEqual(h1, "First")
+        self.assertEqual(paragraph, "Fallback paragraph here.")
+        self.assertEqual(hrefs, ["../up", "?q=1", "#frag"])
+        self.assertEqual(srcs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import time
+import unittest
+from rate_limiter import TokenBucket, HostRateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test per-host token-bucket rate limiting."""
+
+    def test_sustained_rate_matches_configuration(self):
+        async def run():
+            bucket = TokenBucket(rate=50, burst=1)
+            start = time.monotonic()
+            await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+            return time.monotonic() - start
+
+        # First token is free, the other ten are spaced 20ms apart
+        self.assertAlmostEqual(asyncio.run(run()), 0.2, delta=0.05)
+
+    def test_burst_is_served_immediately(self):
+        bucket = TokenBucket(rate=1, burst=3)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(delays[3], 1.0, delta=0.01)
+
+    def test_hosts_are_limited_independently(self):
+        limiter = HostRateLimiter(default_rate=1, host_limits={"www.fast.com": {"rate": 100, "burst": 5}})
+        self.assertEqual(limiter.get_rate("fast.com"), 100)
+        self.assertEqual(limiter.get_rate("slow.com"), 1)
+
+        async def run():
+            start = time.monotonic()
+            await limiter.acquire("https://slow.com/a")
+            await asyncio.gather(*(limiter.acquire(f"https://fast.com/{i}") for i in range(5)))
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(run()), 0.1)
+        self.assertEqual(limiter.stats["fast.com"]["requests"], 5)
+        self.assertEqual(limiter.stats["fast.com"]["throttled"], 0)
+
+    def test_unlimited_rate_never_waits(self):
+        bucket = TokenBucket(rate=0)
+        self.assertEqual([bucket.reserve() for _ in range(100)], [0.0] * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from replay import replay_archive, infer_base_url
+from response_cache import ResponseCache
+
+
+def page(title, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><h1>{title}</h1><p>About {title}.</p>{anchors}</body></html>".encode()
+
+
+class TestReplay(unittest.TestCase):
+    """Test offline replay of archived responses."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        cache = ResponseCache(self.tmp.name)
+        cache.store("https://example.com/", page("Home", "/a", "/b"), "utf-8")
+        cache.store("https://example.com/a", page("A", "/", "/c"), "utf-8")
+        cache.store("https://example.com/b", page("B", "/c", "https://other.com/"), "utf-8")
+        cache.store("https://example.com/c", page("C"), "utf-8")
+        cache.store("https://example.com/orphan", page("Orphan"), "utf-8")
+        cache.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_infer_base_url(self):
+        self.assertEqual(infer_base_url(self.tmp.name), "https://example.com/")
+
+    def test_rebuilds_depth_and_incoming_links(self):
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                page_data, stats = replay_archive(self.tmp.name, workers=workers)
+
+                self.assertEqual(set(page_data), {"example.com", "example.com/a", "example.com/b", "example.com/c"})
+                self.assertEqual(page_data["example.com"]["h1"], "Home")
+                self.assertEqual(page_data["example.com"]["depth"], 0)
+                self.assertEqual(page_data["example.com/c"]["depth"], 2)
+                self.assertEqual(page_data["example.com/c"]["incoming_links"], ["https://example.com/a"])
+                self.assertEqual(page_data["example.com/b"]["external_link_count"], 1)
+                self.assertEqual(stats["archived_responses"], 5)
+                self.assertEqual(stats["unreachable_pages"], 1)
+
+    def test_max_depth(self):
+        page_data, _ = replay_archive(self.tmp.name, workers=0, max_depth=1)
+        self.assertNotIn("example.com/c", page_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
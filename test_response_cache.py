@@ -0,0 +1,64 @@
+import tempfile
+import time
+import unittest
+from response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the on-disk response cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name, max_size_mb=1, ttl_hours=1)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_store_and_revalidate(self):
+        self.cache.store("https://example.com/a", b"<html>a</html>", "utf-8", etag='"v1"', last_modified="Wed, 01 Jan 2025 00:00:00 GMT")
+        entry = self.cache.lookup("https://example.com/a")
+
+        self.assertEqual(ResponseCache.conditional_headers(entry), {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"
+        })
+        self.assertEqual(self.cache.load_body(entry), b"<html>a</html>")
+
+        self.cache.record_hit(entry, 14)
+        summary = self.cache.summary()
+        self.assertEqual(summary["hits"], 1)
+        self.assertEqual(summary["bytes_saved"], 14)
+        self.assertIsNone(self.cache.lookup("https://example.com/missing"))
+
+    def test_identical_bodies_share_one_blob(self):
+        body = b"<html>same</html>" * 100
+        self.cache.store("https://example.com/a", body, "utf-8")
+        self.cache.store("https://example.com/b", body, "utf-8")
+        self.assertEqual(len(self.cache), 2)
+        size_two = self.cache.size()
+
+        self.cache.store("https://example.com/a", b"<html>changed</html>", "utf-8")
+        self.assertGreater(self.cache.size(), size_two)
+        self.assertEqual(self.cache.load_body(self.cache.lookup("https://example.com/b")), body)
+
+    def test_expired_entries_are_dropped(self):
+        self.cache.store("https://example.com/a", b"<html>a</html>", "utf-8")
+        self.cache.db.execute("UPDATE entries SET stored_at = ?", (time.time() - 7200,))
+        self.assertIsNone(self.cache.lookup("https://example.com/a"))
+        self.assertEqual(self.cache.stats["expired"], 1)
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_lru_eviction_keeps_recent_entries(self):
+        import os
+        self.cache.max_bytes = 30 * 1024
+        for i in range(5):
+            self.cache.store(f"https://example.com/{i}", os.urandom(10 * 1024), "utf-8")
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+        self.assertGreater(self.cache.stats["evicted"], 0)
+        self.assertIsNone(self.cache.lookup("https://example.com/0"))
+        self.assertIsNotNone(self.cache.lookup("https://example.com/4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
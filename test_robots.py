@@ -0,0 +1,94 @@
+import asyncio
+import tempfile
+import unittest
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from main import AsyncCrawler
+from robots import RobotsCache
+
+
+ROBOTS_TXT = "User-agent: *\nDisallow: /private\nCrawl-delay: 0.01\n"
+
+
+def make_app(robots_status=200):
+    requests = {"robots": 0}
+
+    async def robots(request):
+        requests["robots"] += 1
+        if robots_status != 200:
+            return web.Response(status=robots_status)
+        return web.Response(text=ROBOTS_TXT)
+
+    async def page(request):
+        links = '<a href="/private/a">a</a><a href="/public">b</a><a href="/private/b">c</a>'
+        return web.Response(text=f"<html><body><h1>Home</h1>{links}</body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.add_routes([web.get("/robots.txt", robots), web.get("/", page), web.get("/public", page),
+                    web.get("/private/{name}", page)])
+    return app, requests
+
+
+class TestRobots(unittest.TestCase):
+    """Test robots.txt fetching, caching and enforcement."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load_rules(self, robots_status=200, loads=3):
+        async def run():
+            app, requests = make_app(robots_status)
+            async with TestServer(app) as server, aiohttp.ClientSession() as session:
+                robots = RobotsCache(cache_dir=self.tmp.name)
+                url = str(server.make_url("/"))
+                await asyncio.gather(*(robots.load(session, url) for _ in range(loads)))
+                return robots, url, requests["robots"]
+        return asyncio.run(run())
+
+    def test_fetched_once_per_host(self):
+        robots, url, fetches = self.load_rules()
+        self.assertEqual(fetches, 1)
+        self.assertTrue(robots.allowed(url + "public"))
+        self.assertFalse(robots.allowed(url + "private/a"))
+        self.assertEqual(robots.crawl_delay(url), 0.01)
+
+    def test_disk_cache(self):
+        _, url, _ = self.load_rules()
+        robots = RobotsCache(cache_dir=self.tmp.name)
+        self.assertEqual(robots._read_disk(robots._host(url)), ROBOTS_TXT)
+        expired = RobotsCache(cache_dir=self.tmp.name, ttl_hours=0)
+        self.assertIsNone(expired._read_disk(expired._host(url)))
+
+    def test_missing_robots_allows_everything(self):
+        robots, url, _ = self.load_rules(robots_status=404)
+        self.assertTrue(robots.allowed(url + "private/a"))
+
+    def test_server_error_disallows_host(self):
+        robots, url, _ = self.load_rules(robots_status=503)
+        self.assertFalse(robots.allowed(url))
+        self.assertEqual(robots.stats["fetch_errors"], 1)
+
+    def test_disallowed_links_never_reach_the_frontier(self):
+        async def run():
+            app, _ = make_app()
+            async with TestServer(app) as server:
+                crawler = AsyncCrawler(str(server.make_url("/")), max_pages=10,
+                                       robots={"cache_dir": self.tmp.name})
+                async with crawler:
+                    page_data = await crawler.crawl()
+                return crawler, page_data
+
+        crawler, page_data = asyncio.run(run())
+        self.assertEqual(len(page_data), 2)
+        self.assertEqual(crawler.frontier.seen_count, 2)
+        # Both pages link to /private/a and /private/b, refused while streaming and again from the page record
+        self.assertEqual(crawler.get_crawl_stats()["robots"]["disallowed_links"], 8)
+        self.assertEqual(crawler.rate_limiter.get_rate("127.0.0.1"), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
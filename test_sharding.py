@@ -0,0 +1,91 @@
+import asyncio
+import tempfile
+import unittest
+from collections import Counter
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from page_store import PageStore
+from sharding import HashRing, crawl_sharded, shard_options, split_budget
+
+
+class TestHashRing(unittest.TestCase):
+    """Test consistent hashing of URLs to shards."""
+
+    def setUp(self):
+        self.urls = [f"example.com/page/{i}" for i in range(4000)]
+
+    def test_even_split(self):
+        ring = HashRing(4)
+        counts = Counter(ring.owner(url) for url in self.urls)
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        for count in counts.values():
+            self.assertGreater(count, 1000 * 0.7)
+            self.assertLess(count, 1000 * 1.3)
+
+    def test_adding_a_shard_moves_few_urls(self):
+        before = HashRing(4)
+        after = HashRing(5)
+        moved = sum(before.owner(url) != after.owner(url) for url in self.urls)
+        # Ideally 1/5 of the URLs move, all of them to the new shard
+        self.assertLess(moved, len(self.urls) * 0.3)
+        self.assertTrue(all(after.owner(url) == 4 for url in self.urls if before.owner(url) != after.owner(url)))
+
+
+class TestShardOptions(unittest.TestCase):
+    """Test splitting budgets between shards."""
+
+    def test_split_budget(self):
+        self.assertEqual([split_budget(10, 3, i) for i in range(3)], [4, 3, 3])
+        self.assertEqual(sum(split_budget(1001, 8, i) for i in range(8)), 1001)
+
+    def test_shard_options(self):
+        options = shard_options({
+            "max_pages": 100, "max_concurrency": 5, "rate_limit": 2.0,
+            "host_rate_limits": {"a.com": 1.0, "b.com": {"rate": 4.0, "burst": 2}},
+            "cache": {"enabled": True}, "checkpoint": {"path": "x"}
+        }, 2, 1)
+        self.assertEqual(options["max_pages"], 50)
+        self.assertEqual(options["max_concurrency"], 3)
+        self.assertEqual(options["rate_limit"], 1.0)
+        self.assertEqual(options["host_rate_limits"], {"a.com": 0.5, "b.com": {"rate": 2.0, "burst": 2}})
+        self.assertFalse(options["cache"]["enabled"])
+        self.assertFalse(options["checkpoint"]["enabled"])
+        self.assertEqual(options["extraction"]["workers"], 0)
+
+
+class TestShardedCrawl(unittest.TestCase):
+    """Test a crawl split over several processes."""
+
+    def test_sharded_crawl_matches_single_process_shape(self):
+        async def handler(request):
+            i = int(request.path.strip("/p") or 0)
+            links = "".join(f'<a href="/p{(i * 3 + n) % 40}">x</a>' for n in range(1, 4))
+            return web.Response(text=f"<html><body><h1>{i}</h1>{links}</body></html>", content_type="text/html")
+
+        async def run(directory):
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                options = dict(max_pages=100, max_concurrency=4, rate_limit=0, respect_robots_txt=False, max_depth=0,
+                               page_store={"memory_pages": 10, "directory": directory})
+                return await asyncio.to_thread(crawl_sharded, str(server.make_url("/")), options, 2,
+                                               quiet_period=0.1, verbose=False, batch_size=8)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            page_data, stats = asyncio.run(run(tmp))
+            # The shards' records were streamed into one store that spilled past 10 records
+            self.assertIsInstance(page_data, PageStore)
+            self.assertGreater(page_data.summary()["pages_on_disk"], 0)
+            pages = dict(page_data.items())
+            page_data.close()
+        page_data = pages
+        # The home page and /p0..p39, each crawled once by its owning shard
+        self.assertEqual(len(page_data), 41)
+        self.assertTrue(all("h1" in page and "outgoing_links" in page for page in page_data.values()))
+        self.assertEqual(stats["sharding"]["shards"], 2)
+        self.assertEqual(sum(stats["sharding"]["pages_per_shard"].values()), 41)
+        self.assertGreater(stats["sharding"]["links_forwarded"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
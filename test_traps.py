@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from frontier import Frontier
+from main import AsyncCrawler
+from traps import ACCEPT, DEPRIORITIZE, DROP, TrapDetector, build_trap_detector, repeated_cycles, simhash, url_pattern
+
+
+class TestURLPattern(unittest.TestCase):
+    """Test grouping URLs into path patterns."""
+
+    def test_numbers_ids_and_query_keys(self):
+        self.assertEqual(url_pattern("example.com/events/2024/05"), "example.com/events/{n}/{n}")
+        self.assertEqual(url_pattern("example.com/s/a1b2c3d4e5f6a7b8c9/cart"), "example.com/s/{id}/cart")
+        self.assertEqual(url_pattern("example.com/page;jsessionid=abc"), "example.com/page")
+        self.assertEqual(url_pattern("example.com/shop?size=m&color=red"), "example.com/shop?color&size")
+        self.assertEqual(url_pattern("example.com/about"), "example.com/about")
+        self.assertEqual(url_pattern("127.0.0.1:8080/p/3"), "127.0.0.1:8080/p/{n}")
+
+    def test_simhash_of_similar_token_sets_is_close(self):
+        tokens = [f"word{i}" for i in range(40)]
+        near = bin(simhash(tokens) ^ simhash(tokens[:-1] + ["other"])).count("1")
+        far = bin(simhash(tokens) ^ simhash([f"else{i}" for i in range(40)])).count("1")
+        self.assertLess(near, far)
+
+
+class TestTrapDetector(unittest.TestCase):
+    """Test the trap heuristics."""
+
+    def check(self, detector, path):
+        return detector.check("example.com" + path)
+
+    def test_drops_long_deep_and_repeating_urls(self):
+        detector = TrapDetector({"max_url_length": 60, "max_path_segments": 5})
+        self.assertEqual(self.check(detector, "/a/b/c"), ACCEPT)
+        self.assertEqual(self.check(detector, "/" + "x" * 60), DROP)
+        self.assertEqual(self.check(detector, "/a/b/c/d/e/f"), DROP)
+        self.assertEqual(self.check(detector, "/a/b/a/b/a"), DROP)
+        # Repeated numbers are ordinary (/2024/05/05)
+        self.assertEqual(self.check(detector, "/5/5/5"), ACCEPT)
+        summary = detector.summary()
+        self.assertEqual(summary["dropped_long_url"], 1)
+        self.assertEqual(summary["dropped_deep_path"], 1)
+        self.assertEqual(summary["dropped_repeated_segments"], 1)
+
+    def test_url_length_is_measured_after_normalization(self):
+        detector = TrapDetector({"max_url_length": 60})
+        frontier = Frontier(traps=detector)
+        self.assertTrue(frontier.add("https://www.example.com/a?utm_source=newsletter&utm_campaign=" + "x" * 60, 1))
+        self.assertEqual(detector.summary()["dropped_long_url"], 0)
+
+    def test_reused_segment_is_not_a_cycle(self):
+        detector = TrapDetector()
+        self.assertEqual(self.check(detector, "/docs/v1/docs/api/docs"), ACCEPT)
+        self.assertEqual(self.check(detector, "/a/x/a/y/a/z/a"), ACCEPT)
+        self.assertEqual(self.check(detector, "/a/a/a"), DROP)
+        self.assertEqual(self.check(detector, "/shop/a/b/c/a/b/c/a/b"), DROP)
+        self.assertEqual(repeated_cycles("a b a b a".split()), 3)
+        self.assertEqual(repeated_cycles("docs v1 docs api docs".split()), 2)
+        self.assertEqual(repeated_cycles([]), 1)
+
+    def test_pattern_budget_then_cap(self):
+        detector = TrapDetector({"pattern_budget": 3, "pattern_cap": 5})
+        verdicts = [self.check(detector, f"/calendar/{day}") for day in range(7)]
+        self.assertEqual(verdicts, [ACCEPT] * 3 + [DEPRIORITIZE] * 2 + [DROP] * 2)
+        self.assertEqual(self.check(detector, "/about"), ACCEPT)
+        self.assertTrue(detector.is_trap("example.com/calendar/99"))
+        self.assertEqual(detector.summary()["throttled_patterns"],
+                         {"example.com/calendar/{n}": "2 deprioritized; capped (more than 5 URLs), 2 dropped"})
+
+    def test_near_duplicate_pages_cap_their_pattern(self):
+        detector = TrapDetector({"duplicate_min_pages": 4, "duplicate_ratio": 0.5})
+        for day in range(4):
+            self.assertEqual(self.check(detector, f"/day/{day}"), ACCEPT)
+            detector.record_page(f"example.com/day/{day}", {
+                "h1": "Events", "first_paragraph": "No events scheduled for this day.",
+                "outgoing_links": [f"https://example.com/day/{day + 1}", "https://example.com/"]
+            })
+        for i in range(4):
+            detector.record_page(f"example.com/post/{i}", {
+                "h1": f"Post {i}", "first_paragraph": f"Entirely different story number {i} about topic {i * 7}",
+                "outgoing_links": []
+            })
+        self.assertEqual(self.check(detector, "/day/5"), DROP)
+        self.assertEqual(self.check(detector, "/post/5"), ACCEPT)
+        self.assertIn("near-identical", detector.summary()["throttled_patterns"]["example.com/day/{n}"])
+
+    def test_disabled(self):
+        self.assertIsNone(build_trap_detector({"enabled": False}))
+        self.assertIsInstance(build_trap_detector(None), TrapDetector)
+
+
+class TestFrontierTraps(unittest.TestCase):
+    """Test the frontier acting on trap verdicts."""
+
+    def test_deprioritized_urls_come_last_within_their_depth(self):
+        async def run():
+            frontier = Frontier(traps=TrapDetector({"pattern_budget": 1, "pattern_cap": 3}))
+            added = [frontier.add(f"https://example.com/tag/{i}", 1) for i in range(4)]
+            frontier.add("https://example.com/about", 1)
+            frontier.add("https://example.com/deep", 2)
+            order = [(await frontier.get())[0] for _ in range(len(frontier))]
+            return added, order
+
+        added, order = asyncio.run(run())
+        self.assertEqual(added, [True, True, True, False])
+        self.assertEqual(order, [
+            "https://example.com/tag/0",
+            "https://example.com/about",
+            "https://example.com/tag/1",
+            "https://example.com/tag/2",
+            "https://example.com/deep",
+        ])
+
+
+class TestTrapCrawl(unittest.TestCase):
+    """Test a crawl that runs into an endless calendar."""
+
+    def test_calendar_is_capped(self):
+        async def handler(request):
+            if request.path.startswith("/cal/"):
+                day = int(request.path.rsplit("/", 1)[-1])
+                body = f'<h1>Calendar</h1><p>Nothing on this day.</p><a href="/cal/{day + 1}">next</a>'
+            else:
+                body = '<h1>Home</h1><a href="/cal/0">calendar</a><a href="/about">about</a>'
+            return web.Response(text=f"<html><body>{body}</body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncCrawler(str(server.make_url("/")), max_pages=200, rate_limit=0,
+                                        respect_robots_txt=False, traps={"duplicate_min_pages": 5}) as crawler:
+                    page_data = await crawler.crawl()
+                return page_data, crawler.get_crawl_stats()["traps"]
+
+        page_data, traps = asyncio.run(run())
+        self.assertLess(len(page_data), 10)
+        self.assertEqual(len(traps["throttled_patterns"]), 1)
+        self.assertTrue(next(iter(traps["throttled_patterns"])).endswith("/cal/{n}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from crawl import extract_page_data, normalize_url
+from main import AsyncCrawler
+from url_policy import URLPolicy
+
+
+class TestURLPolicy(unittest.TestCase):
+    """Test query-string normalization."""
+
+    def test_default_keeps_query_without_tracking_parameters(self):
+        policy = URLPolicy()
+        self.assertEqual(policy.normalize("https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK=0000320193"),
+                         "sec.gov/cgi-bin/browse-edgar?CIK=0000320193&action=getcompany")
+        self.assertEqual(policy.normalize("https://example.com/a/?utm_source=x&id=3&fbclid=y#top"), "example.com/a?id=3")
+        self.assertEqual(policy.normalize("https://example.com/?b=2&a=1"), policy.normalize("https://example.com?a=1&b=2"))
+        self.assertEqual(policy.normalize("https://example.com/?utm_medium=mail"), "example.com")
+        # Without a policy the query string is dropped, as before
+        self.assertEqual(normalize_url("https://example.com/a?id=3"), "example.com/a")
+
+    def test_drop_with_allow_list_and_domain_overrides(self):
+        policy = URLPolicy({
+            "query": "drop",
+            "domains": {
+                "sec.gov": {"allow": ["action", "cik"]},
+                "app.example.com": {"query": "keep", "strip_fragment": False, "sort_query": False},
+            }
+        })
+        self.assertEqual(policy.normalize("https://example.com/list?page=2"), "example.com/list")
+        self.assertEqual(policy.normalize("https://www.sec.gov/edgar?CIK=1&action=getcompany&owner=include"),
+                         "sec.gov/edgar?CIK=1&action=getcompany")
+        self.assertEqual(policy.normalize("https://efts.sec.gov/search?cik=1&q=x"), "efts.sec.gov/search?cik=1")
+        self.assertEqual(policy.normalize("https://app.example.com/#/users?b=1&a=2"), "app.example.com/#/users?b=1&a=2")
+        self.assertEqual(policy.normalize("https://app.example.com/x?b=1&a=2"), "app.example.com/x?b=1&a=2")
+        with self.assertRaises(ValueError):
+            URLPolicy({"query": "sometimes"})
+
+    def test_keys_are_cached_and_interned(self):
+        policy = URLPolicy()
+        first = policy.normalize("https://example.com/p?id=" + "1" * 3)
+        second = policy.normalize("https://example.com/p?id=" + "1" * 3)
+        self.assertIs(first, second)
+        self.assertIs(policy.normalize("https://example.com/p/?id=111"), first)
+        self.assertEqual(policy.keys_computed, 2)
+        self.assertEqual(policy.cache_hits, 1)
+
+    def test_canonical_alias(self):
+        policy = URLPolicy()
+        key = policy.normalize("https://example.com/shoes?color=red")
+        canonical_key = policy.learn_canonical("https://example.com/shoes?color=red", "/shoes")
+        self.assertEqual(canonical_key, "example.com/shoes")
+        policy.alias(canonical_key, key)
+        self.assertEqual(policy.normalize("https://example.com/shoes"), key)
+        self.assertIsNone(policy.learn_canonical("https://example.com/a", "https://example.com/a/"))
+        self.assertIsNone(policy.learn_canonical("https://example.com/a", "https://other.com/a"))
+        self.assertIsNone(URLPolicy({"canonical": False}).learn_canonical("https://example.com/a?x=1", "/a"))
+
+    def test_learns_ignorable_parameters_from_canonical_urls(self):
+        policy = URLPolicy({"learn_parameters": 2, "allow": []})
+        for i in range(2):
+            self.assertEqual(policy.normalize(f"https://example.com/item?id={i}&sort=price"),
+                             f"example.com/item?id={i}&sort=price")
+            policy.learn_canonical(f"https://example.com/item?id={i}&sort=price", f"/item?id={i}")
+        self.assertEqual(policy.normalize("https://example.com/item?id=7&sort=name"), "example.com/item?id=7")
+        self.assertEqual(policy.normalize("https://other.example.org/item?id=7&sort=name"),
+                         "other.example.org/item?id=7&sort=name")
+        self.assertEqual(policy.summary()["learned_ignored_parameters"], {"example.com": "sort"})
+
+    def test_canonical_url_is_extracted_with_the_page(self):
+        canonical = lambda html: extract_page_data(html, "https://example.com/c")["canonical_url"]
+        html = '<html><head><LINK REL="Canonical" href="/a?x=1"></head><body><link rel=canonical href=/b>'
+        self.assertEqual(canonical(html), "https://example.com/a?x=1")
+        self.assertIsNone(canonical('<link rel="stylesheet" href="s.css"><p>'))
+        # Markup in comments and scripts is not a link element
+        self.assertIsNone(canonical('<head><!-- <link rel="canonical" href="/x"> -->'
+                                    '<script>s = \'<link rel="canonical" href="/y">\'</script></head>'))
+
+
+class TestURLPolicyCrawl(unittest.TestCase):
+    """Test a crawl of pages that differ only by their query string."""
+
+    def test_query_pages_are_distinct_and_canonical_duplicates_collapse(self):
+        async def handler(request):
+            head = ""
+            if request.path == "/item":
+                item = request.query.get("id")
+                head = f'<link rel="canonical" href="/item?id={item}">'
+                body = f'<h1>Item {item}</h1><a href="/item?id=2">related</a>'
+            elif request.path == "/sale":
+                # The same page as /item?id=2
+                head = '<link rel="canonical" href="/item?id=2">'
+                body = '<h1>Item 2</h1>'
+            elif request.path == "/promo":
+                # The same page as the home page, which is crawled first
+                head = '<link rel="canonical" href="/">'
+                body = '<h1>Home</h1>'
+            else:
+                body = '<a href="/sale">sale</a><a href="/promo">promo</a>' + "".join(
+                    f'<a href="/item?id={i}&utm_source=home">x</a><a href="/item?id={i}">y</a>' for i in range(2))
+            return web.Response(text=f"<html><head>{head}</head><body>{body}</body></html>", content_type="text/html")
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncCrawler(str(server.make_url("/")), max_pages=50, max_concurrency=1, rate_limit=0,
+                                        respect_robots_txt=False) as crawler:
+                    page_data = await crawler.crawl()
+                return page_data, crawler.get_crawl_stats()["url_policy"]
+
+        page_data, stats = asyncio.run(run())
+        paths = sorted(key.partition("/")[2] for key in page_data)
+        # /item?id=2 is /sale's canonical URL, so it isn't fetched a second time
+        self.assertEqual(paths, ["", "item?id=0", "item?id=1", "promo", "sale"])
+        self.assertTrue(next(page for key, page in page_data.items() if key.endswith("/sale"))["canonical_url"]
+                        .endswith("/item?id=2"))
+        # /promo's canonical URL already has its own record
+        home_key = next(key for key in page_data if not key.partition("/")[2])
+        self.assertEqual(next(page for key, page in page_data.items() if key.endswith("/promo"))["duplicate_of"],
+                         home_key)
+        self.assertEqual(stats["canonical_aliases"], 1)
+        self.assertEqual(stats["canonical_duplicates"], 1)
+        self.assertGreater(stats["cache_hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
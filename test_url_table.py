@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from frontier import Frontier
+from url_table import NO_PARENT, BloomFilter, URLTable, build_url_table
+
+
+class TestURLTable(unittest.TestCase):
+    """Test interning normalized URLs into arrays."""
+
+    def test_ids_keys_depths_and_parents(self):
+        table = URLTable(capacity=4)
+        home = table.add("example.com")
+        about = table.add("example.com/about", 1, home)
+        other = table.add("other.org/about?x=1", 2, about)
+        self.assertEqual((home, about, other), (0, 1, 2))
+        self.assertEqual(table.add("example.com/about", 5), about)
+        self.assertEqual(table.get("other.org/about?x=1"), other)
+        self.assertIsNone(table.get("example.com/about/"))
+        self.assertIsNone(table.get("unknown.net/about"))
+        self.assertEqual(table.key(other), "other.org/about?x=1")
+        self.assertEqual(table.key(home), "example.com")
+        self.assertEqual(list(table.depths), [0, 1, 2])
+        self.assertEqual(list(table.parents), [NO_PARENT, home, about])
+        self.assertIn("example.com/about", table)
+
+    def test_grows_and_stays_compact(self):
+        table = URLTable(capacity=2)
+        urls = [f"example.com/section/page-title-{i}" for i in range(20000)]
+        ids = [table.add(url) for url in urls]
+        self.assertEqual(ids, list(range(len(urls))))
+        self.assertTrue(all(table.get(url) == i for i, url in enumerate(urls)))
+        self.assertEqual(len(table), len(urls))
+        # URL bytes plus a few dozen bytes of arrays per URL
+        self.assertLess(table.nbytes / len(urls), 100)
+
+    def test_bloom_front_has_no_false_negatives(self):
+        table = URLTable(BloomFilter(1000, 0.01))
+        for i in range(3000):
+            table.add(f"example.com/{i}")
+        self.assertTrue(all(f"example.com/{i}" in table for i in range(3000)))
+        self.assertFalse(any(f"example.com/x{i}" in table for i in range(3000)))
+
+    def test_build_url_table(self):
+        self.assertIsNone(build_url_table().bloom)
+        self.assertEqual(build_url_table({"bloom_filter": True}, 500).bloom.size,
+                         BloomFilter(500, 0.01).size)
+
+
+class TestFrontierURLTable(unittest.TestCase):
+    """Test the frontier keeping its visited set in a URLTable."""
+
+    def test_records_depth_and_parent(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://example.com/", 0)
+            frontier.add("https://example.com/a", 2, "https://example.com/")
+            frontier.add("https://example.com/a", 1, "https://example.com/")
+            return frontier.urls
+
+        urls = asyncio.run(run())
+        a = urls.get("example.com/a")
+        self.assertEqual(urls.depths[a], 1)
+        self.assertEqual(urls.key(urls.parents[a]), "example.com")
+
+    def test_queue_entries_hold_ids_not_urls(self):
+        async def run():
+            frontier = Frontier()
+            frontier.add("https://www.example.com/", 0)
+            frontier.add("https://example.com/a/", 1, "https://www.example.com/")
+            # The parent came from another shard and isn't in the table
+            frontier.add("https://example.com/b?utm_source=x#top", 1, "https://example.com/elsewhere")
+            entries = list(frontier._queue._queue)
+            return entries, [await frontier.get() for _ in range(3)]
+
+        entries, items = asyncio.run(run())
+        self.assertFalse(any(isinstance(field, str) for entry in entries for field in entry[:4]))
+        self.assertEqual(items, [
+            ("https://www.example.com/", 0, None),
+            ("https://example.com/a/", 1, "https://www.example.com/"),
+            ("https://example.com/b?utm_source=x#top", 1, "https://example.com/elsewhere"),
+        ])
+
+    def test_urls_as_found(self):
+        table = URLTable()
+        for key, url in [("example.com", "https://example.com/"), ("example.com/a", "http://www.example.com:8080/a"),
+                         ("example.com/b?x=1", "https://example.com/b?x=1"), ("example.com/c", "https://example.com/C"),
+                         ("example.com/d", "https://example.com/d?utm_source=x"), ("example.com/e", "/e")]:
+            url_id = table.add(key)
+            self.assertIsNone(table.url(url_id))
+            table.set_url(url_id, url)
+            self.assertEqual(table.url(url_id), url)
+        # Rebuilt from one interned prefix per scheme and host; only the last three are stored whole
+        self.assertEqual(len(table._prefixes), 2)
+        self.assertEqual(sum(1 for value in table._url_of if value < 0), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
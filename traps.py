@@ -0,0 +1,220 @@
+"""
+Crawler-trap detection for the URL frontier.
+
+Calendars, faceted filters and session ids in paths generate an endless
+supply of distinct URLs that would use up the page budget. TrapDetector
+looks at every new URL before it is queued, in constant time per URL (the
+work depends on the URL's length, not on how many URLs came before it):
+
+- URLs whose normalized form is longer than max_url_length (tracking
+  parameters and fragments don't count), or with more than
+  max_path_segments path segments, are dropped.
+- A path that cycles through the same segments (/a/a/a, /a/b/a/b/a) more
+  than max_repeated_segments times in a row is dropped. A name that merely
+  comes back (/docs/v1/docs/api) is not a cycle.
+- URLs are grouped into path patterns, with digit runs and id-like
+  segments replaced by placeholders (example.com/events/{n}/{n}). Past
+  pattern_budget URLs a pattern is crawled after everything else at the
+  same depth; past pattern_cap its URLs are dropped.
+- Crawled pages are fingerprinted (SimHash of the heading, first paragraph
+  and link patterns). A pattern whose pages keep coming out near-identical
+  is capped at once.
+
+summary() lists the patterns that were throttled and why.
+"""
+
+import hashlib
+import re
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_TRAP_CONFIG = {
+    "enabled": True,
+    "max_url_length": 300,
+    "max_path_segments": 20,
+    "max_repeated_segments": 2,
+    "pattern_budget": 200,
+    "pattern_cap": 1000,
+    "duplicate_min_pages": 10,
+    "duplicate_ratio": 0.8,
+    "duplicate_distance": 3,
+}
+
+# check() verdicts
+ACCEPT = "accept"
+DEPRIORITIZE = "deprioritize"
+DROP = "drop"
+
+_DIGITS = re.compile(r"\d+")
+# Session ids, hashes, UUIDs: long tokens mixing letters and digits
+_ID_LIKE = re.compile(r"^(?=.*\d)(?=.*[a-zA-Z])[0-9a-zA-Z_-]{16,}$")
+_WORD = re.compile(r"\w+")
+
+_RECENT_FINGERPRINTS = 8
+
+
+def _segment_pattern(segment: str) -> str:
+    segment = segment.split(";", 1)[0]  # ;jsessionid=... and other path parameters
+    if _ID_LIKE.match(segment):
+        return "{id}"
+    return _DIGITS.sub("{n}", segment)
+
+
+def repeated_cycles(segments: List[str]) -> int:
+    """
+    How many times the most repeated cycle of path segments occurs back to back.
+
+    /a/b/a/b/a is the cycle a/b three times (counting the last, partial one).
+    Numeric segments never match, so dates like /2024/05/05 aren't cycles.
+    """
+    most = 1
+    for period in range(1, len(segments) // 2 + 1):
+        run = 0
+        for i in range(period, len(segments)):
+            if segments[i] == segments[i - period] and not segments[i].isdigit():
+                run += 1
+                most = max(most, 1 + (run + period - 1) // period)
+            else:
+                run = 0
+    return most
+
+
+def url_pattern(normalized_url: str) -> str:
+    """Path pattern of a normalized URL: host/path with numbers and ids replaced, plus sorted query keys."""
+    path, _, query = normalized_url.partition("?")
+    host, *segments = path.split("/")
+    pattern = "/".join([host] + [_segment_pattern(segment) for segment in segments])
+    if query:
+        keys = sorted({pair.partition("=")[0] for pair in query.split("&") if pair})
+        pattern += "?" + "&".join(keys)
+    return pattern
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash; similar token sets give fingerprints a few bits apart."""
+    weights = [0] * 64
+    for token in tokens:
+        value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def page_fingerprint(data: Dict[str, Any]) -> int:
+    """Fingerprint of a page record's visible content and link structure."""
+    text = f"{data.get('title', '')} {data.get('h1', '')} {data.get('first_paragraph', '')}"
+    tokens = _WORD.findall(text.lower())
+    # Links by pattern, so "next month" pages linking one step further still match;
+    # each pattern counts once, so a long list of links doesn't drown out the text
+    tokens.extend(sorted({url_pattern(link.split("://", 1)[-1]) for link in data.get("outgoing_links", [])}))
+    return simhash(tokens)
+
+
+class _Pattern:
+    __slots__ = ("urls", "pages", "near_duplicates", "fingerprints", "reason", "deprioritized", "dropped")
+
+    def __init__(self):
+        self.urls = 0
+        self.pages = 0
+        self.near_duplicates = 0
+        self.fingerprints = deque(maxlen=_RECENT_FINGERPRINTS)
+        self.reason = None  # set once the pattern is capped
+        self.deprioritized = 0
+        self.dropped = 0
+
+
+class TrapDetector:
+    """Online trap detection; Frontier.add asks check() about every new URL."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Initialize the detector.
+
+        Args:
+            config: The traps section of config.yaml (see DEFAULT_TRAP_CONFIG)
+        """
+        self.config = {**DEFAULT_TRAP_CONFIG, **(config or {})}
+        self.patterns: Dict[str, _Pattern] = {}
+        self.stats = Counter()
+
+    def _pattern(self, normalized_url: str) -> _Pattern:
+        key = url_pattern(normalized_url)
+        state = self.patterns.get(key)
+        if state is None:
+            state = self.patterns[key] = _Pattern()
+        return state
+
+    def check(self, normalized_url: str) -> str:
+        """ACCEPT, DEPRIORITIZE or DROP a URL the frontier has not seen before."""
+        config = self.config
+        self.stats["checked"] += 1
+        if len(normalized_url) > config["max_url_length"]:
+            self.stats["dropped_long_url"] += 1
+            return DROP
+        segments = [segment for segment in normalized_url.partition("?")[0].split("/")[1:] if segment]
+        if len(segments) > config["max_path_segments"]:
+            self.stats["dropped_deep_path"] += 1
+            return DROP
+        if repeated_cycles(segments) > config["max_repeated_segments"]:
+            self.stats["dropped_repeated_segments"] += 1
+            return DROP
+
+        state = self._pattern(normalized_url)
+        if state.reason is None and config["pattern_cap"] and state.urls >= config["pattern_cap"]:
+            state.reason = f"more than {config['pattern_cap']} URLs"
+        if state.reason is not None:
+            state.dropped += 1
+            self.stats["dropped_by_pattern"] += 1
+            return DROP
+        state.urls += 1
+        if config["pattern_budget"] and state.urls > config["pattern_budget"]:
+            state.deprioritized += 1
+            self.stats["deprioritized"] += 1
+            return DEPRIORITIZE
+        return ACCEPT
+
+    def record_page(self, normalized_url: str, data: Dict[str, Any]):
+        """Fingerprint a crawled page; cap its pattern if its pages keep coming out near-identical."""
+        config = self.config
+        state = self._pattern(normalized_url)
+        fingerprint = page_fingerprint(data)
+        state.pages += 1
+        if any(bin(fingerprint ^ other).count("1") <= config["duplicate_distance"] for other in state.fingerprints):
+            state.near_duplicates += 1
+        state.fingerprints.append(fingerprint)
+        if (state.reason is None and state.pages >= config["duplicate_min_pages"]
+                and state.near_duplicates >= state.pages * config["duplicate_ratio"]):
+            state.reason = f"{state.near_duplicates} of {state.pages} pages near-identical"
+
+    def is_trap(self, normalized_url: str) -> bool:
+        state = self.patterns.get(url_pattern(normalized_url))
+        return state is not None and state.reason is not None
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters plus the throttled patterns for the statistics report."""
+        throttled = {}
+        for key, state in self.patterns.items():
+            if state.reason is None and not state.deprioritized:
+                continue
+            parts = []
+            if state.deprioritized:
+                parts.append(f"{state.deprioritized} deprioritized")
+            if state.reason is not None:
+                parts.append(f"capped ({state.reason}), {state.dropped} dropped")
+            throttled[key] = "; ".join(parts)
+        return {
+            "urls_checked": self.stats["checked"],
+            "dropped_long_url": self.stats["dropped_long_url"],
+            "dropped_deep_path": self.stats["dropped_deep_path"],
+            "dropped_repeated_segments": self.stats["dropped_repeated_segments"],
+            "dropped_by_pattern": self.stats["dropped_by_pattern"],
+            "deprioritized": self.stats["deprioritized"],
+            "throttled_patterns": throttled
+        }
+
+
+def build_trap_detector(config: Optional[Dict[str, Any]]) -> Optional[TrapDetector]:
+    """A TrapDetector for the traps config section, or None if detection is disabled."""
+    config = {**DEFAULT_TRAP_CONFIG, **(config or {})}
+    return TrapDetector(config) if config["enabled"] else None
@@ -0,0 +1,234 @@
+"""
+URL normalization policy: which URLs count as the same page.
+
+crawl.normalize_url(url) keys a page on host and path alone, so
+?action=getcompany&CIK=0000320193 and ?CIK=0000789019 collapse into one
+page while nothing is deduplicated by its query string. URLPolicy keeps the
+query string and compiles the rules for it once:
+
+- query: "keep" keeps every parameter, "drop" drops every parameter; an
+  allow list keeps only the parameters it matches either way.
+- deny: parameters that never identify a page (tracking ids, session ids).
+- sort_query: parameters are sorted, so ?a=1&b=2 and ?b=2&a=1 are one page.
+- strip_fragment: #fragments are dropped (keep them for hash-routed sites).
+- domains: per-host overrides of the settings above (subdomains included).
+- canonical: a page's <link rel="canonical"> collapses the two URLs into
+  one key (if the canonical URL was reached first, the crawler marks the
+  page's record duplicate_of it instead).
+- learn_parameters: once that many pages on a host had a canonical URL
+  leaving out the same query parameter, the parameter is ignored on the
+  host from then on (0 = never; sites that point every ?page=N at page 1
+  would otherwise lose their pagination).
+
+Patterns are shell-style globs matched case-insensitively (utm_*). Each
+URL's key is computed once, interned and cached, so the frontier, the
+robots check and the report all share one string per page.
+"""
+
+import re
+import sys
+from fnmatch import translate
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit
+
+
+# Parameters that only track where a click came from or who made it
+TRACKING_PARAMETERS = [
+    "utm_*", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "ref_src",
+    "sessionid", "jsessionid", "phpsessid", "aspsessionid", "cfid", "cftoken",
+]
+
+DEFAULT_URL_POLICY_CONFIG = {
+    "query": "keep",
+    "allow": [],
+    "deny": TRACKING_PARAMETERS,
+    "sort_query": True,
+    "strip_fragment": True,
+    "canonical": True,
+    "learn_parameters": 0,
+    "domains": {},
+    "cache_size": 100000,
+}
+
+QUERY_MODES = ("keep", "drop")
+
+# Settings a domains entry may override
+_DOMAIN_SETTINGS = ("query", "allow", "deny", "sort_query", "strip_fragment")
+
+
+def _compile_globs(patterns: List[str]) -> Optional[re.Pattern]:
+    if not patterns:
+        return None
+    return re.compile("|".join(translate(pattern.lower()) for pattern in patterns))
+
+
+def _host(netloc: str) -> str:
+    """The host part normalize_url keeps: lowercase, no credentials, port or www."""
+    netloc = netloc.lower()
+    if '@' in netloc:
+        netloc = netloc.split('@')[1]
+    if ':' in netloc:
+        netloc = netloc.split(':')[0]
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    return netloc
+
+
+class _Rules:
+    """One host's compiled query and fragment rules."""
+
+    __slots__ = ("keep", "allow", "deny", "sort_query", "strip_fragment")
+
+    def __init__(self, settings: Dict[str, Any]):
+        if settings["query"] not in QUERY_MODES:
+            raise ValueError(f"url_policy.query must be one of {', '.join(QUERY_MODES)}, got {settings['query']!r}")
+        self.keep = settings["query"] == "keep"
+        self.allow = _compile_globs(settings["allow"])
+        self.deny = _compile_globs(settings["deny"])
+        self.sort_query = settings["sort_query"]
+        self.strip_fragment = settings["strip_fragment"]
+
+    def allows(self, name: str) -> bool:
+        name = name.lower()
+        if self.allow is not None:
+            return self.allow.match(name) is not None
+        return self.keep and (self.deny is None or self.deny.match(name) is None)
+
+
+class URLPolicy:
+    """Compiled normalization rules plus the cache of keys computed so far."""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Compile the policy.
+
+        Args:
+            config: The url_policy section of config.yaml (see DEFAULT_URL_POLICY_CONFIG)
+        """
+        self.config = {**DEFAULT_URL_POLICY_CONFIG, **(config or {})}
+        self.rules = _Rules(self.config)
+        self.domain_rules = {
+            _host(domain): _Rules({**self.config, **{key: value for key, value in (overrides or {}).items()
+                                                     if key in _DOMAIN_SETTINGS}})
+            for domain, overrides in (self.config["domains"] or {}).items()
+        }
+        self._host_rules: Dict[str, _Rules] = {}
+        self._cache: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self.learned: Dict[str, Set[str]] = {}
+        self._evidence = Counter()  # (host, parameter) -> pages whose canonical URL left it out
+        self.keys_computed = 0
+        self.cache_hits = 0
+
+    def rules_for(self, host: str) -> _Rules:
+        """The rules of the most specific domains entry covering host, else the defaults."""
+        rules = self._host_rules.get(host)
+        if rules is None:
+            rules = self.rules
+            domain = host
+            while domain:
+                if domain in self.domain_rules:
+                    rules = self.domain_rules[domain]
+                    break
+                domain = domain.partition(".")[2]
+            self._host_rules[host] = rules
+        return rules
+
+    def normalize(self, url: str) -> str:
+        """The dedup key of url (host, path, kept query parameters)."""
+        key = self._cache.get(url)
+        if key is not None:
+            self.cache_hits += 1
+        else:
+            key = self._compute(url)
+            if len(self._cache) >= self.config["cache_size"]:
+                self._cache.clear()
+            self._cache[url] = key
+        return self._aliases.get(key, key) if self._aliases else key
+
+    def _compute(self, url: str) -> str:
+        self.keys_computed += 1
+        parsed = urlsplit(url)
+        host = _host(parsed.netloc)
+        path = parsed.path
+        if path.endswith('/'):
+            path = path[:-1]
+        rules = self.rules_for(host)
+        query = ""
+        if parsed.query:
+            learned = self.learned.get(host, ())
+            pairs = [(name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+                     if rules.allows(name) and name.lower() not in learned]
+            if rules.sort_query:
+                pairs.sort()
+            query = urlencode(pairs)
+        fragment = "" if rules.strip_fragment else parsed.fragment
+        key = host + (path or ("/" if query or fragment else ""))
+        if query:
+            key += "?" + query
+        if fragment:
+            key += "#" + fragment
+        return sys.intern(key)
+
+    def learn_canonical(self, url: str, canonical_url: str) -> Optional[str]:
+        """
+        Take in a page's <link rel="canonical">.
+
+        If the canonical URL is on the same host and path and leaves out some
+        of url's query parameters, that counts toward ignoring them on the
+        host (see learn_parameters; an allow list overrides this).
+
+        Args:
+            url: The URL the page was fetched from
+            canonical_url: The href of its rel=canonical link
+
+        Returns:
+            The canonical URL's key if it differs from url's key, else None
+        """
+        if not self.config["canonical"] or not canonical_url:
+            return None
+        canonical_url = urljoin(url, canonical_url)
+        page, canonical = urlsplit(url), urlsplit(canonical_url)
+        if canonical.scheme not in ("http", "https") or _host(page.netloc) != _host(canonical.netloc):
+            return None
+        key = self.normalize(url)
+        canonical_key = self.normalize(canonical_url)
+        if canonical_key == key:
+            return None
+        threshold = self.config["learn_parameters"]
+        if threshold and page.query and page.path.rstrip('/') == canonical.path.rstrip('/'):
+            self._learn(_host(page.netloc), page.query, canonical.query, threshold)
+        return canonical_key
+
+    def _learn(self, host: str, query: str, canonical_query: str, threshold: int):
+        rules = self.rules_for(host)
+        learned = self.learned.setdefault(host, set())
+        kept = {name.lower() for name, _ in parse_qsl(canonical_query, keep_blank_values=True)}
+        new = set()
+        for name in {name.lower() for name, _ in parse_qsl(query, keep_blank_values=True)} - kept - learned:
+            if rules.allow is not None and rules.allow.match(name):
+                continue
+            self._evidence[host, name] += 1
+            if self._evidence[host, name] >= threshold:
+                new.add(name)
+        if new:
+            learned.update(new)
+            # Cached keys may still carry the parameters
+            self._cache.clear()
+
+    def alias(self, key: str, target: str):
+        """Map key to target from now on, e.g. a canonical URL to the variant already crawled."""
+        if key != target:
+            self._aliases[key] = target
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for the statistics report."""
+        return {
+            "keys_computed": self.keys_computed,
+            "cache_hits": self.cache_hits,
+            "canonical_aliases": len(self._aliases),
+            "learned_ignored_parameters": {host: ", ".join(sorted(names)) for host, names in self.learned.items()
+                                           if names}
+        }
@@ -0,0 +1,248 @@
+"""
+Compact URL interning for the frontier's visited set.
+
+A set of normalized URL strings costs a str object and a hash slot per URL,
+and every dict keyed by those URLs (depths, parents) another entry on top:
+a few hundred bytes per URL, gigabytes at a million. URLTable keeps the
+same information in flat arrays instead:
+
+- each normalized URL gets an integer id; its host is interned once per
+  host and the rest of it is appended, as UTF-8, to one bytearray
+- an open-addressing hash index (array of ids) finds the id of a URL,
+  with a 32-bit tag per id so most probes never touch the URL bytes
+- depth and parent id of every URL are array('H') / array('i') columns
+- the URL as it was found (scheme, www, trailing slash) is usually the
+  key's path behind an interned "scheme://host" prefix, so an array('q')
+  column holds the prefix id; URLs that can't be rebuilt that way (tracking
+  parameters, fragments, reordered queries) are stored whole in a bytearray
+
+An optional BloomFilter in front answers "never seen" without probing the
+index. It only ever adds false positives, which fall through to the exact
+index, so a filter sized for fewer URLs than the crawl finds costs speed,
+never correctness.
+
+benchmarks/bench_url_table.py measures the bytes per URL.
+"""
+
+import math
+from array import array
+from typing import Dict, List, Optional
+
+
+DEFAULT_URL_TABLE_CONFIG = {
+    "bloom_filter": False,
+    "bloom_capacity": 1000000,   # URLs the filter is sized for (max_pages when that is set)
+    "bloom_error_rate": 0.01,
+}
+
+NO_PARENT = -1
+_EMPTY = -1
+_TAG_MASK = 0xFFFFFFFF
+_NO_URL = -1  # in _url_of; -(offset + 2) points into _urls, n >= 0 is prefix id n // 2 with a trailing slash if odd
+
+
+class BloomFilter:
+    """Bit array with k hash positions per key (double hashing of Python's bytes hash)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Size the filter.
+
+        Args:
+            capacity: Number of keys the error rate is promised for
+            error_rate: False positive rate at capacity
+        """
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add_hash(self, hashed: int):
+        bits, size = self.bits, self.size
+        position, step = hashed & _TAG_MASK, (hashed >> 32) | 1
+        for _ in range(self.hashes):
+            position %= size
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+
+    def may_contain_hash(self, hashed: int) -> bool:
+        bits, size = self.bits, self.size
+        position, step = hashed & _TAG_MASK, (hashed >> 32) | 1
+        for _ in range(self.hashes):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+class URLTable:
+    """Normalized URL <-> integer id, with a depth and a parent id per URL."""
+
+    def __init__(self, bloom: BloomFilter = None, capacity: int = 1024):
+        """
+        Initialize an empty table.
+
+        Args:
+            bloom: Optional filter consulted before the index for lookups
+            capacity: Initial index size (grows by doubling)
+        """
+        self.bloom = bloom
+        self._hosts: List[str] = []
+        self._host_ids: Dict[str, int] = {}
+        self._host_of = array('I')
+        self._paths = bytearray()
+        self._offsets = array('Q', [0])
+        self._tags = array('I')
+        self.depths = array('H')
+        self.parents = array('i')
+        self._prefixes: List[str] = []
+        self._prefix_ids: Dict[str, int] = {}
+        self._url_of = array('q')
+        self._urls = bytearray()  # whole URLs, each behind its 4-byte length
+        size = 1
+        while size < capacity:
+            size *= 2
+        self._index = array('i', [_EMPTY]) * size
+        self._mask = size - 1
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    @staticmethod
+    def _split(key: str):
+        host, slash, path = key.partition("/")
+        return host, (slash + path).encode()
+
+    def _find(self, host_id: int, path: bytes, hashed: int) -> int:
+        """Index slot holding the key, or the empty slot where it would go."""
+        tag = hashed & _TAG_MASK
+        index, tags, offsets, paths, host_of = self._index, self._tags, self._offsets, self._paths, self._host_of
+        slot = hashed & self._mask
+        while True:
+            url_id = index[slot]
+            if url_id == _EMPTY:
+                return slot
+            if (tags[url_id] == tag and host_of[url_id] == host_id
+                    and paths[offsets[url_id]:offsets[url_id + 1]] == path):
+                return slot
+            slot = (slot + 1) & self._mask
+
+    def get(self, key: str) -> Optional[int]:
+        """Id of a normalized URL, or None if it was never added."""
+        host, path = self._split(key)
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            return None
+        hashed = hash((host_id, path))
+        if self.bloom is not None and not self.bloom.may_contain_hash(hashed):
+            return None
+        url_id = self._index[self._find(host_id, path, hashed)]
+        return None if url_id == _EMPTY else url_id
+
+    def add(self, key: str, depth: int = 0, parent: int = NO_PARENT) -> int:
+        """Id of a normalized URL, adding it with depth and parent if it is new."""
+        host, path = self._split(key)
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self._hosts)
+            self._hosts.append(host)
+        hashed = hash((host_id, path))
+        slot = self._find(host_id, path, hashed)
+        url_id = self._index[slot]
+        if url_id != _EMPTY:
+            return url_id
+        url_id = len(self._tags)
+        self._index[slot] = url_id
+        self._host_of.append(host_id)
+        self._paths += path
+        self._offsets.append(len(self._paths))
+        self._tags.append(hashed & _TAG_MASK)
+        self.depths.append(min(depth, 0xFFFF))
+        self.parents.append(parent)
+        self._url_of.append(_NO_URL)
+        if self.bloom is not None:
+            self.bloom.add_hash(hashed)
+        # Keep the index at most two thirds full
+        if 3 * len(self._tags) > 2 * len(self._index):
+            self._grow()
+        return url_id
+
+    def _grow(self):
+        size = len(self._index) * 2
+        self._index = array('i', [_EMPTY]) * size
+        self._mask = size - 1
+        index, mask = self._index, self._mask
+        for url_id in range(len(self._tags)):
+            start, end = self._offsets[url_id], self._offsets[url_id + 1]
+            slot = hash((self._host_of[url_id], bytes(self._paths[start:end]))) & mask
+            while index[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            index[slot] = url_id
+
+    def key(self, url_id: int) -> str:
+        """The normalized URL of an id."""
+        return self._hosts[self._host_of[url_id]] + self._path(url_id)
+
+    def _path(self, url_id: int) -> str:
+        start, end = self._offsets[url_id], self._offsets[url_id + 1]
+        return self._paths[start:end].decode()
+
+    def set_url(self, url_id: int, url: str):
+        """Remember the URL an id was found as (its key is the normalized form)."""
+        path = self._path(url_id)
+        rest, slash = url, 0
+        if url.endswith("/") and not path.endswith("/"):
+            rest, slash = url[:-1], 1
+        prefix = rest[:len(rest) - len(path)]
+        # Only "scheme://host[:port]" prefixes are interned, so there are about as many as hosts
+        if rest.endswith(path) and prefix.count("/") == 2 and "?" not in prefix and "#" not in prefix:
+            prefix_id = self._prefix_ids.get(prefix)
+            if prefix_id is None:
+                prefix_id = self._prefix_ids[prefix] = len(self._prefixes)
+                self._prefixes.append(prefix)
+            self._url_of[url_id] = 2 * prefix_id + slash
+        else:
+            encoded = url.encode()
+            self._url_of[url_id] = -(len(self._urls) + 2)
+            self._urls += len(encoded).to_bytes(4, "little") + encoded
+
+    def has_url(self, url_id: int) -> bool:
+        return self._url_of[url_id] != _NO_URL
+
+    def url(self, url_id: int) -> Optional[str]:
+        """The URL an id was last found as, or None if set_url was never called for it."""
+        value = self._url_of[url_id]
+        if value >= 0:
+            return self._prefixes[value >> 1] + self._path(url_id) + ("/" if value & 1 else "")
+        if value == _NO_URL:
+            return None
+        start = -value - 2
+        length = int.from_bytes(self._urls[start:start + 4], "little")
+        return self._urls[start + 4:start + 4 + length].decode()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the table's arrays (host names and the Bloom filter included)."""
+        arrays = (self._host_of, self._offsets, self._tags, self.depths, self.parents, self._url_of, self._index)
+        size = sum(column.itemsize * len(column) for column in arrays) + len(self._paths) + len(self._urls)
+        size += sum(len(host) for host in self._hosts) + sum(len(prefix) for prefix in self._prefixes)
+        if self.bloom is not None:
+            size += self.bloom.nbytes
+        return size
+
+
+def build_url_table(config: Dict = None, expected_urls: int = 0) -> URLTable:
+    """A URLTable for the url_table config section, with a Bloom filter sized for expected_urls if enabled."""
+    config = {**DEFAULT_URL_TABLE_CONFIG, **(config or {})}
+    bloom = None
+    if config["bloom_filter"]:
+        bloom = BloomFilter(expected_urls or config["bloom_capacity"], config["bloom_error_rate"])
+    return URLTable(bloom)
@@ -9,16 +9,19 @@ from crawl import normalize_url, get_domain_from_url
 class SiteGraphBuilder:
     """Build a graph representation of a crawled site."""
     
-    def __init__(self, page_data: Dict[str, Any], base_url: str):
+    def __init__(self, page_data: Dict[str, Any], base_url: str, url_policy=None):
         """
         Initialize the graph builder.
         
         Args:
-            page_data: Dictionary of page data from crawler
+            page_data: Page data from crawler (a dict or page_store.PageStore; read twice, record by record,
+                and only the scalar fields are kept on the graph)
             base_url: Base URL of the site
+            url_policy: The crawl's url_policy.URLPolicy, so links resolve to the crawler's page keys
         """
         self.page_data = page_data
         self.base_url = base_url
+        self.url_policy = url_policy
         self.base_domain = get_domain_from_url(base_url)
         self.graph = nx.DiGraph()
         self._build_graph()
@@ -56,7 +59,7 @@ class SiteGraphBuilder:
         for norm_url, data in self.page_data.items():
             if "error" not in data and "internal_links" in data:
                 for link in data["internal_links"]:
-                    normalized_link = normalize_url(link)
+                    normalized_link = normalize_url(link, self.url_policy)
                     if normalized_link in self.graph:
                         self.graph.add_edge(norm_url, normalized_link)
     
@@ -278,7 +281,7 @@ class SiteGraphBuilder:
         return pages_with_scores[:top_n]
 
 
-def create_visualizations(page_data: Dict[str, Any], base_url: str, output_dir: str):
+def create_visualizations(page_data: Dict[str, Any], base_url: str, output_dir: str, url_policy=None):
     """
     Create all visualizations for the crawled site.
     
@@ -286,11 +289,12 @@ def create_visualizations(page_data: Dict[str, Any], base_url: str, output_dir:
         page_data: Dictionary of page data from crawler
         base_url: Base URL of the site
         output_dir: Directory to save visualizations
+        url_policy: The crawl's url_policy.URLPolicy
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    builder = SiteGraphBuilder(page_data, base_url)
+    builder = SiteGraphBuilder(page_data, base_url, url_policy)
     
     # Generate interactive HTML (pyvis)
     builder.generate_interactive_html(str(output_path / "graph_interactive.html"))